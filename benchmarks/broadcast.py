@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Broadcast benchmark - fan-out to many chats against a stub Bot API
+
+Broadcasts --messages messages to --chats chats through Notifier (shared
+pooled Bot, async worker pool) for each worker count, then checks that
+every chat got its messages in order, that the global rate held and that
+blocked chats were only tried once.
+
+Usage:
+    python -m benchmarks.broadcast
+    python -m benchmarks.broadcast --chats 100 --workers 1,4,8 --latency 0.05 --json bench_broadcast.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from benchmarks.telegram_stub import STUB_TOKEN, StubTelegramServer
+
+
+def run(workers, args, blocked):
+    from services.notify_service import Notifier
+    from services.telegram_http import create_bot
+
+    server = StubTelegramServer(latency=args.latency, blocked_chats=blocked).start()
+    bot = create_bot(STUB_TOKEN, pool_size=workers + 1, base_url=server.base_url)
+    notifier = Notifier(STUB_TOKEN, '1', bot=bot, async_send=True, workers=workers,
+                        queue_size=args.chats * args.messages, global_rate=args.global_rate,
+                        chat_rate=args.chat_rate, chat_burst=args.messages)
+    chat_ids = [str(1000 + i) for i in range(args.chats)]
+
+    started = time.perf_counter()
+    broadcasts = [notifier.broadcast(f"report {n}", chat_ids) for n in range(args.messages)]
+    for broadcast in broadcasts:
+        broadcast.wait(timeout=600)
+    elapsed = time.perf_counter() - started
+
+    expected = [f"report {n}" for n in range(args.messages)]
+    out_of_order = sum(1 for chat_id in chat_ids
+                       if chat_id not in blocked and server.messages.get(chat_id) != expected)
+    stats = notifier.get_stats()
+    sent = server.counters['sent']
+    result = {
+        'seconds': round(elapsed, 2),
+        'msgs_per_sec': round(sent / elapsed, 1),
+        'sent': sent,
+        'blocked_requests': server.counters['blocked'],
+        'blocked_skipped': stats['blocked'] - server.counters['blocked'],
+        'out_of_order_chats': out_of_order,
+        'connections': server.counters['connections'],
+        'latency_p95_ms': stats.get('latency_p95_ms'),
+    }
+    notifier.close()
+    bot.request.stop()
+    server.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure broadcast fan-out against a stub server")
+    parser.add_argument('--chats', type=int, default=60, help="subscriber chats")
+    parser.add_argument('--messages', type=int, default=3, help="messages broadcast to every chat")
+    parser.add_argument('--workers', default="1,4,8", help="comma-separated worker pool sizes")
+    parser.add_argument('--latency', type=float, default=0.05, help="stub seconds per sendMessage")
+    parser.add_argument('--global-rate', type=float, default=30, help="messages per second overall")
+    parser.add_argument('--chat-rate', type=float, default=1, help="messages per second per chat")
+    parser.add_argument('--blocked', type=int, default=3, help="chats that blocked the bot")
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # the blocked chats' 403s are expected
+    blocked = [str(1000 + i) for i in range(args.blocked)]
+
+    results = {}
+    print(f"{'workers':<10}{'seconds':>9}{'msg/s':>8}{'sent':>7}{'403s':>6}{'skipped':>9}{'disorder':>10}{'conns':>7}")
+    print("-" * 66)
+    for workers in [int(w) for w in args.workers.split(',')]:
+        r = results[f'workers[{workers}]'] = run(workers, args, blocked)
+        print(f"{workers:<10}{r['seconds']:>9}{r['msgs_per_sec']:>8}{r['sent']:>7}{r['blocked_requests']:>6}"
+              f"{r['blocked_skipped']:>9}{r['out_of_order_chats']:>10}{r['connections']:>7}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'args': vars(args), 'results': results}, indent=2))
+        print(f"Results written to {args.json}")
+    # One token up front, then global_rate per second; 5% for timer slack
+    failed = [name for name, r in results.items()
+              if r['out_of_order_chats'] or r['sent'] > (args.global_rate * r['seconds'] + 1) * 1.05]
+    if failed:
+        print(f"❌ Ordering or global rate violated: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Hot path benchmark - position, strategy, price cache, storage and formatting
+
+Runs offline: prices come from a FileProvider stub in a temp directory and
+DataStore writes go there too. Each case reports the best of --repeat runs,
+so results are comparable across commits:
+
+Usage:
+    python -m benchmarks.hot_paths --json bench_before.json
+    python -m benchmarks.hot_paths --compare bench_before.json --max-regression 20
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from core.config import Config
+from core.indicators import IndicatorBook
+from core.position import Position
+from core.price_history import PriceHistory
+from core.strategy import Strategy
+from services.price_service import PriceBatch, PriceCache, PriceData, PriceService
+from services.providers import FileProvider
+from utils.data_store import DataStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Lower is better for every metric, which --compare relies on
+METRIC = 'ns_per_call'
+
+
+def best_ns(fn, calls, repeat):
+    """Best-of-N nanoseconds per call; fn(calls) runs the loop itself"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(calls)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1e9
+
+
+def random_walk(n, start=16500, seed=1):
+    rng = random.Random(seed)
+    price, prices = start, []
+    for _ in range(n):
+        price = max(100, price + rng.gauss(0, 50))
+        prices.append(price)
+    return prices
+
+
+def bench_position(layer_counts, calls, repeat):
+    """Aggregate calls as the number of layers grows"""
+    results = {}
+    for count in layer_counts:
+        position = Position(Config.STOCK_SYMBOL)
+        for i in range(count):
+            position.add_layer(16000 + i % 500, 100)
+
+        def aggregates(n, position=position):
+            average_price, total_quantity = position.average_price, position.total_quantity
+            for _ in range(n):
+                average_price()
+                total_quantity()
+
+        def serialize(n, position=position):
+            for _ in range(n):
+                position.to_dict()
+
+        results[f'position.aggregates[{count}]'] = best_ns(aggregates, calls, repeat)
+        results[f'position.to_dict[{count}]'] = best_ns(serialize, max(1, calls // count), repeat)
+    return results
+
+
+def bench_strategy(calls, repeat):
+    """Strategy.check over a random walk around a 3-layer position"""
+    strategy = Strategy(Config.to_dict(), indicators=IndicatorBook(Config.to_dict()))
+    position = Position(Config.STOCK_SYMBOL)
+    for price in (17000, 16500, 16000):
+        position.add_layer(price, 1000)
+    prices = random_walk(calls)
+
+    def check(n):
+        for price in prices[:n]:
+            strategy.check(price, position)
+
+    return {'strategy.check': best_ns(check, calls, repeat)}
+
+
+def bench_cache(symbols, calls, repeat):
+    """PriceCache hit, miss and set"""
+    cache = PriceCache(ttl_seconds=3600, max_entries=len(symbols))
+    now = datetime.now()
+    for symbol in symbols:
+        cache.set(PriceData(symbol=symbol, price=16500, timestamp=now, source='bench'))
+    data = PriceData(symbol=symbols[0], price=16500, timestamp=now, source='bench')
+
+    def hit(n):
+        get = cache.get
+        for i in range(n):
+            get(symbols[i % len(symbols)])
+
+    def miss(n):
+        get = cache.get
+        for _ in range(n):
+            get('MISSING')
+
+    def store(n):
+        put = cache.set
+        for _ in range(n):
+            put(data)
+
+    return {
+        'price_cache.hit': best_ns(hit, calls, repeat),
+        'price_cache.miss': best_ns(miss, calls, repeat),
+        'price_cache.set': best_ns(store, calls, repeat),
+    }
+
+
+def bench_service(workdir, symbols, calls, repeat):
+    """PriceService.get_prices against the file stub, cached and uncached"""
+    stub = workdir / 'stub_prices.json'
+    stub.write_text(json.dumps({s: 16500 + i for i, s in enumerate(symbols)}))
+    results = {}
+    for name, ttl in (('price_service.get_prices.cached', 3600), ('price_service.get_prices.upstream', 0)):
+        service = PriceService(provider=FileProvider(str(stub)), cache_ttl=ttl, history=PriceHistory(1024))
+
+        def fetch(n, service=service):
+            for _ in range(n):
+                service.get_prices(symbols)
+
+        results[name] = best_ns(fetch, calls, repeat)
+    return results
+
+
+def bench_datastore(workdir, accounts, calls, repeat):
+    """DataStore.save latency (including its backup copy) for N accounts"""
+    store = DataStore(str(workdir / 'data.json'))
+    data = {'accounts': {}, 'alerts': []}
+    for i in range(accounts):
+        position = Position(Config.STOCK_SYMBOL)
+        for price in (17000, 16500, 16000):
+            position.add_layer(price, 1000)
+        data['accounts'][str(100000 + i)] = {**position.to_dict(), 'strategy': {}}
+
+    def save(n):
+        for _ in range(n):
+            store.save(data)
+
+    return {f'datastore.save[{accounts}]': best_ns(save, calls, repeat)}
+
+
+def bench_format(symbols, calls, repeat):
+    """send_price_update message building: shared part plus one position block"""
+    import main  # light at import time, see benchmarks.startup
+
+    now = datetime.now()
+    history = PriceHistory(1024)
+    indicators = IndicatorBook(Config.to_dict())
+    for i, price in enumerate(random_walk(300)):
+        history.append(Config.STOCK_SYMBOL, time.time() - 300 + i, price)
+        indicators.update(Config.STOCK_SYMBOL, price, 1000.0 * i)
+    batch = PriceBatch(prices={
+        s: PriceData(symbol=s, price=16500, timestamp=now, source='bench') for s in symbols
+    })
+    position = Position(Config.STOCK_SYMBOL)
+    for price in (17000, 16500, 16000):
+        position.add_layer(price, 1000)
+
+    def build(n):
+        for _ in range(n):
+            main.format_price_update(batch, 16500, history, indicators) + main.format_position_summary(position, 16500)
+
+    return {'send_price_update.format': best_ns(build, calls, repeat)}
+
+
+def metadata():
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                            capture_output=True, text=True).stdout.strip()
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def compare(results, baseline_file, max_regression):
+    """Print the change against a previous --json run; True if within budget"""
+    baseline = json.loads(Path(baseline_file).read_text())['results']
+    ok = True
+    print(f"\n{'case':<44}{'before':>12}{'after':>12}{'change':>10}")
+    print("-" * 78)
+    for name, value in results.items():
+        before = baseline.get(name, {}).get(METRIC)
+        if not before:
+            print(f"{name:<44}{'-':>12}{value[METRIC]:>12.1f}{'new':>10}")
+            continue
+        change = (value[METRIC] - before) / before * 100
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            ok, flag = False, "  ❌"
+        print(f"{name:<44}{before:>12.1f}{value[METRIC]:>12.1f}{change:>+9.1f}%{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure hot path cost offline")
+    parser.add_argument('--calls', type=int, default=100000, help="calls per run for in-memory cases")
+    parser.add_argument('--io-calls', type=int, default=200, help="calls per run for stub/disk cases")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case, best is kept")
+    parser.add_argument('--layers', default="1,10,100,1000", help="comma-separated layer counts")
+    parser.add_argument('--symbols', type=int, default=10, help="watchlist size for cache/service/format")
+    parser.add_argument('--accounts', type=int, default=100, help="accounts written per DataStore.save")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--compare', help="previous --json file to compare against")
+    parser.add_argument('--max-regression', type=float, help="with --compare, fail if any case is this %% slower")
+    args = parser.parse_args()
+
+    # Log I/O is excluded so results reflect the code, not the log handlers
+    logging.disable(logging.INFO)
+
+    symbols = [Config.STOCK_SYMBOL.upper()] + [f'S{i:03d}' for i in range(args.symbols - 1)]
+    raw = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        raw.update(bench_position([int(n) for n in args.layers.split(',')], args.calls, args.repeat))
+        raw.update(bench_strategy(args.calls, args.repeat))
+        raw.update(bench_cache(symbols, args.calls, args.repeat))
+        raw.update(bench_service(workdir, symbols, args.io_calls, args.repeat))
+        raw.update(bench_datastore(workdir, args.accounts, args.io_calls // 4 or 1, args.repeat))
+        raw.update(bench_format(symbols, args.calls // 10 or 1, args.repeat))
+
+    results = {name: {METRIC: round(ns, 1), 'calls_per_sec': round(1e9 / ns)} for name, ns in raw.items()}
+    print(f"{'case':<44}{'ns/call':>14}{'calls/s':>14}")
+    print("-" * 72)
+    for name, value in results.items():
+        print(f"{name:<44}{value[METRIC]:>14,.1f}{value['calls_per_sec']:>14,}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'meta': metadata(), 'results': results}, indent=2))
+        print(f"Results written to {args.json}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        print(f"❌ Regression above {args.max_regression}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
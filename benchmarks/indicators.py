@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Indicator benchmark - cost per streaming update
+
+Feeds a random-walk price series through each indicator and reports the
+time per update (best of --repeat runs). The per-update cost should not
+depend on the period, since nothing is recomputed over a window.
+
+Usage:
+    python -m benchmarks.indicators
+    python -m benchmarks.indicators --updates 500000 --periods 14,200 --json bench_indicators.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from core.indicators import ATR, EMA, RSI, VWAP, IndicatorSet
+
+
+def price_series(n, seed=1):
+    """Random walk around 16.5 with cumulative volume"""
+    rng = random.Random(seed)
+    price, volume = 16.5, 0.0
+    prices, volumes = [], []
+    for _ in range(n):
+        price = max(0.1, price + rng.gauss(0, 0.05))
+        volume += rng.randint(100, 10000)
+        prices.append(price)
+        volumes.append(volume)
+    return prices, volumes
+
+
+def time_updates(make, feed, prices, volumes, repeat):
+    """Best-of-N nanoseconds per update"""
+    best = None
+    for _ in range(repeat):
+        indicator = make()
+        started = time.perf_counter()
+        feed(indicator, prices, volumes)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(prices) * 1e9
+
+
+def _feed_price(indicator, prices, _):
+    update = indicator.update
+    for p in prices:
+        update(p)
+
+
+def _feed_atr(indicator, prices, _):
+    update = indicator.update
+    for p in prices:
+        update(p, p, p)
+
+
+def _feed_vwap(indicator, prices, volumes):
+    update = indicator.update
+    last = 0.0
+    for p, v in zip(prices, volumes):
+        update(p, v - last)
+        last = v
+
+
+def _feed_set(indicator, prices, volumes):
+    update = indicator.update
+    for p, v in zip(prices, volumes):
+        update(p, v)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure streaming indicator update cost")
+    parser.add_argument('--updates', type=int, default=200000, help="prices fed per run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per indicator, best is kept")
+    parser.add_argument('--periods', default="14,200", help="comma-separated periods to compare")
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    prices, volumes = price_series(args.updates)
+    periods = [int(p) for p in args.periods.split(',')]
+
+    cases = [('vwap', VWAP, _feed_vwap)]
+    for period in periods:
+        cases += [
+            (f'ema({period})', lambda period=period: EMA(period), _feed_price),
+            (f'rsi({period})', lambda period=period: RSI(period), _feed_price),
+            (f'atr({period})', lambda period=period: ATR(period), _feed_atr),
+            (f'set({period})', lambda period=period: IndicatorSet(period, period, period), _feed_set),
+        ]
+
+    results = {}
+    print(f"{'indicator':<16}{'ns/update':>12}{'updates/s':>14}")
+    print("-" * 42)
+    for name, make, feed in cases:
+        ns = time_updates(make, feed, prices, volumes, args.repeat)
+        results[name] = {'ns_per_update': round(ns, 1), 'updates_per_sec': round(1e9 / ns)}
+        print(f"{name:<16}{ns:>12.1f}{1e9 / ns:>14,.0f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
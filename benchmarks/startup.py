@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - import time per module
+
+Runs `python -X importtime` in a fresh interpreter for each module (best of
+--repeat runs) so results are not skewed by already-imported dependencies.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --json bench_startup.json --budget-ms 150
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules on the startup path; main and --check-config must stay light
+MODULES = [
+    'core.config',
+    'core.strategy',
+    'services.price_service',
+    'services.providers',
+    'services.notify_service',
+    'services.polling_engine',
+    'main',
+]
+
+# Heavy dependencies, measured for reference only
+HEAVY = ['vnstock', 'telegram.ext', 'apscheduler.schedulers.background']
+
+
+def import_times(module):
+    """Return {module_name: (self_us, cumulative_us)} for a cold import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-500:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module, repeat, baseline):
+    """Best-of-N cumulative import time in ms, plus heaviest dependencies"""
+    best = None
+    for _ in range(repeat):
+        times = import_times(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    heaviest = sorted(
+        ((name, t[1] / 1000) for name, t in best.items()
+         if name != module and '.' not in name and name not in baseline),
+        key=lambda item: item[1], reverse=True
+    )[:3]
+    return best[module][1] / 1000, heaviest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time per module")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per module, best is kept")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--budget-ms', type=float, help="fail if `import main` exceeds this")
+    parser.add_argument('--heavy', action='store_true', help="also measure heavy dependencies")
+    args = parser.parse_args()
+
+    modules = MODULES + (HEAVY if args.heavy else [])
+    results = {}
+    # Modules every interpreter imports at startup are not attributed to ours
+    baseline = set(import_times('sys'))
+
+    print(f"{'module':<40}{'import ms':>10}   heaviest top-level deps")
+    print("-" * 90)
+    for module in modules:
+        ms, heaviest = measure(module, args.repeat, baseline)
+        results[module] = {'import_ms': round(ms, 1), 'heaviest': {n: round(t, 1) for n, t in heaviest}}
+        deps = ", ".join(f"{n} {t:.0f}ms" for n, t in heaviest)
+        print(f"{module:<40}{ms:>10.1f}   {deps}")
+
+    check = subprocess.run(
+        [sys.executable, '-c', 'import sys, main; main.check_config(); '
+                               'print("LOADED:" + ",".join(m for m in ("vnstock", "telegram", "apscheduler") '
+                               'if m in sys.modules))'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    loaded = [line for line in check.stdout.splitlines() if line.startswith('LOADED:')]
+    if not loaded:
+        raise RuntimeError(f"--check-config probe failed:\n{check.stderr[-500:]}")
+    results['check_config_loaded_heavy'] = [m for m in loaded[0][len('LOADED:'):].split(',') if m]
+    print(f"\n--check-config loads heavy deps: {results['check_config_loaded_heavy'] or 'none'}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.json}")
+
+    if args.budget_ms is not None and results['main']['import_ms'] > args.budget_ms:
+        print(f"❌ import main took {results['main']['import_ms']}ms (budget {args.budget_ms}ms)")
+        return 1
+    if results['check_config_loaded_heavy']:
+        print("❌ --check-config path imports heavy dependencies")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
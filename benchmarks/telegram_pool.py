@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Telegram HTTP pool benchmark - connection reuse against a stub Bot API
+
+Sends messages from several threads through telegram.Bot against a local
+stub server, once with PTB's default Request and once per PooledRequest
+pool size, and reports throughput, connections the server accepted (each
+one a TCP and, with --tls, TLS handshake) and time spent waiting for a
+pooled connection.
+
+Usage:
+    python -m benchmarks.telegram_pool
+    python -m benchmarks.telegram_pool --tls --threads 16 --pools 1,4,8 --json bench_pool.json
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from benchmarks.telegram_stub import STUB_TOKEN, StubTelegramServer, self_signed_cert
+
+
+def run(make_request, server, messages, threads):
+    """Send `messages` from `threads` threads; returns (seconds, server counters delta)"""
+    from telegram import Bot
+
+    bot = Bot(token=STUB_TOKEN, request=make_request(), base_url=server.base_url)
+    before = dict(server.counters)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: bot.send_message(chat_id=i % 50, text=f"msg {i}"), range(messages)))
+    elapsed = time.perf_counter() - started
+    delta = {k: v - before.get(k, 0) for k, v in server.counters.items()}
+    return elapsed, delta, bot.request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Telegram connection reuse against a stub server")
+    parser.add_argument('--messages', type=int, default=2000, help="messages per case")
+    parser.add_argument('--threads', type=int, default=8, help="concurrent senders")
+    parser.add_argument('--pools', default="1,4,8", help="comma-separated PooledRequest pool sizes")
+    parser.add_argument('--latency', type=float, default=0.002, help="stub seconds per sendMessage")
+    parser.add_argument('--tls', action='store_true', help="serve HTTPS with a self-signed certificate")
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    from telegram.utils.request import Request
+    from services.telegram_http import PooledRequest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile = keyfile = None
+        if args.tls:
+            certfile, keyfile = self_signed_cert(tmp)
+        server = StubTelegramServer(latency=args.latency, certfile=certfile, keyfile=keyfile).start()
+
+        # What Bot(token=...) builds: one pooled connection, extras opened and discarded
+        def default_request():
+            request = Request()
+            if certfile:
+                request._con_pool.connection_pool_kw['ca_certs'] = certfile
+            return request
+
+        cases = [('ptb_default[1]', default_request)]
+        for size in [int(p) for p in args.pools.split(',')]:
+            cases.append((f'pooled[{size}]', lambda size=size: PooledRequest(pool_size=size, ca_certs=certfile)))
+
+        results = {}
+        print(f"{'case':<20}{'msg/s':>10}{'conns':>8}{'req/conn':>10}{'p95 ms':>9}{'wait max':>10}{'errors':>8}")
+        print("-" * 75)
+        for name, make in cases:
+            elapsed, delta, request = run(make, server, args.messages, args.threads)
+            stats = request.get_stats() if isinstance(request, PooledRequest) else {}
+            connections = delta.get('connections', 0)
+            results[name] = {
+                'msgs_per_sec': round(args.messages / elapsed),
+                'connections': connections,
+                'requests_per_connection': round(delta.get('requests', 0) / max(connections, 1), 1),
+                'latency_p95_ms': stats.get('latency_p95_ms'),
+                'pool_wait_p95_ms': stats.get('pool_wait_p95_ms'),
+                'pool_wait_max_ms': stats.get('pool_wait_max_ms'),
+                'errors': stats.get('errors', 0),
+            }
+            r = results[name]
+            print(f"{name:<20}{r['msgs_per_sec']:>10,}{connections:>8}{r['requests_per_connection']:>10}"
+                  f"{r['latency_p95_ms'] if r['latency_p95_ms'] is not None else '-':>9}"
+                  f"{r['pool_wait_max_ms'] if r['pool_wait_max_ms'] is not None else '-':>10}{r['errors']:>8}")
+            request.stop()
+        server.stop()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'tls': args.tls, 'threads': args.threads, 'results': results}, indent=2))
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Stub Telegram Bot API server for offline tests and benchmarks
+
+Answers getMe, sendMessage, getUpdates (long polls, never has updates) and
+deleteWebhook over HTTP/1.1 keep-alive, optionally over TLS, and counts
+accepted connections so handshakes per request can be measured. It can add
+latency, answer 429 with retry_after, and answer 403 for blocked chats.
+
+Usage:
+    python -m benchmarks.telegram_stub --port 8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081/bot python main.py
+"""
+import argparse
+import json
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+# Any well-formed token works against the stub
+STUB_TOKEN = '123456:stub-token'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count('connections')
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(body or b'{}')
+        else:
+            params = dict(parse_qsl(body.decode()))
+        self._handle(params)
+
+    def _handle(self, params):
+        status, payload = self.server.stub.dispatch(self.path.rsplit('/', 1)[-1], params)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubTelegramServer:
+    """In-process stub of the Bot API methods the bot uses"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, retry_every=0, retry_after=1,
+                 blocked_chats=(), certfile=None, keyfile=None):
+        """
+        Args:
+            port: 0 picks a free port
+            latency: Seconds added to every sendMessage
+            retry_every: Answer every Nth sendMessage with 429 (0 = never)
+            retry_after: retry_after seconds in those 429 answers
+            blocked_chats: Chats answered with 403 (bot blocked by the user)
+            certfile, keyfile: Serve HTTPS with this certificate
+        """
+        self.latency = latency
+        self.retry_every = retry_every
+        self.retry_after = retry_after
+        self.blocked_chats = {str(c) for c in blocked_chats}
+        self.counters = defaultdict(int)
+        self.messages = defaultdict(list)  # chat_id -> texts in arrival order
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = 'https'
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Value for Bot(base_url=...) / TELEGRAM_API_URL"""
+        host, port = self.httpd.server_address[:2]
+        return f"{self.scheme}://{'localhost' if self.scheme == 'https' else host}:{port}/bot"
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def dispatch(self, method, params):
+        self._count('requests')
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'stub', 'username': 'stub_bot'}}
+        if method == 'getUpdates':
+            time.sleep(min(float(params.get('timeout') or 0), 1.0))
+            return 200, {'ok': True, 'result': []}
+        if method in ('deleteWebhook', 'setMyCommands'):
+            return 200, {'ok': True, 'result': True}
+        if method != 'sendMessage':
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+        chat_id = str(params.get('chat_id'))
+        if chat_id in self.blocked_chats:
+            self._count('blocked')
+            return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+        with self._lock:
+            self.counters['send_attempts'] += 1
+            limited = self.retry_every and self.counters['send_attempts'] % self.retry_every == 0
+        if limited:
+            self._count('rate_limited')
+            return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                         'parameters': {'retry_after': self.retry_after}}
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.counters['sent'] += 1
+            self.messages[chat_id].append(params.get('text'))
+            message_id = self.counters['sent']
+        return 200, {'ok': True, 'result': {
+            'message_id': message_id, 'date': int(time.time()),
+            'chat': {'id': int(chat_id) if chat_id.lstrip('-').isdigit() else 0, 'type': 'private'},
+            'text': params.get('text'),
+        }}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="telegram-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def self_signed_cert(directory):
+    """Create a localhost certificate with openssl; returns (certfile, keyfile)"""
+    cert, key = Path(directory) / 'stub.crt', Path(directory) / 'stub.key'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', str(key), '-out', str(cert), '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+    return str(cert), str(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Telegram Bot API server")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to sendMessage")
+    parser.add_argument('--retry-every', type=int, default=0, help="answer every Nth sendMessage with 429")
+    parser.add_argument('--blocked', default="", help="comma-separated chats answered with 403")
+    args = parser.parse_args()
+
+    server = StubTelegramServer(port=args.port, latency=args.latency, retry_every=args.retry_every,
+                                blocked_chats=[c for c in args.blocked.split(',') if c])
+    print(f"Stub Telegram API on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(dict(server.counters))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Accounts - per-chat positions, strategy thresholds and alert routing
+
+Each Telegram chat gets its own Position and Strategy. Accounts are spread
+over shards by chat ID, each shard with its own lock, so a command touches
+one shard and a tick evaluates every account against a single shared price
+batch in one pass.
+"""
+import copy
+import threading
+import zlib
+from core.position import Position
+from core.strategy import Strategy
+from core.trigger_index import event_key
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Strategy settings a chat may override
+THRESHOLD_KEYS = ('down_threshold', 'up_threshold', 'pre_buy_range')
+
+
+class Account: # vi the va chien luoc cua mot chat
+    __slots__ = ('chat_id', 'position', 'strategy', 'overrides')
+
+    def __init__(self, chat_id, config, state=None, overrides=None, cooldowns=None, indicators=None):
+        self.chat_id = str(chat_id)
+        self.overrides = {k: v for k, v in (overrides or {}).items() if k in THRESHOLD_KEYS}
+        account_config = copy.deepcopy(config)
+        account_config["strategy"].update(self.overrides)
+        self.position = Position.from_dict(config["symbol"], state or {})
+        self.strategy = Strategy(account_config, indicators=indicators,
+                                 cooldowns=cooldowns, chat_id=self.chat_id)
+
+    def set_thresholds(self, **thresholds): # ghi de nguong chien luoc cho chat nay
+        for key, value in thresholds.items():
+            if key not in THRESHOLD_KEYS:
+                raise ValueError(f"Unknown threshold: {key}")
+            if value < 0:
+                raise ValueError(f"{key} must be >= 0")
+            self.overrides[key] = value
+            self.strategy.config["strategy"][key] = value
+
+    def to_record(self):
+        return {**self.position.to_dict(), "strategy": dict(self.overrides)}
+
+
+class _Shard:
+    __slots__ = ('lock', 'accounts', 'records')
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.accounts = {}
+        self.records = None # ban ghi da serialize, None khi can tao lai
+
+
+class AccountRegistry: # cac tai khoan chia theo shard
+    def __init__(self, config, shards=16, cooldowns=None, indicators=None, allowed_chats=None):
+        """
+        Args:
+            config: Config.to_dict()-style base config
+            shards: Number of lock shards
+            cooldowns: CooldownTracker shared by every account (keys include the chat)
+            indicators: IndicatorBook shared by every account
+            allowed_chats: Chat IDs that may create accounts, None for any chat
+        """
+        self.config = config
+        self.cooldowns = cooldowns
+        self.indicators = indicators
+        self.allowed_chats = {str(c) for c in allowed_chats} if allowed_chats is not None else None
+        self._shards = [_Shard() for _ in range(shards)]
+        self._dormant = {} # ban ghi cua chat khong con duoc phep, giu lai de khong mat khi luu
+
+    def _shard(self, chat_id):
+        return self._shards[zlib.crc32(str(chat_id).encode()) % len(self._shards)]
+
+    def __len__(self):
+        return sum(len(s.accounts) for s in self._shards)
+
+    def is_allowed(self, chat_id):
+        return self.allowed_chats is None or str(chat_id) in self.allowed_chats
+
+    def get(self, chat_id):
+        shard = self._shard(chat_id)
+        with shard.lock:
+            return shard.accounts.get(str(chat_id))
+
+    def get_or_create(self, chat_id, state=None, overrides=None):
+        """
+        Account for a chat, created on first use
+
+        Raises:
+            PermissionError: If the chat is not allowed to use the bot
+        """
+        chat_id = str(chat_id)
+        shard = self._shard(chat_id)
+        with shard.lock:
+            account = shard.accounts.get(chat_id)
+            if account is None:
+                if not self.is_allowed(chat_id):
+                    raise PermissionError(f"Chat {chat_id} is not allowed")
+                account = Account(chat_id, self.config, state, overrides,
+                                  cooldowns=self.cooldowns, indicators=self.indicators)
+                shard.accounts[chat_id] = account
+                shard.records = None
+                logger.info(f"Account created for chat {chat_id}")
+            return account
+
+    def update(self, chat_id, fn):
+        """
+        Run fn(account) under the account's shard lock and mark it for saving
+
+        Returns:
+            Whatever fn returns
+        """
+        account = self.get_or_create(chat_id)
+        shard = self._shard(chat_id)
+        with shard.lock:
+            result = fn(account)
+            shard.records = None
+            return result
+
+    def accounts(self):
+        """Snapshot of all accounts"""
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(shard.accounts.values())
+        return result
+
+    def evaluate(self, prices, times=None):
+        """
+        Run every account's strategy against one shared price batch
+
+        Args:
+            prices: Dict of symbol -> price
+            times: Optional dict of symbol -> quote timestamp, for event keys
+
+        Returns:
+            list: (chat_id, kind, message, event key) for every alert that fired;
+                  the key (kind, symbol, level, quote time) is None without times
+        """
+        alerts = []
+        for shard in self._shards:
+            with shard.lock:
+                for account in shard.accounts.values():
+                    symbol = account.position.symbol.upper()
+                    price = prices.get(symbol)
+                    if price is None:
+                        continue
+                    for kind, msg in account.strategy.signals(price, account.position):
+                        key = None
+                        if times and symbol in times:
+                            key = event_key(kind, symbol, self._level(account, kind, price), times[symbol])
+                        alerts.append((account.chat_id, kind, msg, key))
+        return alerts
+
+    @staticmethod
+    def _level(account, kind, price): # muc gia da kich hoat; tin khong theo muc (pre_buy, RSI) dung gia
+        levels = account.strategy.trigger_levels(account.position)
+        if levels and kind in ("buy_more", "sell"):
+            return levels[0] if kind == "buy_more" else levels[1]
+        return price
+
+    def trigger_levels(self):
+        """Trigger levels of every account, for adaptive polling"""
+        levels = []
+        for shard in self._shards:
+            with shard.lock:
+                for account in shard.accounts.values():
+                    levels.extend(account.strategy.trigger_levels(account.position))
+        return levels
+
+    def load(self, data, default_chat_id=None):
+        """
+        Load accounts from DataStore data
+
+        Data saved before per-chat accounts (top-level "layers") is migrated
+        to default_chat_id. Accounts of chats no longer in allowed_chats are
+        not loaded but are kept in to_records().
+        """
+        for chat_id, record in data.get("accounts", {}).items():
+            if not self.is_allowed(chat_id):
+                self._dormant[str(chat_id)] = record
+                logger.warning(f"Chat {chat_id} is no longer allowed, keeping its saved account inactive")
+                continue
+            self.get_or_create(chat_id, record, record.get("strategy"))
+        if data.get("layers") and default_chat_id and not self.get(default_chat_id):
+            self.get_or_create(default_chat_id, {"layers": data["layers"]})
+            logger.info(f"Migrated {len(data['layers'])} legacy layers to chat {default_chat_id}")
+
+    def to_records(self):
+        """Serialized accounts; only shards changed since the last call are rebuilt"""
+        records = dict(self._dormant)
+        for shard in self._shards:
+            with shard.lock:
+                if shard.records is None:
+                    shard.records = {cid: a.to_record() for cid, a in shard.accounts.items()}
+                records.update(shard.records)
+        return records
@@ -0,0 +1,60 @@
+import math
+from collections import deque
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class AdaptivePoller: # tinh khoang thoi gian poll tiep theo theo khoang cach toi nguong
+    """
+    Pick the next poll interval from how close the price is to a trigger level
+
+    Within `band` (fraction of price) of any level, or when the stdev of recent
+    tick returns exceeds `volatility_threshold`, poll at `min` seconds. Further
+    away the interval grows linearly with distance, up to `max` seconds.
+    Levels on other symbols (alert rules) come as (price, level) targets and
+    are measured against their own symbol's price.
+    """
+
+    def __init__(self, config, window=20):
+        self.config = config
+        self.returns = deque(maxlen=window)
+        self.last_price = None
+
+    def observe(self, price): # cap nhat bien dong gia gan day
+        if self.last_price:
+            self.returns.append((price - self.last_price) / self.last_price)
+        self.last_price = price
+
+    def volatility(self): # do lech chuan cua loi suat moi tick
+        n = len(self.returns)
+        if n < 2:
+            return 0.0
+        mean = sum(self.returns) / n
+        return math.sqrt(sum((r - mean) ** 2 for r in self.returns) / (n - 1))
+
+    def next_interval(self, price, levels, targets=()):
+        poll = self.config["poll"]
+        if not poll["adaptive"]:
+            return poll["open"]
+
+        self.observe(price)
+
+        if self.volatility() >= poll["volatility_threshold"]:
+            logger.debug(f"High volatility ({self.volatility():.4f}), polling every {poll['min']}s")
+            return poll["min"]
+
+        # khoang cach tuong doi toi nguong gan nhat, moi nguong so voi gia cua ma do
+        distances = [abs(price - level) / price for level in levels if price > 0]
+        distances += [abs(target - level) / target for target, level in targets if target > 0]
+        if not distances:
+            return poll["max"]
+
+        distance = min(distances)
+        band = poll["band"]
+        if distance <= band:
+            interval = poll["min"]
+        else:
+            interval = min(poll["max"], poll["min"] * distance / band)
+
+        logger.debug(f"Nearest trigger {distance:.2%} away, next poll in {interval:.0f}s")
+        return interval
@@ -0,0 +1,179 @@
+"""
+Alert Rules - user-defined price alerts
+
+Rules are fixed price levels (`SHB >= 16500`) or percent moves from the price
+when the rule was created (`SHB pct -3`). All levels of a symbol live in a
+TriggerIndex, so a tick costs a bisect regardless of the number of rules, and
+rules are edge-triggered: they fire when the price crosses the level between
+two polls, not on every poll while it stays beyond it.
+"""
+import html
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+from core.trigger_index import ABOVE, BELOW, TriggerIndex
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+OPERATORS = {'>=': ABOVE, '<=': BELOW}
+
+
+@dataclass
+class AlertRule:
+    id: int
+    symbol: str
+    op: str # '>=', '<=' hoac 'pct'
+    value: float # muc gia, hoac phan tram voi 'pct'
+    level: float # muc gia kich hoat da tinh san
+    direction: str # ABOVE / BELOW
+    base_price: Optional[float] = None # gia luc tao rule 'pct'
+    chat_id: Optional[str] = None
+    created: float = 0.0
+    fired: int = 0
+
+    def describe(self):
+        if self.op == 'pct':
+            return f"#{self.id} {self.symbol} {self.value:+g}% (từ {self.base_price:,.0f} → {self.level:,.0f})"
+        return f"#{self.id} {self.symbol} {self.op} {self.level:,.0f}"
+
+
+class AlertRuleBook: # quan ly cac rule canh bao va danh gia theo tick
+    def __init__(self, records=None):
+        self._lock = threading.Lock()
+        self._rules = {}
+        self._by_symbol = {}
+        self._last_price = {} # gia tick truoc cua moi ma, de phat hien cat qua
+        self.index = TriggerIndex()
+        self.next_id = 1
+
+        for record in records or []:
+            rule = AlertRule(**record)
+            self._rules[rule.id] = rule
+            self._by_symbol.setdefault(rule.symbol, set()).add(rule.id)
+            self.next_id = max(self.next_id, rule.id + 1)
+        for symbol in self._by_symbol:
+            self._reindex(symbol)
+
+    def __len__(self):
+        return len(self._rules)
+
+    @staticmethod
+    def parse(symbol, op, value, base_price=None):
+        """
+        Validate rule arguments
+
+        Returns:
+            tuple: (symbol, op, value, level, direction)
+
+        Raises:
+            ValueError: If the operator or value is invalid
+        """
+        symbol = symbol.strip().upper()
+        value = float(value)
+        if not symbol.isalnum():
+            raise ValueError(f"Invalid symbol: {symbol}")
+
+        if op == 'pct':
+            if value == 0 or value <= -100:
+                raise ValueError("Percent must be non-zero and greater than -100")
+            if not base_price:
+                raise ValueError(f"No reference price for {symbol}")
+            level = base_price * (1 + value / 100)
+            return symbol, op, value, level, ABOVE if value > 0 else BELOW
+
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op} (use >=, <= or pct)")
+        if value <= 0:
+            raise ValueError("Price must be positive")
+        return symbol, op, value, value, OPERATORS[op]
+
+    def add(self, symbol, op, value, base_price=None, chat_id=None):
+        """Create a rule; raises ValueError on invalid input"""
+        symbol, op, value, level, direction = self.parse(symbol, op, value, base_price)
+        with self._lock:
+            rule = AlertRule(
+                id=self.next_id, symbol=symbol, op=op, value=value, level=level,
+                direction=direction, base_price=base_price if op == 'pct' else None,
+                chat_id=chat_id, created=time.time(),
+            )
+            self.next_id += 1
+            self._rules[rule.id] = rule
+            self._by_symbol.setdefault(symbol, set()).add(rule.id)
+            self._reindex(symbol)
+        logger.info(f"Alert rule added: {rule.describe()}")
+        return rule
+
+    def remove(self, rule_id):
+        """Delete a rule; returns it, or None if unknown"""
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule:
+                self._by_symbol[rule.symbol].discard(rule_id)
+                if not self._by_symbol[rule.symbol]:
+                    del self._by_symbol[rule.symbol]
+                self._reindex(rule.symbol)
+        if rule:
+            logger.info(f"Alert rule removed: {rule.describe()}")
+        return rule
+
+    def rules(self, symbol=None, chat_id=None):
+        with self._lock:
+            rules = list(self._rules.values())
+        return [
+            r for r in sorted(rules, key=lambda r: r.id)
+            if (symbol is None or r.symbol == symbol) and (chat_id is None or r.chat_id == chat_id)
+        ]
+
+    def symbols(self):
+        with self._lock:
+            return list(self._by_symbol)
+
+    def trigger_levels(self, prices):
+        """(price, level) for every rule whose symbol has a price, for adaptive polling"""
+        with self._lock:
+            return [
+                (prices[symbol], level)
+                for symbol in self._by_symbol if symbol in prices
+                for level, _, _ in self.index.levels(symbol)
+            ]
+
+    def _reindex(self, symbol): # xay lai chi muc cua mot ma khi rule thay doi
+        ids = self._by_symbol.get(symbol)
+        if not ids:
+            self.index.remove(symbol)
+            return
+        self.index.rebuild(symbol, [(self._rules[i].level, self._rules[i].direction, i) for i in ids])
+
+    def evaluate(self, symbol, price):
+        """
+        Feed a new price for a symbol
+
+        Returns:
+            list: (rule, message) for every rule whose level was crossed since
+                  the previous price of this symbol
+        """
+        with self._lock:
+            prev = self._last_price.get(symbol)
+            self._last_price[symbol] = price
+            crossed = self.index.crossed(symbol, prev, price)
+            fired = []
+            for _, _, rule_id in crossed:
+                rule = self._rules[rule_id]
+                rule.fired += 1
+                fired.append(rule)
+
+        alerts = []
+        for rule in fired:
+            arrow = "📈" if rule.direction == ABOVE else "📉"
+            msg = ( # Notifier gui voi parse_mode HTML, '<=' phai escape
+                f"{arrow} Cảnh báo {html.escape(rule.describe(), quote=False)}\n"
+                f"Giá hiện tại: {price:,.0f} VND"
+            )
+            logger.info(f"Alert rule fired - {msg}")
+            alerts.append((rule, msg))
+        return alerts
+
+    def to_records(self): # du lieu de luu vao DataStore
+        return [asdict(r) for r in self.rules()]
@@ -0,0 +1,205 @@
+"""
+Backtest - replay historical prices through Strategy and Position
+
+Streams tick (time,price) or OHLC (time,open,high,low,close) rows from CSV,
+advances a simulated clock so Strategy cooldowns behave as they would live,
+and optionally trades on the alerts: pre_buy / buy_more / rsi_buy_more add
+a lot, sell closes the position. Streaming indicators are fed every tick.
+
+Usage:
+    python -m core.backtest prices.csv --lot 1000
+    python -m core.backtest prices.csv --sweep-down 0.2,0.3,0.5 --sweep-up 0.5,1.0
+"""
+import argparse
+import copy
+import csv
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from core.config import Config
+from core.indicators import IndicatorBook
+from core.position import Position
+from core.strategy import Strategy
+
+
+class SimulatedClock: # dong ho mo phong cho backtest
+    def __init__(self, start=None):
+        self.current = start or datetime.min
+
+    def now(self):
+        return self.current
+
+    def monotonic(self): # giay, cho CooldownTracker
+        current = self.current
+        if current.tzinfo is not None: # ISO co offset: quy ve UTC naive de tru voi datetime.min
+            current = current.astimezone(timezone.utc).replace(tzinfo=None)
+        return (current - datetime.min).total_seconds()
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def load_ticks(path, intrabar=True):
+    """
+    Stream (datetime, price) ticks from a CSV file
+
+    Accepts a `price` column (tick data) or `open,high,low,close` columns
+    (bars). With intrabar=True each bar yields open, then low/high in the
+    order the bar most likely traded them, then close; otherwise only close.
+    The time column may be ISO 8601 or epoch seconds.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader)]
+        col = {name: i for i, name in enumerate(header)}
+        t_col = col.get('time', col.get('timestamp', col.get('date', 0)))
+
+        if 'price' in col:
+            p_col = col['price']
+            for row in reader:
+                yield _parse_time(row[t_col]), float(row[p_col])
+            return
+
+        o, h, l, c = col['open'], col['high'], col['low'], col['close']
+        for row in reader:
+            ts = _parse_time(row[t_col])
+            close = float(row[c])
+            if intrabar:
+                open_, high, low = float(row[o]), float(row[h]), float(row[l])
+                yield ts, open_
+                # Bar closing up most likely visited its low first
+                first, second = (low, high) if close >= open_ else (high, low)
+                yield ts, first
+                yield ts, second
+            yield ts, close
+
+
+@dataclass
+class BacktestReport:
+    ticks: int = 0
+    alerts: list = field(default_factory=list)
+    buys: int = 0
+    sells: int = 0
+    realized_pnl: float = 0.0
+    unrealized_pnl: float = 0.0
+    final_quantity: int = 0
+    final_avg: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def ticks_per_sec(self):
+        return self.ticks / self.elapsed if self.elapsed else 0.0
+
+    def alert_counts(self):
+        counts = {}
+        for _, kind, _ in self.alerts:
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def summary(self):
+        counts = ", ".join(f"{k}: {v}" for k, v in sorted(self.alert_counts().items())) or "none"
+        return (
+            f"Ticks: {self.ticks:,} in {self.elapsed:.2f}s ({self.ticks_per_sec:,.0f} ticks/s)\n"
+            f"Alerts: {len(self.alerts)} ({counts})\n"
+            f"Trades: {self.buys} buys, {self.sells} sells\n"
+            f"Realized P&L: {self.realized_pnl:,.0f} VND\n"
+            f"Unrealized P&L: {self.unrealized_pnl:,.0f} VND "
+            f"({self.final_quantity:,} CP @ {self.final_avg:,.2f})"
+        )
+
+
+class Backtester:
+    def __init__(self, config, lot_size=1000, trade=True, position=None):
+        """
+        Args:
+            config: Config.to_dict()-style dict (symbol, strategy thresholds)
+            lot_size: Quantity bought on each pre_buy / buy_more alert
+            trade: Act on alerts; if False only alerts are recorded
+            position: Starting Position (default: empty)
+        """
+        self.config = config
+        self.lot_size = lot_size
+        self.trade = trade
+        self.position = position
+
+    def run(self, ticks):
+        clock = SimulatedClock()
+        indicators = IndicatorBook(self.config)
+        strategy = Strategy(self.config, clock=clock.monotonic, indicators=indicators)
+
+        symbol = self.config["symbol"]
+        update_indicators = indicators.get(symbol).update
+        position = copy.deepcopy(self.position) if self.position else Position(symbol)
+        report = BacktestReport()
+        signals = strategy.signals
+        price = 0.0
+
+        started = time.perf_counter()
+        for ts, price in ticks:
+            clock.current = ts
+            report.ticks += 1
+            update_indicators(price)
+            for kind, _ in signals(price, position):
+                report.alerts.append((ts, kind, price))
+                if not self.trade:
+                    continue
+                if kind == "sell":
+                    report.realized_pnl += position.sell(price, position.total_quantity()).pnl
+                    report.sells += 1
+                else:
+                    position.add_layer(price, self.lot_size)
+                    report.buys += 1
+        report.elapsed = time.perf_counter() - started
+
+        report.final_quantity = position.total_quantity()
+        report.final_avg = position.average_price()
+        report.unrealized_pnl = (price - report.final_avg) * report.final_quantity
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay CSV prices through Strategy")
+    parser.add_argument('csv', help="CSV with time,price or time,open,high,low,close columns")
+    parser.add_argument('--lot', type=int, default=1000, help="quantity per buy (default: 1000)")
+    parser.add_argument('--no-trade', action='store_true', help="only record alerts")
+    parser.add_argument('--close-only', action='store_true', help="use bar closes only")
+    parser.add_argument('--down', type=float, default=Config.STRATEGY_DOWN_THRESHOLD)
+    parser.add_argument('--up', type=float, default=Config.STRATEGY_UP_THRESHOLD)
+    parser.add_argument('--sweep-down', help="comma-separated down thresholds to sweep")
+    parser.add_argument('--sweep-up', help="comma-separated up thresholds to sweep")
+    args = parser.parse_args()
+
+    # Per-alert INFO logs would dominate the runtime
+    logging.getLogger('core.strategy').setLevel(logging.WARNING)
+
+    base = Config.to_dict()
+    downs = [float(v) for v in args.sweep_down.split(',')] if args.sweep_down else [args.down]
+    ups = [float(v) for v in args.sweep_up.split(',')] if args.sweep_up else [args.up]
+
+    if len(downs) * len(ups) == 1:
+        base["strategy"].update(down_threshold=downs[0], up_threshold=ups[0])
+        report = Backtester(base, lot_size=args.lot, trade=not args.no_trade).run(
+            load_ticks(args.csv, intrabar=not args.close_only)
+        )
+        print(report.summary())
+        return
+
+    # Sweeps replay the same ticks, so load them once
+    ticks = list(load_ticks(args.csv, intrabar=not args.close_only))
+    print(f"{'down':>8}{'up':>8}{'alerts':>8}{'buys':>6}{'sells':>6}{'realized':>16}{'unrealized':>16}")
+    for down, up in itertools.product(downs, ups):
+        config = copy.deepcopy(base)
+        config["strategy"].update(down_threshold=down, up_threshold=up)
+        r = Backtester(config, lot_size=args.lot, trade=not args.no_trade).run(ticks)
+        print(f"{down:>8g}{up:>8g}{len(r.alerts):>8}{r.buys:>6}{r.sells:>6}"
+              f"{r.realized_pnl:>16,.0f}{r.unrealized_pnl:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
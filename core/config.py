@@ -10,19 +10,54 @@ class Config:
     # Telegram
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    # Shared HTTP pool for all Telegram calls; API URL can point at a stub server
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+    # Channel/subscriber chats that receive price reports and the main chat's alerts
+    TELEGRAM_BROADCAST_CHAT_IDS = list(dict.fromkeys(
+        c.strip() for c in os.getenv('TELEGRAM_BROADCAST_CHAT_IDS', '').split(',') if c.strip()
+    ))
+    TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', '8'))
+    TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', '4'))
+    TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', '5'))
+    TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', '10'))
+    TELEGRAM_POOL_TIMEOUT = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '10'))
+    # Chats allowed to use the bot (own positions/thresholds), always includes
+    # TELEGRAM_CHAT_ID; '*' allows any chat
+    TELEGRAM_ALLOWED_CHAT_IDS = None if os.getenv('TELEGRAM_ALLOWED_CHAT_IDS', '').strip() == '*' else list(dict.fromkeys(
+        [str(TELEGRAM_CHAT_ID)] +
+        [c.strip() for c in os.getenv('TELEGRAM_ALLOWED_CHAT_IDS', '').split(',') if c.strip()]
+    ))
     
     # Stock
     STOCK_SYMBOL = os.getenv('STOCK_SYMBOL', 'SHB')
+    # Watchlist: comma-separated symbols polled together, always includes STOCK_SYMBOL
+    STOCK_WATCHLIST = list(dict.fromkeys(
+        [STOCK_SYMBOL.upper()] +
+        [s.strip().upper() for s in os.getenv('STOCK_WATCHLIST', '').split(',') if s.strip()]
+    ))
     
     # Market
     MARKET_TIMEZONE = os.getenv('MARKET_TIMEZONE', 'Asia/Ho_Chi_Minh')
     MARKET_DAYS = [int(d) for d in os.getenv('MARKET_DAYS', '0,1,2,3,4').split(',')]
     MARKET_OPEN_TIME = os.getenv('MARKET_OPEN_TIME', '09:15')
     MARKET_CLOSE_TIME = os.getenv('MARKET_CLOSE_TIME', '14:45')
+    # Trading sessions, comma-separated HH:MM-HH:MM (default: lunch break 11:30-13:00)
+    MARKET_SESSIONS = os.getenv('MARKET_SESSIONS', f'{MARKET_OPEN_TIME}-11:30,13:00-{MARKET_CLOSE_TIME}')
+    # Closed dates (YYYY-MM-DD, comma-separated) on top of 1/1, 30/4, 1/5 and 2/9
+    MARKET_HOLIDAYS = [d.strip() for d in os.getenv('MARKET_HOLIDAYS', '').split(',') if d.strip()]
     
     # Polling
     POLL_INTERVAL_OPEN = int(os.getenv('POLL_INTERVAL_OPEN', '60'))
     POLL_INTERVAL_CLOSED = int(os.getenv('POLL_INTERVAL_CLOSED', '300'))
+    # Adaptive polling: poll fast near trigger levels or in volatile markets, slow otherwise
+    POLL_ADAPTIVE = os.getenv('POLL_ADAPTIVE', 'false').lower() == 'true'
+    POLL_INTERVAL_MIN = int(os.getenv('POLL_INTERVAL_MIN', '15'))
+    POLL_INTERVAL_MAX = int(os.getenv('POLL_INTERVAL_MAX', '180'))
+    POLL_ADAPTIVE_BAND = float(os.getenv('POLL_ADAPTIVE_BAND', '0.01'))
+    POLL_VOLATILITY_THRESHOLD = float(os.getenv('POLL_VOLATILITY_THRESHOLD', '0.005'))
+    
+    # Run mode: 'sync' (blocking loop) or 'async' (asyncio engine with queues)
+    RUN_MODE = os.getenv('RUN_MODE', 'sync').lower()
     
     # Strategy
     STRATEGY_PRE_BUY_RANGE = float(os.getenv('STRATEGY_PRE_BUY_RANGE', '0.05'))
@@ -30,11 +65,56 @@ class Config:
     STRATEGY_DOWN_THRESHOLD = float(os.getenv('STRATEGY_DOWN_THRESHOLD', '0.3'))
     STRATEGY_UP_THRESHOLD = float(os.getenv('STRATEGY_UP_THRESHOLD', '0.5'))
     STRATEGY_COOLDOWN_MINUTES = int(os.getenv('STRATEGY_COOLDOWN_MINUTES', '15'))
+    STRATEGY_RSI_OVERSOLD = float(os.getenv('STRATEGY_RSI_OVERSOLD', '30'))
+    
+    # Lot matching for /sell: 'avg' (average cost) or 'fifo'
+    POSITION_COST_METHOD = os.getenv('POSITION_COST_METHOD', 'avg').lower()
+    
+    # Streaming indicators (periods count polls)
+    INDICATOR_EMA_PERIOD = int(os.getenv('INDICATOR_EMA_PERIOD', '20'))
+    INDICATOR_RSI_PERIOD = int(os.getenv('INDICATOR_RSI_PERIOD', '14'))
+    INDICATOR_ATR_PERIOD = int(os.getenv('INDICATOR_ATR_PERIOD', '14'))
+    
+    # Notifications: async mode queues messages and sends them from a worker,
+    # rate limited globally and per chat (Telegram: ~30 msg/s, ~1 msg/s per chat)
+    NOTIFY_ASYNC = os.getenv('NOTIFY_ASYNC', 'true').lower() == 'true'
+    NOTIFY_QUEUE_SIZE = int(os.getenv('NOTIFY_QUEUE_SIZE', '1000'))
+    NOTIFY_GLOBAL_RATE = float(os.getenv('NOTIFY_GLOBAL_RATE', '30'))
+    NOTIFY_CHAT_RATE = float(os.getenv('NOTIFY_CHAT_RATE', '1'))
+    NOTIFY_CHAT_BURST = int(os.getenv('NOTIFY_CHAT_BURST', '3'))
+    NOTIFY_WORKERS = int(os.getenv('NOTIFY_WORKERS', '4'))
+    NOTIFY_DRAIN_TIMEOUT = float(os.getenv('NOTIFY_DRAIN_TIMEOUT', '10'))
+    # Digest: a chat's alerts/price reports within this many seconds go out as one
+    # message (0 = off); urgent kinds skip the window. Done by the outbox when it is on
+    NOTIFY_COALESCE_WINDOW = float(os.getenv('NOTIFY_COALESCE_WINDOW', '60'))
+    NOTIFY_URGENT_KINDS = [k.strip() for k in os.getenv('NOTIFY_URGENT_KINDS', 'buy_more,sell,alert').split(',') if k.strip()]
+    # Outbox: every notification is stored here before sending and retried until
+    # delivered (empty = off); rows older than OUTBOX_MAX_AGE seconds are given up
+    OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'storage/outbox.db')
+    OUTBOX_MAX_ROWS = int(os.getenv('OUTBOX_MAX_ROWS', '10000'))
+    OUTBOX_MAX_AGE = float(os.getenv('OUTBOX_MAX_AGE', '86400'))
     
     # API
-    STOCK_API_PROVIDER = os.getenv('STOCK_API_PROVIDER', 'vnd')
+    # Providers in priority order, comma-separated (vnstock/vnd/ssi, file, http)
+    STOCK_API_PROVIDER = [p.strip().lower() for p in os.getenv('STOCK_API_PROVIDER', 'vnd').split(',') if p.strip()]
     STOCK_API_TIMEOUT = int(os.getenv('STOCK_API_TIMEOUT', '10'))
     STOCK_API_MAX_RETRIES = int(os.getenv('STOCK_API_MAX_RETRIES', '3'))
+    STOCK_API_BREAKER_THRESHOLD = int(os.getenv('STOCK_API_BREAKER_THRESHOLD', '5'))
+    STOCK_API_BREAKER_RECOVERY = int(os.getenv('STOCK_API_BREAKER_RECOVERY', '30'))
+    STOCK_API_HEDGE_PERCENTILE = float(os.getenv('STOCK_API_HEDGE_PERCENTILE', '95'))
+    STOCK_API_FAILOVER_ERRORS = int(os.getenv('STOCK_API_FAILOVER_ERRORS', '3'))
+    STOCK_API_FAILOVER_COOLDOWN = int(os.getenv('STOCK_API_FAILOVER_COOLDOWN', '60'))
+    STOCK_STUB_FILE = os.getenv('STOCK_STUB_FILE', 'storage/stub_prices.json')
+    STOCK_STUB_URL = os.getenv('STOCK_STUB_URL', 'http://localhost:8000/prices.json')
+    
+    # Price cache (stale TTL 0 = no stale-while-revalidate, max entries 0 = unbounded)
+    PRICE_CACHE_TTL = int(os.getenv('PRICE_CACHE_TTL', '7'))
+    PRICE_CACHE_STALE_TTL = int(os.getenv('PRICE_CACHE_STALE_TTL', '0'))
+    PRICE_CACHE_MAX_ENTRIES = int(os.getenv('PRICE_CACHE_MAX_ENTRIES', '0'))
+    
+    # In-memory price history: samples kept per symbol (0 = off), window for updates
+    PRICE_HISTORY_CAPACITY = int(os.getenv('PRICE_HISTORY_CAPACITY', '8192'))
+    PRICE_HISTORY_WINDOW_MINUTES = int(os.getenv('PRICE_HISTORY_WINDOW_MINUTES', '60'))
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -57,6 +137,13 @@ class Config:
         if not cls.TELEGRAM_CHAT_ID or cls.TELEGRAM_CHAT_ID == 'PUT_YOUR_CHAT_ID_HERE':
             errors.append("TELEGRAM_CHAT_ID is not set")
         
+        # Long polling has its own connection; replies and alerts share this pool
+        if cls.TELEGRAM_POOL_SIZE < 1:
+            errors.append("TELEGRAM_POOL_SIZE must be >= 1")
+        
+        if cls.TELEGRAM_WORKERS < 1:
+            errors.append("TELEGRAM_WORKERS must be >= 1")
+        
         if cls.STRATEGY_DOWN_THRESHOLD < 0:
             errors.append("STRATEGY_DOWN_THRESHOLD must be >= 0")
         
@@ -69,6 +156,57 @@ class Config:
         if cls.POLL_INTERVAL_CLOSED < 1:
             errors.append("POLL_INTERVAL_CLOSED must be >= 1")
         
+        if not cls.STOCK_API_PROVIDER:
+            errors.append("STOCK_API_PROVIDER is not set")
+        
+        if not 0 < cls.STOCK_API_HEDGE_PERCENTILE <= 100:
+            errors.append("STOCK_API_HEDGE_PERCENTILE must be in (0, 100]")
+        
+        if cls.PRICE_CACHE_STALE_TTL and cls.PRICE_CACHE_STALE_TTL < cls.PRICE_CACHE_TTL:
+            errors.append("PRICE_CACHE_STALE_TTL must be 0 or >= PRICE_CACHE_TTL")
+        
+        if cls.POLL_ADAPTIVE and not 1 <= cls.POLL_INTERVAL_MIN <= cls.POLL_INTERVAL_MAX:
+            errors.append("POLL_INTERVAL_MIN must be >= 1 and <= POLL_INTERVAL_MAX")
+        
+        if cls.POLL_ADAPTIVE and cls.POLL_ADAPTIVE_BAND <= 0:
+            errors.append("POLL_ADAPTIVE_BAND must be > 0")
+        
+        if cls.PRICE_HISTORY_CAPACITY < 0:
+            errors.append("PRICE_HISTORY_CAPACITY must be >= 0")
+        
+        if not 0 <= cls.STRATEGY_RSI_OVERSOLD < 100:
+            errors.append("STRATEGY_RSI_OVERSOLD must be in [0, 100)")
+        
+        if min(cls.INDICATOR_EMA_PERIOD, cls.INDICATOR_RSI_PERIOD, cls.INDICATOR_ATR_PERIOD) < 1:
+            errors.append("INDICATOR_*_PERIOD must be >= 1")
+        
+        if cls.POSITION_COST_METHOD not in ('avg', 'fifo'):
+            errors.append("POSITION_COST_METHOD must be 'avg' or 'fifo'")
+        
+        try:
+            from core.market_time import MarketCalendar
+            MarketCalendar(cls.MARKET_TIMEZONE, cls.MARKET_DAYS, cls.MARKET_SESSIONS, cls.MARKET_HOLIDAYS)
+        except Exception as e:
+            errors.append(f"Invalid market calendar (MARKET_TIMEZONE/SESSIONS/HOLIDAYS): {e}")
+        
+        if cls.NOTIFY_ASYNC and cls.NOTIFY_QUEUE_SIZE < 1:
+            errors.append("NOTIFY_QUEUE_SIZE must be >= 1")
+        
+        if cls.NOTIFY_GLOBAL_RATE <= 0 or cls.NOTIFY_CHAT_RATE <= 0 or cls.NOTIFY_CHAT_BURST < 1:
+            errors.append("NOTIFY_GLOBAL_RATE/NOTIFY_CHAT_RATE must be > 0 and NOTIFY_CHAT_BURST >= 1")
+        
+        if cls.NOTIFY_WORKERS < 1:
+            errors.append("NOTIFY_WORKERS must be >= 1")
+        
+        if cls.NOTIFY_COALESCE_WINDOW < 0:
+            errors.append("NOTIFY_COALESCE_WINDOW must be >= 0")
+        
+        if cls.OUTBOX_FILE and (cls.OUTBOX_MAX_ROWS < 1 or cls.OUTBOX_MAX_AGE <= 0):
+            errors.append("OUTBOX_MAX_ROWS must be >= 1 and OUTBOX_MAX_AGE > 0")
+        
+        if cls.RUN_MODE not in ('sync', 'async'):
+            errors.append("RUN_MODE must be 'sync' or 'async'")
+        
         if errors:
             raise ValueError("Configuration errors:\n" + "\n".join(f"  - {e}" for e in errors))
     
@@ -77,15 +215,23 @@ class Config:
         """Convert config to dict for legacy compatibility"""
         return {
             'symbol': cls.STOCK_SYMBOL,
+            'watchlist': cls.STOCK_WATCHLIST,
             'market': {
                 'timezone': cls.MARKET_TIMEZONE,
                 'days': cls.MARKET_DAYS,
                 'open': cls.MARKET_OPEN_TIME,
                 'close': cls.MARKET_CLOSE_TIME,
+                'sessions': cls.MARKET_SESSIONS,
+                'holidays': cls.MARKET_HOLIDAYS,
             },
             'poll': {
                 'open': cls.POLL_INTERVAL_OPEN,
                 'closed': cls.POLL_INTERVAL_CLOSED,
+                'adaptive': cls.POLL_ADAPTIVE,
+                'min': cls.POLL_INTERVAL_MIN,
+                'max': cls.POLL_INTERVAL_MAX,
+                'band': cls.POLL_ADAPTIVE_BAND,
+                'volatility_threshold': cls.POLL_VOLATILITY_THRESHOLD,
             },
             'strategy': {
                 'pre_buy_range': cls.STRATEGY_PRE_BUY_RANGE,
@@ -93,6 +239,12 @@ class Config:
                 'down_threshold': cls.STRATEGY_DOWN_THRESHOLD,
                 'up_threshold': cls.STRATEGY_UP_THRESHOLD,
                 'cooldown_minutes': cls.STRATEGY_COOLDOWN_MINUTES,
+                'rsi_oversold': cls.STRATEGY_RSI_OVERSOLD,
+            },
+            'indicators': {
+                'ema': cls.INDICATOR_EMA_PERIOD,
+                'rsi': cls.INDICATOR_RSI_PERIOD,
+                'atr': cls.INDICATOR_ATR_PERIOD,
             },
             'telegram': {
                 'token': cls.TELEGRAM_BOT_TOKEN,
@@ -0,0 +1,110 @@
+"""
+Cooldown Tracker - per (chat, symbol, rule) notification cooldowns
+
+Times come from an injectable monotonic clock in seconds, so wall-clock
+jumps do not matter and backtests can drive a simulated clock. Expired
+entries are dropped by a hashed timing wheel as the clock advances, so
+memory is bounded by the keys notified within one cooldown period.
+"""
+import math
+import threading
+import time
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CooldownTracker: # quan ly thoi gian cho giua cac thong bao
+    def __init__(self, cooldown_seconds=900, clock=time.monotonic, resolution=1.0, slots=1024):
+        """
+        Args:
+            cooldown_seconds: Default cooldown after an allowed notification
+            clock: Monotonic time source in seconds
+            resolution: Seconds per wheel slot
+            slots: Wheel size; entries further out wait extra rotations
+        """
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.resolution = resolution
+        self._slots = [set() for _ in range(slots)]
+        self._expires = {} # key -> thoi diem het cooldown
+        self._tick = None # o dau tien chua quet
+        self._lock = threading.Lock()
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._expires)
+
+    def _slot(self, expires):
+        return self._slots[int(expires // self.resolution) % len(self._slots)]
+
+    def _advance(self, now): # quet cac o da qua, xoa key het han
+        tick = int(now // self.resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+        if tick <= self._tick:
+            return
+
+        # Sweep only slots whose whole interval is in the past
+        steps = min(tick - self._tick, len(self._slots))
+        for t in range(tick - steps, tick):
+            slot = self._slots[t % len(self._slots)]
+            if not slot:
+                continue
+            # Keys in this slot may belong to a later rotation
+            for key in [k for k in slot if self._expires[k] < now]:
+                slot.discard(key)
+                del self._expires[key]
+                self.expired += 1
+        self._tick = tick
+
+    def allow(self, key, cooldown_seconds=None):
+        """
+        Allow a notification for key unless it is cooling down
+
+        An allowed call starts a new cooldown. Like the previous behaviour,
+        a notification is allowed once strictly more than the cooldown passed.
+
+        Args:
+            key: Hashable key, normally (chat_id, symbol, rule)
+            cooldown_seconds: Override the default cooldown
+
+        Returns:
+            bool: True if the caller may notify
+        """
+        cooldown = self.cooldown_seconds if cooldown_seconds is None else cooldown_seconds
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+
+            expires = self._expires.get(key)
+            if expires is not None and now <= expires:
+                logger.debug(f"Notification blocked for key: {key}, cooldown remaining: {math.ceil(expires - now)}s")
+                return False
+
+            if expires is not None:
+                self._slot(expires).discard(key)
+            expires = now + cooldown
+            self._expires[key] = expires
+            self._slot(expires).add(key)
+            logger.debug(f"Notification allowed for key: {key}")
+            return True
+
+    def remaining(self, key):
+        """Seconds until key may notify again (0 if not cooling down)"""
+        with self._lock:
+            expires = self._expires.get(key)
+            return max(0.0, expires - self.clock()) if expires is not None else 0.0
+
+    def reset(self, key=None):
+        """Clear one key, or every key"""
+        with self._lock:
+            if key is None:
+                self._expires.clear()
+                for slot in self._slots:
+                    slot.clear()
+                return
+            expires = self._expires.pop(key, None)
+            if expires is not None:
+                self._slot(expires).discard(key)
@@ -0,0 +1,201 @@
+"""
+Streaming technical indicators
+
+Every indicator keeps only running state and updates in O(1) per new price
+(or bar); nothing is recomputed over a history window. Periods count
+updates, i.e. polls in the live bot or ticks/bars in a backtest.
+"""
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EMA: # trung binh dong ham mu
+    __slots__ = ('period', 'alpha', 'value', 'count', '_seed')
+
+    def __init__(self, period=20):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+        self.count = 0
+        self._seed = 0.0
+
+    def update(self, price):
+        self.count += 1
+        if self.count <= self.period:
+            # Seed with the simple average of the first `period` prices
+            self._seed += price
+            if self.count == self.period:
+                self.value = self._seed / self.period
+            return self.value
+        self.value += self.alpha * (price - self.value)
+        return self.value
+
+
+class RSI: # chi so suc manh tuong doi (Wilder)
+    __slots__ = ('period', 'value', 'count', 'avg_gain', 'avg_loss', 'prev')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.prev = None
+
+    def update(self, price):
+        if self.prev is None:
+            self.prev = price
+            return None
+        change = price - self.prev
+        self.prev = price
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        self.count += 1
+        if self.count <= self.period:
+            # Simple average of the first `period` changes, then Wilder smoothing
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return None
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.period
+            self.avg_loss += (loss - self.avg_loss) / self.period
+
+        if self.avg_loss == 0:
+            self.value = 100.0 if self.avg_gain > 0 else 50.0
+        else:
+            self.value = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        return self.value
+
+
+class VWAP: # gia trung binh theo khoi luong trong phien
+    __slots__ = ('pv', 'volume', 'value')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pv = 0.0
+        self.volume = 0.0
+        self.value = None
+
+    def update(self, price, volume=1.0):
+        if volume <= 0:
+            return self.value
+        self.pv += price * volume
+        self.volume += volume
+        self.value = self.pv / self.volume
+        return self.value
+
+
+class ATR: # bien do dao dong thuc trung binh (Wilder)
+    __slots__ = ('period', 'value', 'count', 'prev_close', '_seed')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = None
+        self.count = 0
+        self.prev_close = None
+        self._seed = 0.0
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+
+        self.count += 1
+        if self.count <= self.period:
+            self._seed += true_range
+            if self.count == self.period:
+                self.value = self._seed / self.period
+            return self.value
+        self.value += (true_range - self.value) / self.period
+        return self.value
+
+
+class IndicatorSet: # bo chi bao cua mot ma
+    """
+    EMA, RSI, VWAP and ATR for one symbol
+
+    With tick prices ATR uses the move from the previous price as the true
+    range. `volume` is the cumulative session volume from the price board:
+    VWAP is weighted by its increase since the last update and resets when it
+    drops (new session). Without volume every update has weight 1.
+    """
+
+    __slots__ = ('ema', 'rsi', 'vwap', 'atr', 'last_price', '_last_volume')
+
+    def __init__(self, ema_period=20, rsi_period=14, atr_period=14):
+        self.ema = EMA(ema_period)
+        self.rsi = RSI(rsi_period)
+        self.vwap = VWAP()
+        self.atr = ATR(atr_period)
+        self.last_price = None
+        self._last_volume = None
+
+    def update(self, price, volume=None, high=None, low=None):
+        self.ema.update(price)
+        self.rsi.update(price)
+        self.atr.update(price if high is None else high, price if low is None else low, price)
+
+        if volume is None:
+            self.vwap.update(price)
+        else:
+            if self._last_volume is None or volume < self._last_volume:
+                self.vwap.reset()
+                self._last_volume = 0
+            self.vwap.update(price, volume - self._last_volume)
+            self._last_volume = volume
+        self.last_price = price
+
+    def values(self):
+        return {
+            'ema': self.ema.value,
+            'rsi': self.rsi.value,
+            'vwap': self.vwap.value,
+            'atr': self.atr.value,
+        }
+
+
+class IndicatorBook: # chi bao cho tung ma trong danh sach theo doi
+    def __init__(self, config=None):
+        periods = (config or {}).get("indicators", {})
+        self.ema_period = periods.get("ema", 20)
+        self.rsi_period = periods.get("rsi", 14)
+        self.atr_period = periods.get("atr", 14)
+        self._sets = {}
+
+    def get(self, symbol):
+        symbol = symbol.upper()
+        indicators = self._sets.get(symbol)
+        if indicators is None:
+            indicators = self._sets[symbol] = IndicatorSet(self.ema_period, self.rsi_period, self.atr_period)
+        return indicators
+
+    def update(self, symbol, price, volume=None, high=None, low=None):
+        self.get(symbol).update(price, volume, high, low)
+
+    def value(self, symbol, name):
+        indicators = self._sets.get(symbol.upper())
+        return getattr(indicators, name).value if indicators else None
+
+    def values(self, symbol):
+        indicators = self._sets.get(symbol.upper())
+        return indicators.values() if indicators else {}
+
+    def describe(self, symbol): # dong tom tat cho tin nhan cap nhat gia
+        v = self.values(symbol)
+        parts = []
+        if v.get('ema') is not None:
+            parts.append(f"EMA{self.ema_period}: {v['ema']:,.2f}")
+        if v.get('rsi') is not None:
+            parts.append(f"RSI{self.rsi_period}: {v['rsi']:.1f}")
+        if v.get('vwap') is not None:
+            parts.append(f"VWAP: {v['vwap']:,.2f}")
+        if v.get('atr') is not None:
+            parts.append(f"ATR{self.atr_period}: {v['atr']:,.2f}")
+        return " | ".join(parts)
@@ -1,14 +1,138 @@
-from datetime import datetime, time
+"""
+Market Time - exchange session calendar
+
+Sessions (with the lunch break between them) are precomputed as epoch
+intervals for a horizon of days, skipping weekends and holidays, so
+checking the market and finding the next open/close is a bisect instead
+of rebuilding the timezone and parsing times on every poll.
+"""
+import bisect
+import time as _time
+from datetime import date, datetime, time, timedelta
 import pytz # thu vien xu ly timezone
 
-def is_market_open(config): # kiem tra thi truong co dang mo hay khong
-    tz = pytz.timezone(config["market"]["timezone"]) # time zone cua thi truong
-    now = datetime.now(tz) # lay thoi gian hien tai theo timezone
+# Ngay nghi le co dinh cua san HOSE/HNX (Tet Nguyen Dan, Gio To theo lich am: MARKET_HOLIDAYS)
+FIXED_HOLIDAYS = ((1, 1), (4, 30), (5, 1), (9, 2))
+
+
+def parse_sessions(text): # "09:15-11:30,13:00-14:45" -> [(time, time), ...]
+    sessions = []
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        start, sep, end = part.partition('-')
+        if not sep:
+            raise ValueError(f"Invalid session: {part.strip()!r} (expected HH:MM-HH:MM)")
+        start, end = time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+        if start >= end:
+            raise ValueError(f"Session {part.strip()!r} must open before it closes")
+        sessions.append((start, end))
+    sessions.sort()
+    for (_, prev_end), (start, _) in zip(sessions, sessions[1:]):
+        if start <= prev_end:
+            raise ValueError("Sessions must not overlap")
+    if not sessions:
+        raise ValueError("No market sessions configured")
+    return sessions
+
+
+class MarketCalendar: # lich phien giao dich tinh truoc
+    def __init__(self, timezone, days, sessions, holidays=(), horizon_days=400, clock=_time.time):
+        """
+        Args:
+            timezone: Exchange timezone name
+            days: Trading weekdays (0 = Monday)
+            sessions: [(open time, close time), ...] or "HH:MM-HH:MM,..." string
+            holidays: Extra closed dates (date or ISO string), on top of FIXED_HOLIDAYS
+            horizon_days: Days of sessions precomputed per build
+            clock: Epoch time source in seconds
+        """
+        self.tz = pytz.timezone(timezone)
+        self.days = frozenset(days)
+        self.sessions = parse_sessions(sessions) if isinstance(sessions, str) else sorted(sessions)
+        self.holidays = frozenset(d if isinstance(d, date) else date.fromisoformat(d) for d in holidays)
+        self.horizon_days = horizon_days
+        self.clock = clock
+        self._opens = [] # thoi diem mo cua (epoch), tang dan
+        self._closes = []
+        self._start = self._end = None # khoang thoi gian da tinh
+
+    def is_holiday(self, day):
+        return day in self.holidays or (day.month, day.day) in FIXED_HOLIDAYS
+
+    def is_trading_day(self, day):
+        return day.weekday() in self.days and not self.is_holiday(day)
+
+    def _build(self, now): # tinh cac phien tu hom qua toi het horizon
+        first = datetime.fromtimestamp(now, self.tz).date() - timedelta(days=1)
+        opens, closes = [], []
+        for offset in range(self.horizon_days + 1):
+            day = first + timedelta(days=offset)
+            if not self.is_trading_day(day):
+                continue
+            for start, end in self.sessions:
+                opens.append(self.tz.localize(datetime.combine(day, start)).timestamp())
+                closes.append(self.tz.localize(datetime.combine(day, end)).timestamp())
+        self._opens, self._closes = opens, closes
+        self._start = self.tz.localize(datetime.combine(first, time())).timestamp()
+        self._end = self.tz.localize(datetime.combine(first + timedelta(days=self.horizon_days), time())).timestamp()
+
+    def _index(self, now): # vi tri phien cuoi cung da mo truoc hoac tai now
+        if self._start is None or not self._start <= now < self._end:
+            self._build(now)
+        return bisect.bisect_right(self._opens, now) - 1
 
-    if now.weekday() not in config["market"]["days"]: # kiem tra ngay hien tai co phai la ngay thi truong mo cua
-        return False
+    def _now(self, now):
+        if now is None:
+            return self.clock()
+        return now.timestamp() if isinstance(now, datetime) else now
 
-    open_time = time.fromisoformat(config["market"]["open"]) # thoi gian thi truong mo cua
-    close_time = time.fromisoformat(config["market"]["close"]) # thoi gian thi truong dong cua
+    def is_open(self, now=None):
+        """True while inside a session (open and close inclusive)"""
+        now = self._now(now)
+        i = self._index(now)
+        return i >= 0 and now <= self._closes[i]
 
-    return open_time <= now.time() <= close_time # tra ve True neu thi truong dang mo cua, nguoc lai tra ve False
+    def next_open(self, now=None):
+        """Start of the first session opening after now, as an aware datetime"""
+        now = self._now(now)
+        i = self._index(now) + 1
+        while i >= len(self._opens): # het horizon (vd: ngay nghi dai) -> tinh tiep
+            if not self._opens:
+                raise ValueError("No trading sessions within the calendar horizon")
+            now = self._end
+            i = self._index(now) + 1
+        return datetime.fromtimestamp(self._opens[i], self.tz)
+
+    def next_close(self, now=None):
+        """End of the current session, or of the next one if closed"""
+        now = self._now(now)
+        i = self._index(now)
+        if i >= 0 and now <= self._closes[i]:
+            return datetime.fromtimestamp(self._closes[i], self.tz)
+        return datetime.fromtimestamp(self._closes[self._index(self.next_open(now).timestamp())], self.tz)
+
+    def seconds_until_open(self, now=None):
+        """0 while open, otherwise seconds until the next session starts"""
+        now = self._now(now)
+        if self.is_open(now):
+            return 0.0
+        return max(0.0, self.next_open(now).timestamp() - now)
+
+
+_calendars = {}
+
+
+def calendar_from_config(config): # lich dung chung cho cung mot cau hinh
+    market = config["market"]
+    sessions = market.get("sessions") or f"{market['open']}-{market['close']}"
+    key = (market["timezone"], tuple(market["days"]), sessions, tuple(market.get("holidays", ())))
+    calendar = _calendars.get(key)
+    if calendar is None:
+        calendar = _calendars[key] = MarketCalendar(market["timezone"], market["days"], sessions,
+                                                    market.get("holidays", ()))
+    return calendar
+
+
+def is_market_open(config): # kiem tra thi truong co dang mo hay khong
+    return calendar_from_config(config).is_open()
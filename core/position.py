@@ -1,28 +1,169 @@
-from dataclasses import dataclass
+import time as _time
+from collections import deque
 from datetime import datetime
 from typing import List
 
-@dataclass
+FIFO = 'fifo' # khop lo mua truoc ban truoc
+AVERAGE = 'avg' # gia von binh quan
+
 class Layer: # lop layer de luu tru thong tin tung lop trong vi tri
-    price: float
-    quantity: int
-    time: str
+    __slots__ = ('price', 'quantity', 'timestamp') # khong dung __dict__, nhe hon khi co hang nghin lop
+
+    def __init__(self, price: float, quantity: int, timestamp=None):
+        self.price = price
+        self.quantity = quantity
+        if timestamp is None:
+            timestamp = _time.time()
+        elif isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp() # du lieu cu luu dang ISO
+        self.timestamp = timestamp # epoch giay
+
+    @property
+    def time(self): # thoi gian dang ISO nhu truoc
+        return datetime.fromtimestamp(self.timestamp).isoformat()
+
+    def to_dict(self):
+        return {"price": self.price, "quantity": self.quantity, "time": self.time}
+
+    def __repr__(self):
+        return f"Layer(price={self.price!r}, quantity={self.quantity!r}, time={self.time!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Layer):
+            return NotImplemented
+        return (self.price, self.quantity, self.timestamp) == (other.price, other.quantity, other.timestamp)
+
+class Sale: # mot lenh ban da khop
+    __slots__ = ('price', 'quantity', 'pnl', 'method', 'timestamp')
+
+    def __init__(self, price: float, quantity: int, pnl: float, method: str, timestamp=None):
+        self.price = price
+        self.quantity = quantity
+        self.pnl = pnl # lai/lo da thuc hien
+        self.method = method
+        if timestamp is None:
+            timestamp = _time.time()
+        elif isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            "price": self.price, "quantity": self.quantity, "pnl": self.pnl, "method": self.method,
+            "time": datetime.fromtimestamp(self.timestamp).isoformat(),
+        }
 
 class Position: # lop vi tri de luu tru thong tin vi tri cua mot co phieu
     def __init__(self, symbol: str, layers: List[Layer] = None):
         self.symbol = symbol
-        self.layers = layers or []
+        self._layers = deque() # ban theo FIFO lay tu ben trai, O(1)
+        self._quantity = 0 # tong so luong, cap nhat moi lan thay doi
+        self._cost = 0 # tong gia von cua vi the
+        self._layer_cost = 0 # tong gia * so luong cua cac lop (khac _cost sau khi ban theo gia binh quan)
+        self.realized_pnl = 0.0 # lai/lo da thuc hien cong don
+        self.sales = []
+        self.version = 0 # tang moi lan vi the thay doi
+        for layer in layers or []:
+            self._append(layer)
+
+    @classmethod
+    def from_records(cls, symbol: str, records): # tao vi the tu du lieu luu tru, giu nguyen thoi gian
+        return cls(symbol, [Layer(r["price"], r["quantity"], r.get("time")) for r in records])
+
+    @classmethod
+    def from_dict(cls, symbol: str, data): # tao vi the tu du lieu day du (lop, ban, lai/lo)
+        position = cls.from_records(symbol, data.get("layers", []))
+        position._cost += data.get("cost_adjust", 0)
+        position.realized_pnl = data.get("realized_pnl", 0.0)
+        position.sales = [
+            Sale(r["price"], r["quantity"], r["pnl"], r.get("method", AVERAGE), r.get("time"))
+            for r in data.get("sales", [])
+        ]
+        return position
+
+    @property
+    def layers(self): # chi doc, thay doi qua add_layer de tong luon dung
+        return self._layers
+
+    def _append(self, layer: Layer):
+        self._layers.append(layer)
+        self._quantity += layer.quantity
+        self._cost += layer.price * layer.quantity
+        self._layer_cost += layer.price * layer.quantity
+        self.version += 1
+
+    def add_layer(self, price: float, quantity: int, timestamp=None):
+        layer = Layer(price, quantity, timestamp) # gia hien tai va so luong mua them vao layer moi
+        self._append(layer)
+        return layer
+
+    def sell(self, price: float, quantity: int, method: str = AVERAGE, timestamp=None):
+        """
+        Sell quantity at price, matching lots FIFO or at average cost
+
+        FIFO realizes P&L against the oldest lots. Average cost realizes it
+        against the position average, which stays unchanged for the rest.
+        Either way the oldest layers are consumed, so the layer list always
+        adds up to the quantity held.
+
+        Returns:
+            Sale: The matched sale with its realized P&L
+
+        Raises:
+            ValueError: If quantity is not positive or exceeds the position
+        """
+        if method not in (FIFO, AVERAGE):
+            raise ValueError(f"Unknown matching method: {method}")
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        if quantity > self._quantity:
+            raise ValueError(f"Cannot sell {quantity}, position holds {self._quantity}")
+
+        avg = self.average_price()
+        pnl = 0.0
+        remaining = quantity
+        while remaining:
+            layer = self._layers[0]
+            matched = min(layer.quantity, remaining)
+            if method == FIFO:
+                pnl += (price - layer.price) * matched
+                self._cost -= layer.price * matched
+            self._layer_cost -= layer.price * matched
+            if matched == layer.quantity:
+                self._layers.popleft()
+            else:
+                layer.quantity -= matched
+            remaining -= matched
+
+        if method == AVERAGE:
+            pnl = (price - avg) * quantity
+            self._cost -= avg * quantity
+
+        self._quantity -= quantity
+        if not self._quantity:
+            self._cost = self._layer_cost = 0 # tranh sai so con du
+
+        sale = Sale(price, quantity, pnl, method, timestamp)
+        self.sales.append(sale)
+        self.realized_pnl += pnl
+        self.version += 1
+        return sale
+
+    def to_records(self): # du lieu de luu vao DataStore
+        return [l.to_dict() for l in self._layers]
 
-    def add_layer(self, price: float, quantity: int):
-        self.layers.append(
-            Layer(price=price, quantity=quantity, time=datetime.now().isoformat())
-        ) # gia hien tai va so luong mua them vao layer moi
+    def to_dict(self): # lop, lenh ban va lai/lo da thuc hien
+        return {
+            "layers": self.to_records(),
+            "cost_adjust": self._cost - self._layer_cost,
+            "realized_pnl": self.realized_pnl,
+            "sales": [s.to_dict() for s in self.sales],
+        }
 
     def total_quantity(self):
-        return sum(l.quantity for l in self.layers) # tinh tong so luong co phieu trong vi tri
+        return self._quantity # tong so luong co phieu trong vi tri
 
     def average_price(self): # tinh gia trung binh cua vi tri
-        if not self.layers:
+        if not self._layers:
             return 0
-        total = sum(l.price * l.quantity for l in self.layers)
-        return total / self.total_quantity()
+        return self._cost / self._quantity
@@ -0,0 +1,137 @@
+"""
+Price History - fixed-capacity per-symbol ring buffers
+
+Timestamps (epoch seconds) and prices live in two preallocated
+array('d') buffers per symbol, so memory stays at 16 bytes per slot no
+matter how long the bot runs. Windows are returned as memoryview slices
+(no copy; wrap with numpy.frombuffer for vector math) and located by
+bisecting the timestamps.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PriceRing: # bo dem vong cho mot ma
+    __slots__ = ('capacity', '_ts', '_px', '_next', '_size')
+
+    def __init__(self, capacity=8192):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._ts = array('d', bytes(8 * capacity))
+        self._px = array('d', bytes(8 * capacity))
+        self._next = 0 # vi tri ghi tiep theo
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ts, price):
+        """Add a sample; samples older than the newest one are ignored"""
+        if self._size and ts < self._ts[self._next - 1]:
+            return False
+        self._ts[self._next] = ts
+        self._px[self._next] = price
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def last(self):
+        """Newest (ts, price), or None when empty"""
+        if not self._size:
+            return None
+        return self._ts[self._next - 1], self._px[self._next - 1]
+
+    def segments(self, since=None):
+        """
+        Samples with ts >= since in time order, without copying
+
+        Returns:
+            list: Up to two (timestamps, prices) memoryview pairs; two when
+                  the window wraps around the end of the buffer
+        """
+        start = (self._next - self._size) % self.capacity
+        if self._size < self.capacity or start == 0:
+            spans = [(start, start + self._size)]
+        else:
+            spans = [(start, self.capacity), (0, self._next)]
+
+        ts, px = memoryview(self._ts), memoryview(self._px)
+        segments = []
+        for lo, hi in spans:
+            if since is not None:
+                lo = bisect_left(ts, since, lo, hi)
+            if lo < hi:
+                segments.append((ts[lo:hi], px[lo:hi]))
+        return segments
+
+    def stats(self, since=None):
+        """count / min / max / mean / first / last of prices since `since`"""
+        segments = self.segments(since)
+        count = sum(len(px) for _, px in segments)
+        if not count:
+            return None
+        return {
+            'count': count,
+            'min': min(min(px) for _, px in segments),
+            'max': max(max(px) for _, px in segments),
+            'mean': sum(sum(px) for _, px in segments) / count,
+            'first': segments[0][1][0],
+            'last': segments[-1][1][-1],
+            'since': segments[0][0][0],
+        }
+
+
+class PriceHistory: # lich su gia trong bo nho cho tung ma
+    def __init__(self, capacity=8192, clock=time.time):
+        self.capacity = capacity
+        self._clock = clock
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def record(self, price_data):
+        """Append a PriceData sample"""
+        self.append(price_data.symbol, price_data.timestamp.timestamp(), price_data.price)
+
+    def append(self, symbol, ts, price):
+        symbol = symbol.upper()
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                ring = self._rings[symbol] = PriceRing(self.capacity)
+            return ring.append(ts, price)
+
+    def symbols(self):
+        with self._lock:
+            return list(self._rings)
+
+    def window(self, symbol, minutes=None):
+        """
+        Zero-copy (timestamps, prices) segments for the last N minutes
+
+        The views alias the live buffers; copy them (or hold the result only
+        briefly) if appends may run concurrently.
+        """
+        ring = self._rings.get(symbol.upper())
+        if ring is None:
+            return []
+        since = self._clock() - minutes * 60 if minutes is not None else None
+        with self._lock:
+            return ring.segments(since)
+
+    def stats(self, symbol, minutes=None):
+        """Window stats for the last N minutes (all samples if None), or None"""
+        ring = self._rings.get(symbol.upper())
+        if ring is None:
+            return None
+        since = self._clock() - minutes * 60 if minutes is not None else None
+        with self._lock:
+            return ring.stats(since)
+
+    def memory_bytes(self):
+        return len(self._rings) * self.capacity * 16
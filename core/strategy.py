@@ -1,27 +1,60 @@
-from datetime import datetime, timedelta
+import time
+from core.cooldown import CooldownTracker
+from core.trigger_index import ABOVE, BELOW, TriggerIndex
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class Strategy:
-    def __init__(self, config):
+    def __init__(self, config, clock=time.monotonic, indicators=None, cooldowns=None, chat_id=None):
         self.config = config
-        self.last_notify = {}
+        self.indicators = indicators # IndicatorBook, nguoi goi cap nhat moi tick
+        self.chat_id = chat_id
+        # thoi gian cho theo (chat, ma, loai canh bao); backtest truyen dong ho mo phong
+        self.cooldowns = cooldowns or CooldownTracker(
+            config["strategy"].get("cooldown_minutes", 15) * 60, clock=clock
+        )
+        self.index = TriggerIndex() # muc gia kich hoat theo ma, dung bisect moi tick
 
-    def can_notify(self, key, cooldown_minutes=15): # kiem tra co the gui thong bao khong
-        now = datetime.now()
-        last = self.last_notify.get(key)
+    def can_notify(self, rule, symbol=None, cooldown_minutes=None): # kiem tra co the gui thong bao khong
+        key = (self.chat_id, (symbol or self.config["symbol"]).upper(), rule)
+        cooldown = cooldown_minutes * 60 if cooldown_minutes is not None else None
+        return self.cooldowns.allow(key, cooldown)
 
-        if not last or now - last > timedelta(minutes=cooldown_minutes):
-            self.last_notify[key] = now
-            logger.debug(f"Notification allowed for key: {key}")
-            return True
-        
-        remaining = cooldown_minutes - (now - last).seconds // 60
-        logger.debug(f"Notification blocked for key: {key}, cooldown remaining: {remaining}m")
-        return False
+    def trigger_levels(self, position): # cac muc gia kich hoat canh bao cua vi the
+        if position.total_quantity() == 0:
+            return []
+        avg = position.average_price()
+        return [
+            avg - self.config["strategy"]["down_threshold"],
+            avg + self.config["strategy"]["up_threshold"],
+        ]
+
+    def sync_index(self, position): # chi xay lai chi muc khi vi the hoac cau hinh thay doi
+        avg = position.average_price()
+        qty = position.total_quantity()
+        down = self.config["strategy"]["down_threshold"]
+        up = self.config["strategy"]["up_threshold"]
+
+        key = (avg, qty, down, up)
+        if self.index.is_current(position.symbol, key):
+            return
+        triggers = [(avg - down, BELOW, "buy_more"), (avg + up, ABOVE, "sell")] if qty else []
+        self.index.rebuild(position.symbol, triggers, key)
+
+    def oversold_rsi(self, symbol): # RSI neu dang qua ban, None neu khong
+        threshold = self.config["strategy"].get("rsi_oversold")
+        if not self.indicators or not threshold:
+            return None
+        rsi = self.indicators.value(symbol, "rsi")
+        if rsi is None or rsi > threshold:
+            return None
+        return rsi
 
     def check(self, price, position):
+        return [msg for _, msg in self.signals(price, position)]
+
+    def signals(self, price, position): # tra ve danh sach (loai canh bao, noi dung)
         messages = []
 
         avg = position.average_price()
@@ -32,37 +65,63 @@ class Strategy:
         if qty == 0:
             target = price
             if abs(price - target) <= self.config["strategy"]["pre_buy_range"]:
-                if self.can_notify("pre_buy"):
-                    msg = f"🔔 {self.config['symbol']} gần vùng mua\nGiá hiện tại: {price}"
-                    messages.append(msg)
-                    logger.info(f"Alert: Pre-buy zone - {msg}")
+                if self.can_notify("pre_buy", position.symbol):
+                    messages.append(("pre_buy", self.format_alert("pre_buy", price, avg, qty, position.symbol)))
             return messages
 
-        down = self.config["strategy"]["down_threshold"]
-        up = self.config["strategy"]["up_threshold"]
+        self.sync_index(position)
+        # active() chu khong phai crossed(): canh bao nhac lai sau moi cooldown khi gia
+        # con vuot nguong, va ca tick dau sau khi khoi dong (chua co gia truoc) cung bao;
+        # rule /alert (AlertRuleBook) moi dung crossed() vi chi bao mot lan khi cat qua
+        below, above = self.index.active(position.symbol, price)
+
+        if "buy_more" in below:
+            if self.can_notify("buy_more", position.symbol):
+                messages.append(("buy_more", self.format_alert("buy_more", price, avg, qty, position.symbol)))
+
+        if "sell" in above:
+            if self.can_notify("sell", position.symbol):
+                messages.append(("sell", self.format_alert("sell", price, avg, qty, position.symbol)))
 
-        if price <= avg - down:
-            if self.can_notify("buy_more"):
-                pnl_pct = ((price - avg) / avg) * 100
-                msg = (
-                    f"📉 {self.config['symbol']} giảm đủ ngưỡng mua thêm\n"
-                    f"Avg: {avg:.2f} | Giá hiện tại: {price}\n"
-                    f"Lỗ: {pnl_pct:.2f}%"
-                )
-                messages.append(msg)
-                logger.info(f"Alert: Buy more signal - {msg}")
-
-        if price >= avg + up:
-            if self.can_notify("sell"):
-                pnl_pct = ((price - avg) / avg) * 100
-                profit = (price - avg) * qty
-                msg = (
-                    f"📈 {self.config['symbol']} đạt ngưỡng chốt lời\n"
-                    f"Avg: {avg:.2f} | Giá hiện tại: {price}\n"
-                    f"Lời: {pnl_pct:.2f}% | +{profit:,.0f} VND"
-                )
-                messages.append(msg)
-                logger.info(f"Alert: Sell signal - {msg}")
+        rsi = self.oversold_rsi(position.symbol)
+        if rsi is not None and price < avg:
+            if self.can_notify("rsi_buy_more", position.symbol):
+                messages.append(("rsi_buy_more", self.format_alert("rsi_buy_more", price, avg, qty, position.symbol, rsi=rsi)))
 
         return messages
 
+    def format_alert(self, kind, price, avg, qty, symbol=None, rsi=None): # tao noi dung canh bao
+        symbol = symbol or self.config['symbol']
+
+        if kind == "pre_buy":
+            msg = f"🔔 {symbol} gần vùng mua\nGiá hiện tại: {price}"
+            logger.info(f"Alert: Pre-buy zone - {msg}")
+            return msg
+
+        pnl_pct = ((price - avg) / avg) * 100
+        if kind == "buy_more":
+            msg = (
+                f"📉 {symbol} giảm đủ ngưỡng mua thêm\n"
+                f"Avg: {avg:.2f} | Giá hiện tại: {price}\n"
+                f"Lỗ: {pnl_pct:.2f}%"
+            )
+            logger.info(f"Alert: Buy more signal - {msg}")
+            return msg
+
+        if kind == "rsi_buy_more":
+            msg = (
+                f"📉 {symbol} quá bán (RSI {rsi:.1f}), cân nhắc mua thêm\n"
+                f"Avg: {avg:.2f} | Giá hiện tại: {price}\n"
+                f"Lỗ: {pnl_pct:.2f}%"
+            )
+            logger.info(f"Alert: RSI oversold signal - {msg}")
+            return msg
+
+        profit = (price - avg) * qty
+        msg = (
+            f"📈 {symbol} đạt ngưỡng chốt lời\n"
+            f"Avg: {avg:.2f} | Giá hiện tại: {price}\n"
+            f"Lời: {pnl_pct:.2f}% | +{profit:,.0f} VND"
+        )
+        logger.info(f"Alert: Sell signal - {msg}")
+        return msg
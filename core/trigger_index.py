@@ -0,0 +1,120 @@
+"""
+Trigger Index - sorted price levels per symbol
+
+Each trigger is a fixed level with a direction: 'below' fires while
+price <= level, 'above' fires while price >= level. Levels are kept sorted
+so a tick is a bisect instead of a scan over every rule, and the book is
+only rebuilt when the inputs it was derived from change.
+
+active() answers "which levels hold now" (Strategy: level plus cooldown,
+repeating while the price stays beyond a threshold); crossed() answers
+"which levels were passed since the last tick" (AlertRuleBook: edge
+triggered, once per crossing).
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BELOW = 'below'
+ABOVE = 'above'
+
+
+def event_key(*parts): # id on dinh cua mot lan kich hoat, vd (loai, ma, muc gia, thoi diem bao gia)
+    return ':'.join(
+        p.isoformat() if isinstance(p, datetime) else f"{p:g}" if isinstance(p, float) else str(p)
+        for p in parts
+    )
+
+
+class _Book: # danh sach muc gia da sap xep cua mot ma
+    __slots__ = ('key', 'below_levels', 'below_kinds', 'above_levels', 'above_kinds')
+
+    def __init__(self, triggers, key):
+        self.key = key
+        below = sorted((level, kind) for level, direction, kind in triggers if direction == BELOW)
+        above = sorted((level, kind) for level, direction, kind in triggers if direction == ABOVE)
+        self.below_levels = [level for level, _ in below]
+        self.below_kinds = [kind for _, kind in below]
+        self.above_levels = [level for level, _ in above]
+        self.above_kinds = [kind for _, kind in above]
+
+
+class TriggerIndex:
+    """Per-symbol sorted trigger levels answering active / crossed queries"""
+
+    def __init__(self):
+        self._books = {}
+        self.rebuilds = 0
+
+    def is_current(self, symbol, key):
+        """True if the symbol's book was built from the same key"""
+        book = self._books.get(symbol)
+        return book is not None and book.key == key
+
+    def rebuild(self, symbol, triggers, key=None):
+        """
+        Replace the levels for a symbol
+
+        Args:
+            symbol: Stock symbol
+            triggers: Iterable of (level, direction, kind), direction BELOW / ABOVE
+            key: Anything identifying the inputs, checked by is_current()
+        """
+        self._books[symbol] = _Book(triggers, key)
+        self.rebuilds += 1
+        logger.debug(f"Trigger index rebuilt for {symbol} (key: {key})")
+
+    def remove(self, symbol):
+        self._books.pop(symbol, None)
+
+    def levels(self, symbol):
+        """All (level, direction, kind) for a symbol, sorted by level"""
+        book = self._books.get(symbol)
+        if not book:
+            return []
+        return sorted(
+            [(l, BELOW, k) for l, k in zip(book.below_levels, book.below_kinds)]
+            + [(l, ABOVE, k) for l, k in zip(book.above_levels, book.above_kinds)]
+        )
+
+    def active(self, symbol, price):
+        """
+        Kinds whose condition holds at price
+
+        Returns:
+            tuple: (below kinds with price <= level, above kinds with price >= level)
+        """
+        book = self._books.get(symbol)
+        if not book:
+            return [], []
+        below = book.below_kinds[bisect_left(book.below_levels, price):]
+        above = book.above_kinds[:bisect_right(book.above_levels, price)]
+        return below, above
+
+    def crossed(self, symbol, prev_price, price):
+        """
+        Triggers that became active moving from prev_price to price
+
+        A falling price crosses 'below' levels in [price, prev_price), a rising
+        price crosses 'above' levels in (prev_price, price].
+
+        Returns:
+            list: (level, direction, kind) in the order the price passed them
+        """
+        book = self._books.get(symbol)
+        if not book or prev_price is None or price == prev_price:
+            return []
+
+        if price < prev_price:
+            lo = bisect_left(book.below_levels, price)
+            hi = bisect_left(book.below_levels, prev_price)
+            return [
+                (book.below_levels[i], BELOW, book.below_kinds[i])
+                for i in range(hi - 1, lo - 1, -1)
+            ]
+
+        lo = bisect_right(book.above_levels, prev_price)
+        hi = bisect_right(book.above_levels, price)
+        return [(book.above_levels[i], ABOVE, book.above_kinds[i]) for i in range(lo, hi)]
@@ -0,0 +1,97 @@
+"""
+Vectorized Strategy evaluation across many symbols / positions with NumPy
+"""
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def evaluate(prices, avgs, qtys, down, up, pre_buy_range):
+    """
+    Compute Strategy trigger conditions for many rows in one pass
+
+    Mirrors Strategy.signals: pre_buy when nothing is held, buy_more when
+    price <= avg - down and sell when price >= avg + up while holding.
+    down / up / pre_buy_range may be scalars or arrays that broadcast
+    against prices (e.g. one row per threshold combination in a sweep).
+
+    Returns:
+        dict: kind -> boolean mask ('pre_buy', 'buy_more', 'sell')
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    avgs = np.asarray(avgs, dtype=np.float64)
+    held = np.asarray(qtys) > 0
+
+    return {
+        'pre_buy': ~held & (np.abs(prices - prices) <= pre_buy_range),
+        'buy_more': held & (prices <= avgs - down),
+        'sell': held & (prices >= avgs + up),
+    }
+
+
+class BatchStrategy: # danh gia chien luoc cho nhieu ma cung luc
+    """
+    Batched front end for a Strategy
+
+    Conditions are computed with NumPy; cooldowns and message text still go
+    through the wrapped Strategy, in the same order as calling
+    strategy.check(price, position) for each row, so the output is identical.
+    """
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+
+    def signals_many(self, prices, positions):
+        """
+        Evaluate many (price, position) rows
+
+        Args:
+            prices: Sequence of prices, one per position
+            positions: Sequence of Position objects
+
+        Returns:
+            list: (row index, kind, message) for every alert that fired
+        """
+        n = len(positions)
+        avgs = np.fromiter((p.average_price() for p in positions), dtype=np.float64, count=n)
+        qtys = np.fromiter((p.total_quantity() for p in positions), dtype=np.int64, count=n)
+        config = self.strategy.config["strategy"]
+        masks = evaluate(prices, avgs, qtys, config["down_threshold"],
+                         config["up_threshold"], config["pre_buy_range"])
+
+        # RSI comes from the strategy's indicators, one value per symbol
+        by_symbol = {p.symbol: None for p in positions}
+        for symbol in by_symbol:
+            by_symbol[symbol] = self.strategy.oversold_rsi(symbol)
+        rsis = [by_symbol[p.symbol] for p in positions]
+        masks['rsi_buy_more'] = (
+            (qtys > 0)
+            & np.fromiter((r is not None for r in rsis), dtype=bool, count=n)
+            & (np.asarray(prices, dtype=np.float64) < avgs)
+        )
+
+        # Only rows with a condition set need the per-row cooldown and formatting
+        any_hit = masks['pre_buy'] | masks['buy_more'] | masks['sell'] | masks['rsi_buy_more']
+        hits = np.flatnonzero(any_hit).tolist()
+        logger.debug(f"Batch strategy check - {n} rows, {len(hits)} candidates")
+
+        alerts = []
+        for i in hits:
+            price = prices[i]
+            price = price.item() if isinstance(price, np.generic) else price
+            for kind in ('pre_buy', 'buy_more', 'sell', 'rsi_buy_more'):
+                if masks[kind][i] and self.strategy.can_notify(kind, positions[i].symbol):
+                    msg = self.strategy.format_alert(
+                        kind, price, avgs[i].item(), qtys[i].item(),
+                        symbol=positions[i].symbol, rsi=rsis[i]
+                    )
+                    alerts.append((i, kind, msg))
+        return alerts
+
+    def check_many(self, prices, positions):
+        """Per-row message lists, equal to [strategy.check(p, pos) for ...]"""
+        results = [[] for _ in positions]
+        for i, _, msg in self.signals_many(prices, positions):
+            results[i].append(msg)
+        return results
@@ -1,66 +1,169 @@
+import argparse
+import html
 import time
 import signal
 import sys
+import threading
 from datetime import datetime
-import pytz
-from apscheduler.schedulers.background import BackgroundScheduler
-from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
 
 from core.config import Config
-from core.market_time import is_market_open
-from core.position import Position
-from core.strategy import Strategy
-from services.price_service import fetch_price, StockAPIError
+from core.adaptive_poll import AdaptivePoller
+from core.alert_rules import AlertRuleBook
+from core.indicators import IndicatorBook
+from core.market_time import calendar_from_config
+from core.trigger_index import event_key
+from core.accounts import AccountRegistry
+from core.cooldown import CooldownTracker
+from services.price_service import fetch_prices, get_service, StockAPIError, StockAPIUnavailableError
 from services.notify_service import Notifier
+from services.coalescer import AlertCoalescer
+from services.outbox import Outbox
+from services.polling_engine import AsyncPollingEngine
 from utils.logger import get_logger
 from utils.data_store import DataStore
 from utils.health_check import HealthCheckServer
+from utils.circuit_breaker import backoff_delay
 
 # Initialize logger
 logger = get_logger('main')
 
 # Global state for graceful shutdown
 shutdown_requested = False
+shutdown_event = threading.Event() # wakes long market-closed sleeps
 
 # Global instances for Telegram handlers
-bot_position = None
+bot_accounts = None
 bot_notifier = None
 bot_data_store = None
+bot_alert_rules = None
+bot_indicators = None
+bot_engine = None
+bot_scheduler = None
 
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully"""
     global shutdown_requested
     logger.info(f"Received signal {signum}, initiating graceful shutdown...")
     shutdown_requested = True
+    shutdown_event.set()
+    if bot_engine:
+        bot_engine.stop()
+
+def broadcast_chats():
+    """Subscriber chats (channel, followers) that get reports but have no account"""
+    return [c for c in Config.TELEGRAM_BROADCAST_CHAT_IDS if not bot_accounts or not bot_accounts.get(c)]
+
+def deliver_alert(notifier, chat_id, kind, msg, event=None):
+    """Send an alert to its chat; the main chat's alerts also go to subscribers"""
+    # The event key lets the outbox store and send the same alert event only once
+    notifier.send(msg, chat_id=chat_id, kind=kind, message_id=event)
+    if str(chat_id) == str(Config.TELEGRAM_CHAT_ID) and broadcast_chats():
+        notifier.broadcast(msg, broadcast_chats(), kind=kind, message_id=event)
+
+def primary_price(batch):
+    """Extract the STOCK_SYMBOL price from a watchlist batch, re-raising its error"""
+    symbol = Config.STOCK_SYMBOL.upper()
+    if symbol not in batch.prices:
+        raise batch.errors.get(symbol) or StockAPIError(f"No price returned for {symbol}")
+    return batch.prices[symbol].price
+
+def polled_symbols(alert_rules=None):
+    """Watchlist plus any symbol that has alert rules"""
+    symbols = list(Config.STOCK_WATCHLIST)
+    if alert_rules:
+        symbols += [s for s in alert_rules.symbols() if s not in symbols]
+    return symbols
+
+def save_state():
+    """Persist per-chat accounts and alert rules"""
+    # Handlers run on several threads: snapshot under the store's lock so the newest state is written last
+    with bot_data_store.lock:
+        bot_data_store.save({
+            "accounts": bot_accounts.to_records(),
+            "alerts": bot_alert_rules.to_records() if bot_alert_rules else [],
+        })
+
+def chat_account(update, create=False):
+    """Account of the chat a command came from (None if it has none yet)"""
+    chat_id = str(update.effective_chat.id)
+    if create:
+        return bot_accounts.get_or_create(chat_id)
+    return bot_accounts.get(chat_id)
+
+def format_position_summary(position, price):
+    """Position block appended to a chat's price update"""
+    avg_price = position.average_price()
+    total_qty = position.total_quantity()
+    profit_loss = (price - avg_price) * total_qty
+    profit_pct = ((price - avg_price) / avg_price) * 100
+    
+    msg = f"\n\n💼 Vị thế:\n"
+    msg += f"   Giá TB: {avg_price:,.0f} VND\n"
+    msg += f"   SL: {total_qty:,} CP\n"
+    msg += f"   Lãi/Lỗ: {profit_loss:,.0f} ({profit_pct:+.2f}%)"
+    return msg
+
+def format_price_update(batch, price, history=None, indicators=None):
+    """Market part of the price update, shared by every chat"""
+    current_time = datetime.now().strftime("%H:%M:%S")
+    msg = f"📊 Giá {Config.STOCK_SYMBOL}: {price:,.0f} VND\n🕐 {current_time}"
+    
+    others = [
+        f"   {symbol}: {data.price:,.0f} VND"
+        for symbol, data in batch.prices.items()
+        if symbol != Config.STOCK_SYMBOL.upper()
+    ]
+    if others:
+        msg += f"\n\n👀 Watchlist:\n" + "\n".join(others)
+    
+    window = history.stats(Config.STOCK_SYMBOL, Config.PRICE_HISTORY_WINDOW_MINUTES) if history else None
+    if window and window['count'] > 1:
+        msg += (
+            f"\n\n📏 {Config.PRICE_HISTORY_WINDOW_MINUTES} phút ({window['count']} mẫu):\n"
+            f"   Thấp: {window['min']:,.0f} | Cao: {window['max']:,.0f} | TB: {window['mean']:,.0f}"
+        )
+    
+    summary = indicators.describe(Config.STOCK_SYMBOL) if indicators else ""
+    if summary:
+        msg += f"\n\n📐 Chỉ báo:\n   {summary}"
+    return msg
 
 def send_price_update():
     """Send price update every 5 minutes"""
     global bot_notifier
     try:
-        price = fetch_price(symbol=Config.STOCK_SYMBOL)
-        current_time = datetime.now().strftime("%H:%M:%S")
-        msg = f"📊 Giá {Config.STOCK_SYMBOL}: {price:,.0f} VND\n🕐 {current_time}"
-        
-        if bot_position and bot_position.layers:
-            avg_price = bot_position.average_price()
-            total_qty = bot_position.total_quantity()
-            profit_loss = (price - avg_price) * total_qty
-            profit_pct = ((price - avg_price) / avg_price) * 100
-            
-            msg += f"\n\n💼 Vị thế:\n"
-            msg += f"   Giá TB: {avg_price:,.0f} VND\n"
-            msg += f"   SL: {total_qty:,} CP\n"
-            msg += f"   Lãi/Lỗ: {profit_loss:,.0f} ({profit_pct:+.2f}%)"
+        # Outside sessions, push the job to the next open instead of firing all night
+        calendar = calendar_from_config(Config.to_dict())
+        if not calendar.is_open():
+            next_open = calendar.next_open()
+            if bot_scheduler:
+                bot_scheduler.modify_job('price_update', next_run_time=next_open)
+            logger.info(f"Market closed, next price update at {next_open:%Y-%m-%d %H:%M}")
+            return
         
+        batch = fetch_prices(Config.STOCK_WATCHLIST)
+        price = primary_price(batch)
+        msg = format_price_update(batch, price, get_service().history, bot_indicators)
+        
+        # Market part is shared; each chat gets its own position block
         if bot_notifier:
-            bot_notifier.send(msg)
+            for account in bot_accounts.accounts():
+                chat_msg = msg
+                if account.position.layers:
+                    chat_msg += format_position_summary(account.position, price)
+                try:
+                    bot_notifier.send(chat_msg, chat_id=account.chat_id, kind='price_update')
+                except Exception as e:
+                    logger.error(f"Failed to send price update to chat {account.chat_id}: {e}")
+            subscribers = broadcast_chats()
+            if subscribers:
+                bot_notifier.broadcast(msg, subscribers, kind='price_update')
             logger.info(f"Sent 5-minute price update: {price}")
     except Exception as e:
         logger.error(f"Failed to send price update: {e}")
 
 def telegram_buy_handler(update, context):
     """Handle /buy command: /buy <price> <quantity>"""
-    global bot_position, bot_data_store
     try:
         if len(context.args) != 2:
             update.message.reply_text(
@@ -72,51 +175,101 @@ def telegram_buy_handler(update, context):
         price = float(context.args[0])
         quantity = int(context.args[1])
         
-        bot_position.add_layer(price, quantity)
+        chat_id = str(update.effective_chat.id)
+        
+        def add_layer(account):
+            account.position.add_layer(price, quantity)
+            return account.position
+        
+        position = bot_accounts.update(chat_id, add_layer)
         
         # Save to storage
-        data = {
-            "layers": [
-                {"price": l.price, "quantity": l.quantity, "time": l.time}
-                for l in bot_position.layers
-            ]
-        }
-        bot_data_store.save(data)
+        save_state()
         
-        avg_price = bot_position.average_price()
-        total_qty = bot_position.total_quantity()
+        avg_price = position.average_price()
+        total_qty = position.total_quantity()
         
         msg = f"✅ Đã thêm vị thế mua:\n"
         msg += f"   Giá: {price:,.0f} VND\n"
         msg += f"   SL: {quantity:,} CP\n\n"
-        msg += f"💼 Tổng vị thế ({len(bot_position.layers)} lớp):\n"
+        msg += f"💼 Tổng vị thế ({len(position.layers)} lớp):\n"
         msg += f"   Giá TB: {avg_price:,.0f} VND\n"
         msg += f"   Tổng SL: {total_qty:,} CP"
         
         update.message.reply_text(msg)
-        logger.info(f"Added buy position: {quantity} @ {price}")
+        logger.info(f"Added buy position for chat {chat_id}: {quantity} @ {price}")
         
+    except PermissionError:
+        update.message.reply_text("⛔ Chat này không được phép sử dụng bot")
     except ValueError:
         update.message.reply_text("❌ Giá và số lượng phải là số")
     except Exception as e:
         update.message.reply_text(f"❌ Lỗi: {str(e)}")
         logger.error(f"Error in buy handler: {e}")
 
+def telegram_sell_handler(update, context):
+    """Handle /sell command: /sell <price> <quantity>"""
+    try:
+        if len(context.args) != 2:
+            update.message.reply_text(
+                "❌ Sử dụng: /sell <giá> <số_lượng>\n"
+                "Ví dụ: /sell 17500 500"
+            )
+            return
+        
+        price = float(context.args[0])
+        quantity = int(context.args[1])
+        chat_id = str(update.effective_chat.id)
+        
+        def sell(account):
+            sale = account.position.sell(price, quantity, method=Config.POSITION_COST_METHOD)
+            return sale, account.position
+        
+        sale, position = bot_accounts.update(chat_id, sell)
+        
+        # Save to storage
+        save_state()
+        
+        method = "FIFO" if sale.method == 'fifo' else "giá vốn bình quân"
+        msg = f"✅ Đã bán:\n"
+        msg += f"   Giá: {price:,.0f} VND\n"
+        msg += f"   SL: {quantity:,} CP\n"
+        msg += f"   Lãi/Lỗ thực hiện: {sale.pnl:+,.0f} VND ({method})\n\n"
+        msg += f"💼 Còn lại ({len(position.layers)} lớp):\n"
+        msg += f"   Giá TB: {position.average_price():,.0f} VND\n"
+        msg += f"   Tổng SL: {position.total_quantity():,} CP\n"
+        msg += f"   Tổng lãi/lỗ đã thực hiện: {position.realized_pnl:+,.0f} VND"
+        
+        update.message.reply_text(msg)
+        logger.info(f"Sold for chat {chat_id}: {quantity} @ {price}, realized {sale.pnl:,.0f}")
+        
+    except PermissionError:
+        update.message.reply_text("⛔ Chat này không được phép sử dụng bot")
+    except ValueError as e:
+        update.message.reply_text(f"❌ {str(e)}")
+    except Exception as e:
+        update.message.reply_text(f"❌ Lỗi: {str(e)}")
+        logger.error(f"Error in sell handler: {e}")
+
 def telegram_position_handler(update, context):
     """Handle /position command to show current positions"""
-    global bot_position
     try:
-        if not bot_position or not bot_position.layers:
-            update.message.reply_text("📭 Chưa có vị thế nào")
+        account = chat_account(update)
+        if not account or not account.position.layers:
+            msg = "📭 Chưa có vị thế nào"
+            if account and account.position.sales:
+                msg += f"\nTổng lãi/lỗ đã thực hiện: {account.position.realized_pnl:+,.0f} VND"
+            update.message.reply_text(msg)
             return
         
-        avg_price = bot_position.average_price()
-        total_qty = bot_position.total_quantity()
+        position = account.position
+        avg_price = position.average_price()
+        total_qty = position.total_quantity()
         
-        msg = f"💼 Vị thế {Config.STOCK_SYMBOL} ({len(bot_position.layers)} lớp):\n\n"
+        msg = f"💼 Vị thế {Config.STOCK_SYMBOL} ({len(position.layers)} lớp):\n\n"
         
-        for i, layer in enumerate(bot_position.layers, 1):
-            timestamp = datetime.fromisoformat(layer.time).strftime("%d/%m %H:%M")
+        for i, layer in enumerate(list(position.layers), 1):
+            timestamp = datetime.fromtimestamp(layer.timestamp).strftime("%d/%m %H:%M")
             msg += f"{i}. {layer.quantity:,} CP @ {layer.price:,.0f} VND\n"
             msg += f"   🕐 {timestamp}\n\n"
         
@@ -124,6 +277,8 @@ def telegram_position_handler(update, context):
         msg += f"   Giá TB: {avg_price:,.0f} VND\n"
         msg += f"   Tổng SL: {total_qty:,} CP\n"
         msg += f"   Tổng giá trị: {avg_price * total_qty:,.0f} VND"
+        if position.sales:
+            msg += f"\n   Lãi/lỗ đã thực hiện: {position.realized_pnl:+,.0f} VND ({len(position.sales)} lệnh bán)"
         
         update.message.reply_text(msg)
         
@@ -131,21 +286,232 @@ def telegram_position_handler(update, context):
         update.message.reply_text(f"❌ Lỗi: {str(e)}")
         logger.error(f"Error in position handler: {e}")
 
+def telegram_alert_handler(update, context):
+    """Handle /alert command: /alert <mã> >= <giá> | /alert <mã> pct <phần trăm>"""
+    try:
+        if len(context.args) != 3:
+            update.message.reply_text(
+                "❌ Sử dụng: /alert <mã> >= <giá> hoặc /alert <mã> pct <%>\n"
+                "Ví dụ: /alert SHB >= 16500\n"
+                "       /alert SHB pct -3"
+            )
+            return
+        
+        symbol, op, value = context.args[0].upper(), context.args[1], context.args[2]
+        
+        # Percent rules are relative to the current price
+        base_price = None
+        if op == 'pct':
+            batch = fetch_prices([symbol])
+            if symbol not in batch.prices:
+                update.message.reply_text(f"❌ Không lấy được giá {symbol}")
+                return
+            base_price = batch.prices[symbol].price
+        
+        account = chat_account(update, create=True)
+        rule = bot_alert_rules.add(symbol, op, value, base_price=base_price,
+                                   chat_id=account.chat_id)
+        save_state()
+        
+        update.message.reply_text(f"✅ Đã tạo cảnh báo {rule.describe()}")
+        
+    except PermissionError:
+        update.message.reply_text("⛔ Chat này không được phép sử dụng bot")
+    except ValueError as e:
+        update.message.reply_text(f"❌ {str(e)}")
+    except Exception as e:
+        update.message.reply_text(f"❌ Lỗi: {str(e)}")
+        logger.error(f"Error in alert handler: {e}")
+
+def telegram_alerts_handler(update, context):
+    """Handle /alerts command to list alert rules"""
+    try:
+        rules = bot_alert_rules.rules(chat_id=str(update.effective_chat.id))
+        if not rules:
+            update.message.reply_text("📭 Chưa có cảnh báo nào")
+            return
+        
+        msg = f"🔔 Cảnh báo ({len(rules)}):\n\n"
+        msg += "\n".join(
+            f"{rule.describe()} - đã kích hoạt {rule.fired} lần" for rule in rules
+        )
+        update.message.reply_text(msg)
+        
+    except Exception as e:
+        update.message.reply_text(f"❌ Lỗi: {str(e)}")
+        logger.error(f"Error in alerts handler: {e}")
+
+def telegram_unalert_handler(update, context):
+    """Handle /unalert command: /unalert <id>"""
+    try:
+        if len(context.args) != 1:
+            update.message.reply_text("❌ Sử dụng: /unalert <id>\nVí dụ: /unalert 3")
+            return
+        
+        rule_id = int(context.args[0].lstrip('#'))
+        own = {r.id for r in bot_alert_rules.rules(chat_id=str(update.effective_chat.id))}
+        rule = bot_alert_rules.remove(rule_id) if rule_id in own else None
+        if not rule:
+            update.message.reply_text(f"❌ Không tìm thấy cảnh báo #{context.args[0].lstrip('#')}")
+            return
+        save_state()
+        
+        update.message.reply_text(f"🗑 Đã xóa cảnh báo {rule.describe()}")
+        
+    except ValueError:
+        update.message.reply_text("❌ ID phải là số")
+    except Exception as e:
+        update.message.reply_text(f"❌ Lỗi: {str(e)}")
+        logger.error(f"Error in unalert handler: {e}")
+
+def telegram_threshold_handler(update, context):
+    """Handle /threshold command: /threshold [<ngưỡng giảm> <ngưỡng tăng>]"""
+    try:
+        if context.args and len(context.args) != 2:
+            update.message.reply_text(
+                "❌ Sử dụng: /threshold <ngưỡng giảm> <ngưỡng tăng>\n"
+                "Ví dụ: /threshold 0.3 0.5"
+            )
+            return
+        
+        chat_id = str(update.effective_chat.id)
+        if context.args:
+            down, up = float(context.args[0]), float(context.args[1])
+            bot_accounts.update(chat_id, lambda account: account.set_thresholds(down_threshold=down, up_threshold=up))
+            save_state()
+        
+        strategy_config = chat_account(update, create=True).strategy.config["strategy"]
+        update.message.reply_text(
+            f"⚙️ Ngưỡng chiến lược:\n"
+            f"   Mua thêm khi giảm: {strategy_config['down_threshold']:g}\n"
+            f"   Chốt lời khi tăng: {strategy_config['up_threshold']:g}"
+        )
+        
+    except PermissionError:
+        update.message.reply_text("⛔ Chat này không được phép sử dụng bot")
+    except ValueError as e:
+        update.message.reply_text(f"❌ {str(e)}")
+    except Exception as e:
+        update.message.reply_text(f"❌ Lỗi: {str(e)}")
+        logger.error(f"Error in threshold handler: {e}")
+
 def telegram_start_handler(update, context):
     """Handle /start command"""
+    if bot_notifier:
+        bot_notifier.unblock(update.effective_chat.id)
     msg = (
         f"🤖 SHB Alert Bot\n\n"
         f"Lệnh hỗ trợ:\n"
         f"/buy <giá> <SL> - Thêm vị thế mua\n"
         f"   Ví dụ: /buy 16500 1000\n\n"
+        f"/sell <giá> <SL> - Bán, tính lãi/lỗ đã thực hiện\n"
+        f"   Ví dụ: /sell 17500 500\n\n"
         f"/position - Xem vị thế hiện tại\n\n"
+        f"/alert <mã> >= <giá> - Cảnh báo khi giá vượt lên\n"
+        f"/alert <mã> <= <giá> - Cảnh báo khi giá giảm xuống\n"
+        f"/alert <mã> pct <%> - Cảnh báo khi giá thay đổi %\n"
+        f"/alerts - Danh sách cảnh báo\n"
+        f"/unalert <id> - Xóa cảnh báo\n\n"
+        f"/threshold <giảm> <tăng> - Đặt ngưỡng riêng cho chat này\n\n"
         f"Bot tự động gửi giá mỗi 5 phút ⏰"
     )
     update.message.reply_text(msg)
 
+def run_polling_loop(accounts, notifier, alert_rules=None, indicators=None, calendar=None):
+    """Blocking main loop: fetch, check every chat's strategy and alert rules, notify, sleep"""
+    # API outages back off and keep polling; only unexpected errors stop the loop
+    api_errors = 0
+    unexpected_errors = 0
+    max_consecutive_errors = 5
+    poller = AdaptivePoller(Config.to_dict())
+    calendar = calendar or calendar_from_config(Config.to_dict())
+    
+    while not shutdown_requested:
+        try:
+            if calendar.is_open():
+                # Fetch prices for the whole watchlist in one batch
+                batch = fetch_prices(polled_symbols(alert_rules))
+                for symbol, error in batch.errors.items():
+                    logger.warning(f"Failed to fetch {symbol}: {error}")
+                
+                # Streaming indicators are updated before the strategy reads them
+                if indicators:
+                    for symbol, data in batch.prices.items():
+                        indicators.update(symbol, data.price, data.volume)
+                
+                # Check every chat's strategy against whatever the batch returned
+                prices = {symbol: data.price for symbol, data in batch.prices.items()}
+                times = {symbol: data.timestamp for symbol, data in batch.prices.items()}
+                for chat_id, kind, msg, event in accounts.evaluate(prices, times):
+                    deliver_alert(notifier, chat_id, kind, msg, event)
+                    HealthCheckServer.increment_alerts()
+                
+                # User alert rules fire only when a level is crossed
+                if alert_rules:
+                    for symbol, data in batch.prices.items():
+                        for rule, msg in alert_rules.evaluate(symbol, data.price):
+                            event = event_key('alert', rule.id, data.timestamp)
+                            deliver_alert(notifier, rule.chat_id, 'alert', msg, event)
+                            HealthCheckServer.increment_alerts()
+                
+                # A failed STOCK_SYMBOL fetch counts as an API error only after the other symbols were checked
+                price = primary_price(batch)
+                logger.info(f"{Config.STOCK_SYMBOL} price: {price}")
+                
+                # Update health status
+                HealthCheckServer.update_status('running', last_price=price)
+                
+                # Reset error counters on success
+                api_errors = 0
+                unexpected_errors = 0
+                
+                # Sleep during market hours (shorter near strategy or alert rule levels if adaptive)
+                rule_levels = alert_rules.trigger_levels(prices) if alert_rules else ()
+                time.sleep(poller.next_interval(price, accounts.trigger_levels(), rule_levels))
+            else:
+                # Sleep until the next session opens (woken early on shutdown)
+                delay = calendar.seconds_until_open()
+                logger.info(f"Market closed, sleeping until {calendar.next_open():%Y-%m-%d %H:%M} ({delay / 3600:.1f}h)")
+                shutdown_event.wait(delay)
+                
+        except StockAPIError as e:
+            api_errors += 1
+            logger.error(f"Stock API error ({api_errors}/{max_consecutive_errors}): {e}")
+            HealthCheckServer.update_status('error', error=e)
+            
+            if api_errors == max_consecutive_errors:
+                error_msg = f"⚠️ Bot paused after {api_errors} consecutive API errors. Please check API status."
+                logger.critical(error_msg)
+                notifier.send(error_msg)
+            
+            # Open circuit: wait for its trial call; otherwise jittered exponential backoff
+            if isinstance(e, StockAPIUnavailableError):
+                delay = max(e.retry_after, 1)
+            else:
+                delay = backoff_delay(api_errors, base=5, cap=Config.POLL_INTERVAL_CLOSED)
+            logger.info(f"Retrying price fetch in {delay:.0f}s")
+            time.sleep(delay)
+                
+        except Exception as e:
+            unexpected_errors += 1
+            logger.exception(f"Unexpected error ({unexpected_errors}/{max_consecutive_errors}): {e}")
+            HealthCheckServer.update_status('error', error=e)
+            
+            try:
+                notifier.send(f"❌ Bot error: {html.escape(str(e)[:200], quote=False)}")
+            except:
+                logger.error("Failed to send error notification")
+            
+            if unexpected_errors >= max_consecutive_errors:
+                logger.critical("Too many consecutive errors, shutting down")
+                return
+            
+            time.sleep(60)
+
+
 def main():
     """Main bot loop"""
-    global shutdown_requested, bot_position, bot_notifier, bot_data_store
+    global shutdown_requested, bot_notifier, bot_data_store, bot_engine, bot_alert_rules, bot_indicators, bot_accounts, bot_scheduler
     
     # Health check server
     health_server = None
@@ -167,41 +533,103 @@ def main():
         health_server.start()
         HealthCheckServer.update_status('starting')
         
+        # Heavy dependencies are imported only now, so `--check-config` never loads
+        # them and the health check already answers 'starting' while they load
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from telegram.ext import Updater, CommandHandler
+        from services.telegram_http import create_bot
+        
+        HealthCheckServer.register_component('price_service', get_service().get_stats)
+        
         # Initialize components
-        logger.info(f"Initializing components for symbol: {Config.STOCK_SYMBOL}")
+        logger.info(f"Initializing components for symbol: {Config.STOCK_SYMBOL} (watchlist: {', '.join(Config.STOCK_WATCHLIST)})")
         
         data_store = DataStore()
         data = data_store.load()
         
-        position = Position(Config.STOCK_SYMBOL)
-        for layer in data.get("layers", []):
-            position.add_layer(layer["price"], layer["quantity"])
+        indicators = IndicatorBook(Config.to_dict())
+        accounts = AccountRegistry(
+            Config.to_dict(),
+            cooldowns=CooldownTracker(Config.STRATEGY_COOLDOWN_MINUTES * 60),
+            indicators=indicators,
+            allowed_chats=Config.TELEGRAM_ALLOWED_CHAT_IDS,
+        )
+        accounts.load(data, default_chat_id=Config.TELEGRAM_CHAT_ID)
+        accounts.get_or_create(Config.TELEGRAM_CHAT_ID)
+        
+        alert_rules = AlertRuleBook(data.get("alerts", []))
+        calendar = calendar_from_config(Config.to_dict())
+        
+        logger.info(f"Loaded {len(accounts)} chat accounts, {len(alert_rules)} alert rules")
         
-        logger.info(f"Loaded {len(position.layers)} position layers")
+        # One Bot for long polling, replies and pushed alerts; getUpdates has its own connection
+        bot = create_bot(
+            Config.TELEGRAM_BOT_TOKEN,
+            pool_size=Config.TELEGRAM_POOL_SIZE,
+            connect_timeout=Config.TELEGRAM_CONNECT_TIMEOUT,
+            read_timeout=Config.TELEGRAM_READ_TIMEOUT,
+            pool_timeout=Config.TELEGRAM_POOL_TIMEOUT,
+            base_url=Config.TELEGRAM_API_URL or None,
+        )
+        HealthCheckServer.register_component('telegram_http', bot.request.get_stats)
         
-        strategy = Strategy(Config.to_dict())
         notifier = Notifier(
             Config.TELEGRAM_BOT_TOKEN,
-            Config.TELEGRAM_CHAT_ID
+            Config.TELEGRAM_CHAT_ID,
+            bot=bot,
+            async_send=Config.NOTIFY_ASYNC,
+            queue_size=Config.NOTIFY_QUEUE_SIZE,
+            global_rate=Config.NOTIFY_GLOBAL_RATE,
+            chat_rate=Config.NOTIFY_CHAT_RATE,
+            chat_burst=Config.NOTIFY_CHAT_BURST,
+            workers=Config.NOTIFY_WORKERS,
         )
+        HealthCheckServer.register_component('notifier', notifier.get_stats)
+        
+        # Store every notification before sending; retried until Telegram accepts it.
+        # The outbox merges a chat's alerts within the window itself, once they are on disk
+        if Config.OUTBOX_FILE:
+            notifier = Outbox(
+                notifier,
+                path=Config.OUTBOX_FILE,
+                max_rows=Config.OUTBOX_MAX_ROWS,
+                max_age=Config.OUTBOX_MAX_AGE,
+                urgent_kinds=Config.NOTIFY_URGENT_KINDS,
+                window_seconds=Config.NOTIFY_COALESCE_WINDOW,
+            )
+            HealthCheckServer.register_component('outbox', notifier.get_stats)
+        else:
+            # Merge a chat's alerts and price reports within the window into one message
+            notifier = AlertCoalescer(
+                notifier,
+                window_seconds=Config.NOTIFY_COALESCE_WINDOW,
+                urgent_kinds=Config.NOTIFY_URGENT_KINDS,
+            )
+            HealthCheckServer.register_component('coalescer', notifier.get_stats)
         
         # Set global instances for Telegram handlers
-        bot_position = position
+        bot_accounts = accounts
         bot_notifier = notifier
         bot_data_store = data_store
+        bot_alert_rules = alert_rules
+        bot_indicators = indicators
         
         # Setup Telegram bot for commands
-        updater = Updater(token=Config.TELEGRAM_BOT_TOKEN, use_context=True)
+        updater = Updater(bot=bot, use_context=True, workers=Config.TELEGRAM_WORKERS)
         dispatcher = updater.dispatcher
         dispatcher.add_handler(CommandHandler('start', telegram_start_handler))
         dispatcher.add_handler(CommandHandler('buy', telegram_buy_handler))
+        dispatcher.add_handler(CommandHandler('sell', telegram_sell_handler))
         dispatcher.add_handler(CommandHandler('position', telegram_position_handler))
+        dispatcher.add_handler(CommandHandler('alert', telegram_alert_handler))
+        dispatcher.add_handler(CommandHandler('alerts', telegram_alerts_handler))
+        dispatcher.add_handler(CommandHandler('unalert', telegram_unalert_handler))
+        dispatcher.add_handler(CommandHandler('threshold', telegram_threshold_handler))
         updater.start_polling()
         logger.info("Telegram bot handlers registered")
         
         # Setup scheduler for 5-minute price updates
-        tz = pytz.timezone('Asia/Ho_Chi_Minh')
-        scheduler = BackgroundScheduler(timezone=tz)
+        scheduler = BackgroundScheduler(timezone=calendar.tz)
         scheduler.add_job(
             send_price_update,
             'interval',
@@ -209,6 +637,7 @@ def main():
             id='price_update'
         )
         scheduler.start()
+        bot_scheduler = scheduler
         logger.info("Scheduler started for 5-minute price updates")
         
         # Send first price update immediately
@@ -222,72 +651,32 @@ def main():
         notifier.send(
             f"🚀 SHB Alert Bot started\n"
             f"Symbol: {Config.STOCK_SYMBOL}\n"
-            f"API Provider: {Config.STOCK_API_PROVIDER}\n"
-            f"Positions: {len(position.layers)} layers"
+            f"Watchlist: {', '.join(Config.STOCK_WATCHLIST)}\n"
+            f"API Provider: {', '.join(Config.STOCK_API_PROVIDER)}\n"
+            f"Accounts: {len(accounts)} chats"
         )
         logger.info("Bot started successfully")
         HealthCheckServer.update_status('running')
         
         # Main loop
-        consecutive_errors = 0
-        max_consecutive_errors = 5
-        
-        while not shutdown_requested:
-            try:
-                if is_market_open(Config.to_dict()):
-                    # Fetch price
-                    price = fetch_price(symbol=Config.STOCK_SYMBOL)
-                    logger.info(f"{Config.STOCK_SYMBOL} price: {price}")
-                    
-                    # Update health status
-                    HealthCheckServer.update_status('running', last_price=price)
-                    
-                    # Check strategy
-                    messages = strategy.check(price, position)
-                    for msg in messages:
-                        notifier.send(msg)
-                        HealthCheckServer.increment_alerts()
-                    
-                    # Reset error counter on success
-                    consecutive_errors = 0
-                    
-                    # Sleep during market hours
-                    time.sleep(Config.POLL_INTERVAL_OPEN)
-                else:
-                    logger.debug("Market closed, sleeping...")
-                    time.sleep(Config.POLL_INTERVAL_CLOSED)
-                    
-            except StockAPIError as e:
-                consecutive_errors += 1
-                logger.error(f"Stock API error ({consecutive_errors}/{max_consecutive_errors}): {e}")
-                HealthCheckServer.update_status('error', error=e)
-                
-                if consecutive_errors >= max_consecutive_errors:
-                    error_msg = f"⚠️ Bot paused after {consecutive_errors} consecutive API errors. Please check API status."
-                    logger.critical(error_msg)
-                    notifier.send(error_msg)
-                    
-                    # Wait longer before retrying
-                    time.sleep(300)  # 5 minutes
-                    consecutive_errors = 0
-                else:
-                    time.sleep(60)  # Wait 1 minute before retry
-                    
-            except Exception as e:
-                consecutive_errors += 1
-                logger.exception(f"Unexpected error ({consecutive_errors}/{max_consecutive_errors}): {e}")
-                HealthCheckServer.update_status('error', error=e)
-                
-                try:
-                    notifier.send(f"❌ Bot error: {str(e)[:200]}")
-                except:
-                    logger.error("Failed to send error notification")
-                
-                if consecutive_errors >= max_consecutive_errors:
-                    logger.critical("Too many consecutive errors, shutting down")
-                    break
-                
-                time.sleep(60)
+        if Config.RUN_MODE == 'async':
+            bot_engine = AsyncPollingEngine(
+                symbols=Config.STOCK_WATCHLIST,
+                primary_symbol=Config.STOCK_SYMBOL,
+                accounts=accounts,
+                notifier=notifier,
+                interval_open=Config.POLL_INTERVAL_OPEN,
+                interval_closed=Config.POLL_INTERVAL_CLOSED,
+                market_open=calendar.is_open,
+                until_open=calendar.seconds_until_open,
+                poller=AdaptivePoller(Config.to_dict()),
+                alert_rules=alert_rules,
+                indicators=indicators,
+                broadcast_chats=broadcast_chats,
+            )
+            bot_engine.run()
+        else:
+            run_polling_loop(accounts, notifier, alert_rules, indicators, calendar)
         
         # Graceful shutdown
         logger.info("Shutting down gracefully...")
@@ -305,12 +694,7 @@ def main():
         
         # Save data
         try:
-            data_store.save({
-                "layers": [
-                    {"price": l.price, "quantity": l.quantity, "time": l.time}
-                    for l in position.layers
-                ]
-            })
+            save_state()
             logger.info("Data saved successfully")
         except Exception as e:
             logger.error(f"Error saving data on shutdown: {e}")
@@ -321,6 +705,10 @@ def main():
         except:
             logger.error("Failed to send shutdown notification")
         
+        # Flush queued notifications
+        notifier.close(timeout=Config.NOTIFY_DRAIN_TIMEOUT)
+        bot.request.stop()
+        
         # Stop health check server
         if health_server:
             health_server.stop()
@@ -346,6 +734,29 @@ def main():
             except:
                 pass
 
+def check_config():
+    """Validate configuration without loading Telegram, vnstock or the scheduler"""
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"\n❌ Configuration Error:\n{e}\n")
+        return 1
+    
+    print("✅ Configuration OK")
+    print(f"   Symbol: {Config.STOCK_SYMBOL} (watchlist: {', '.join(Config.STOCK_WATCHLIST)})")
+    print(f"   API Provider: {', '.join(Config.STOCK_API_PROVIDER)}")
+    print(f"   Run mode: {Config.RUN_MODE}")
+    print(f"   Market: {Config.MARKET_SESSIONS} {Config.MARKET_TIMEZONE}")
+    print(f"   Next open: {calendar_from_config(Config.to_dict()).next_open():%Y-%m-%d %H:%M}")
+    return 0
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SHB Alert Bot")
+    parser.add_argument('--check-config', action='store_true',
+                        help="validate configuration and exit without starting the bot")
+    args = parser.parse_args()
+    
+    if args.check_config:
+        sys.exit(check_config())
     main()
 
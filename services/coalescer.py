@@ -0,0 +1,199 @@
+"""
+Alert Coalescer
+Merges messages for the same chat that arrive within a window into one
+digest before they reach the Notifier, so volatile sessions do not flood
+chats with one Telegram message per alert
+"""
+import threading
+import time
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram rejects longer messages
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = "\n\n➖➖➖\n\n"
+
+
+class AlertCoalescer:
+    """Per-chat digest window in front of a Notifier"""
+
+    def __init__(self, notifier, window_seconds: float = 60, urgent_kinds=(),
+                 replace_kinds=('price_update',), clock=time.monotonic):
+        """
+        Initialize coalescer
+
+        Args:
+            notifier: Notifier (or anything with send(message, chat_id) and close())
+            window_seconds: How long the first message of a chat waits for others, 0 to disable
+            urgent_kinds: Kinds sent at once, together with anything pending for the chat
+            replace_kinds: Kinds where a newer pending message replaces the older one
+                (the 5-minute price report)
+            clock: Monotonic time source in seconds
+        """
+        self.notifier = notifier
+        self.window_seconds = window_seconds
+        self.urgent_kinds = frozenset(urgent_kinds)
+        self.replace_kinds = frozenset(replace_kinds)
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._pending: dict[str, list[tuple[str, str]]] = {}  # chat_id -> [(kind, message)]
+        self._due: dict[str, float] = {}  # chat_id -> flush time
+        self._closed = False
+        self._stats = {'received': 0, 'sent': 0, 'deduplicated': 0, 'replaced': 0, 'urgent': 0}
+
+        self._worker = None
+        if window_seconds > 0:
+            self._worker = threading.Thread(target=self._run, name="coalescer", daemon=True)
+            self._worker.start()
+        logger.info(f"AlertCoalescer initialized (window: {window_seconds}s, urgent: {', '.join(sorted(self.urgent_kinds)) or 'none'})")
+
+    @property
+    def chat_id(self):
+        return self.notifier.chat_id
+
+    def send(self, message: str, chat_id=None, kind: str = None, message_id: str = None) -> bool:
+        """
+        Queue a message for the chat's next digest
+
+        Messages without a kind (system messages) and urgent kinds are sent
+        immediately, carrying whatever is pending for the chat with them.
+        Identical pending messages are dropped.
+
+        Args:
+            message: Message text
+            chat_id: Target chat (default chat if None)
+            kind: Alert kind, e.g. 'buy_more' or 'price_update'
+            message_id: Event key; accepted for interface parity with Outbox and ignored
+
+        Returns:
+            bool: What the notifier returned, or True if held for a digest
+        """
+        chat_id = str(chat_id or self.notifier.chat_id)
+        with self._cond:
+            self._stats['received'] += 1
+            pending = self._pending.setdefault(chat_id, [])
+            duplicate = any(text == message for _, text in pending)
+
+            if self._worker and not self._closed and kind is not None and kind not in self.urgent_kinds:
+                if duplicate:
+                    self._stats['deduplicated'] += 1
+                    return True
+                if kind in self.replace_kinds:
+                    before = len(pending)
+                    pending[:] = [(k, text) for k, text in pending if k != kind]
+                    self._stats['replaced'] += before - len(pending)
+                pending.append((kind, message))
+                if chat_id not in self._due:
+                    self._due[chat_id] = self._clock() + self.window_seconds
+                    self._cond.notify()
+                return True
+
+            if kind is not None:
+                self._stats['urgent'] += 1
+            if duplicate:
+                self._stats['deduplicated'] += 1
+            kinds = {kind} | {k for k, text in pending if text != message}
+            messages = [message] + [text for _, text in pending if text != message]
+            self._take(chat_id)
+        return self._send(chat_id, messages, self._digest_kind(kinds))
+
+    def broadcast(self, message: str, chat_ids, kind: str = None, message_id: str = None):
+        """
+        Fan a message out to many chats
+
+        Urgent and kind-less messages go straight to Notifier.broadcast
+        (returning its Broadcast); others join each chat's digest.
+        """
+        if kind is None or kind in self.urgent_kinds or not self._worker:
+            return self.notifier.broadcast(message, chat_ids, kind)
+        for chat_id in chat_ids:
+            self.send(message, chat_id=chat_id, kind=kind)
+        return None
+
+    def unblock(self, chat_id):
+        self.notifier.unblock(chat_id)
+
+    def _take(self, chat_id):
+        self._pending.pop(chat_id, None)
+        self._due.pop(chat_id, None)
+
+    @staticmethod
+    def _digest_kind(kinds):
+        """Kind passed on with a digest: the messages' common kind, else 'digest'"""
+        return next(iter(kinds)) if len(kinds) == 1 else 'digest'
+
+    def _send(self, chat_id, messages, kind=None):
+        """Send messages as few Telegram messages as the length limit allows"""
+        result = True
+        for digest in self._pack(messages):
+            with self._cond:
+                self._stats['sent'] += 1
+            try:
+                result = self.notifier.send(digest, chat_id=chat_id, kind=kind) and result
+            except Exception as e:
+                logger.error(f"Failed to send digest to chat {chat_id}: {e}")
+                result = False
+        return result
+
+    @staticmethod
+    def _pack(messages):
+        chunks, current = [], ""
+        for message in messages:
+            message = message[:MAX_MESSAGE_LENGTH]
+            if current and len(current) + len(SEPARATOR) + len(message) > MAX_MESSAGE_LENGTH:
+                chunks.append(current)
+                current = ""
+            current = f"{current}{SEPARATOR}{message}" if current else message
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                now = self._clock()
+                ready = [chat_id for chat_id, due in self._due.items() if due <= now]
+                if not ready:
+                    self._cond.wait(min(self._due.values()) - now)
+                    continue
+                batches = []
+                for chat_id in ready:
+                    batches.append((chat_id, self._pending.get(chat_id, [])))
+                    self._take(chat_id)
+
+            for chat_id, pending in batches:
+                if pending:
+                    self._send(chat_id, [text for _, text in pending], self._digest_kind({k for k, _ in pending}))
+
+    def flush(self):
+        """Send every pending digest now"""
+        with self._cond:
+            batches = [(chat_id, pending) for chat_id, pending in self._pending.items() if pending]
+            self._pending.clear()
+            self._due.clear()
+        for chat_id, pending in batches:
+            self._send(chat_id, [text for _, text in pending], self._digest_kind({k for k, _ in pending}))
+
+    def close(self, timeout=5):
+        """Flush pending digests, stop the window thread and close the notifier"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker:
+            self._worker.join(timeout)
+        self.flush()
+        self.notifier.close(timeout)
+
+    def get_stats(self) -> dict:
+        """Counters; 'saved' is how many Telegram sends merging avoided"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = sum(len(p) for p in self._pending.values())
+        stats['saved'] = stats['received'] - stats['sent'] - stats['pending']
+        return stats
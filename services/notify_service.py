@@ -1,20 +1,197 @@
-from telegram import Bot
-from telegram.error import TelegramError
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from utils.circuit_breaker import backoff_delay
 from utils.logger import get_logger
+from utils.rate_limiter import TokenBucket
 
 logger = get_logger(__name__)
 
+# Delivery outcomes
+SENT = 'sent'
+FAILED = 'failed'  # gave up on a transient error (network, rate limit); may succeed later
+REJECTED = 'rejected'  # Telegram refused the message itself (bad markup, bad chat); never retry
+BLOCKED = 'blocked'
+DROPPED = 'dropped'
+
+
+class Broadcast:
+    """Progress of one message fanned out to many chats"""
+
+    def __init__(self, broadcast_id, chat_ids, on_done=None):
+        self.id = broadcast_id
+        self.chat_ids = list(chat_ids)
+        self.counts = Counter()
+        self.on_done = on_done  # called with the Broadcast once every chat has an outcome
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.chat_ids:
+            self._done.set()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self.chat_ids) - sum(self.counts.values())
+
+    def record(self, status):
+        with self._lock:
+            self.counts[status] += 1
+            done = sum(self.counts.values()) >= len(self.chat_ids)
+            if done:
+                self._done.set()
+        if done and self.on_done:
+            self.on_done(self)
+
+    def wait(self, timeout=None):
+        """Block until every chat has an outcome; True if done"""
+        return self._done.wait(timeout)
+
+    def __repr__(self):
+        return f"Broadcast(#{self.id}, {len(self.chat_ids)} chats, {dict(self.counts)})"
+
+
 class Notifier:
-    def __init__(self, token, chat_id):
-        self.bot = Bot(token=token)
+    def __init__(self, token, chat_id, async_send=False, queue_size=1000,
+                 global_rate=30, chat_rate=1, chat_burst=3, max_attempts=3,
+                 workers=1, bot=None, clock=time.monotonic):
+        """
+        Args:
+            token: Telegram bot token
+            chat_id: Default chat for send() without chat_id
+            async_send: Queue messages and send them from worker threads
+            queue_size: Max queued messages in async mode; newer ones are dropped
+            global_rate: Messages per second across all chats
+            chat_rate: Messages per second per chat (burst of chat_burst)
+            max_attempts: Tries per message on network errors before dropping it
+            workers: Sender threads; a chat is served by one at a time so its order is kept
+            bot: Bot-like object with send_message (default: telegram.Bot)
+            clock: Monotonic time source in seconds
+        """
+        if bot is None:
+            from telegram import Bot  # deferred: python-telegram-bot is slow to import
+            bot = Bot(token=token)
+
+        self.bot = bot
         self.chat_id = chat_id
-        logger.info(f"Notifier initialized for chat_id: {chat_id}")
+        self.async_send = async_send
+        self.queue_size = queue_size
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self._clock = clock
+
+        # Async mode: per-chat FIFO queues drained by a worker pool
+        self._cond = threading.Condition()
+        self._pending = {}  # chat_id -> deque of [message, enqueued_at, attempts, broadcast]
+        self._inflight = set()  # chats a worker is sending to right now
+        self._buckets = {}  # chat_id -> TokenBucket
+        # Capacity 1: a full bucket of global_rate tokens plus its refill would allow ~2x the rate in the first second
+        self._global = TokenBucket(global_rate, 1, clock=clock)
+        self._depth = 0
+        self._closed = False
+        self._workers = []
+        self._latencies = deque(maxlen=1000)
+        self.deliveries = deque(maxlen=1000)  # recent (chat_id, status, attempts, latency_s, broadcast_id)
+        self.blocked = set()  # chats that blocked the bot; skipped until unblock()
+        self._broadcast_ids = itertools.count(1)
+        self._stats = {'queued': 0, 'sent': 0, 'failed': 0, 'rejected': 0, 'dropped': 0, 'rate_limited': 0, 'retried': 0,
+                       'blocked': 0, 'broadcasts': 0}
+
+        if async_send:
+            for i in range(max(1, workers)):
+                worker = threading.Thread(target=self._run, name=f"notifier-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        mode = (f"async, {len(self._workers)} workers, queue {queue_size}, {global_rate}/s global, "
+                f"{chat_rate}/s per chat") if async_send else "sync"
+        logger.info(f"Notifier initialized for chat_id: {chat_id} ({mode})")
+
+    def send(self, message, chat_id=None, kind=None, message_id=None):
+        """
+        Send message to Telegram (default chat if chat_id is None)
+
+        In async mode the message is queued and this returns immediately:
+        True if queued, False if the queue is full or closed. In sync mode
+        errors are logged and re-raised. Chats that blocked the bot are
+        skipped (False).
+
+        kind and message_id are accepted for interface parity with
+        AlertCoalescer and Outbox and ignored.
+        """
+        return self._submit(str(chat_id or self.chat_id), message)
+
+    def broadcast(self, message, chat_ids, kind=None, message_id=None):
+        """
+        Fan one message out to many chats
+
+        Chats are sent to concurrently by the worker pool (in order per
+        chat, within the global rate); chats that blocked the bot are
+        recorded as blocked without a request.
+
+        Returns:
+            Broadcast: Per-outcome counts, with wait() to block until done
+        """
+        chat_ids = list(dict.fromkeys(str(c) for c in chat_ids))
+        broadcast = Broadcast(next(self._broadcast_ids), chat_ids)
+        with self._cond:
+            self._stats['broadcasts'] += 1
+        for chat_id in chat_ids:
+            try:
+                self._submit(chat_id, message, broadcast)
+            except Exception:
+                pass  # recorded as failed by _submit
+        logger.info(f"Broadcast #{broadcast.id} to {len(chat_ids)} chats: {message[:50]}...")
+        return broadcast
+
+    def track(self, message, chat_id=None, on_done=None):
+        """
+        Send to one chat and follow the outcome
+
+        Like send(), but never raises; the returned Broadcast (one chat, no
+        id) resolves with SENT, FAILED, REJECTED, BLOCKED or DROPPED once the message
+        is delivered or given up on, and on_done is called with it then.
+        """
+        chat_id = str(chat_id or self.chat_id)
+        tracker = Broadcast(None, [chat_id], on_done=on_done)
+        try:
+            self._submit(chat_id, message, tracker)
+        except Exception:
+            pass  # recorded as failed by _submit
+        return tracker
+
+    def _submit(self, chat_id, message, broadcast=None):
+        if chat_id in self.blocked:
+            self._record(chat_id, BLOCKED, 0, None, broadcast)
+            return False
+
+        if not self.async_send:
+            started = self._clock()
+            try:
+                self._deliver(chat_id, message)
+            except Exception as e:
+                self._record(chat_id, self._failure_status(chat_id, e), 1, None, broadcast)
+                raise
+            self._record(chat_id, SENT, 1, self._clock() - started, broadcast)
+            return True
+
+        with self._cond:
+            if self._closed or self._depth >= self.queue_size:
+                logger.warning(f"Notification queue {'closed' if self._closed else 'full'}, dropped: {message[:50]}...")
+                self._record_locked(chat_id, DROPPED, 0, None, broadcast)
+                return False
+            self._pending.setdefault(chat_id, deque()).append([message, self._clock(), 0, broadcast])
+            self._depth += 1
+            self._stats['queued'] += 1
+            self._cond.notify()
+        return True
+
+    def _deliver(self, chat_id, message):
+        from telegram.error import TelegramError
 
-    def send(self, message):
-        """Send message to Telegram with error handling"""
         try:
             self.bot.send_message(
-                chat_id=self.chat_id,
+                chat_id=chat_id,
                 text=message,
                 parse_mode='HTML'
             )
@@ -26,3 +203,163 @@ class Notifier:
             logger.error(f"Unexpected error sending message: {e}")
             raise
 
+    def _failure_status(self, chat_id, error):
+        """
+        Outcome of a failed send
+
+        BLOCKED (and remember the chat) if the bot was blocked or kicked,
+        FAILED for errors worth retrying later, REJECTED for the rest.
+        """
+        from telegram.error import BadRequest, NetworkError, RetryAfter, Unauthorized
+
+        if isinstance(error, Unauthorized):
+            if chat_id not in self.blocked:
+                logger.warning(f"Chat {chat_id} blocked the bot, skipping it from now on")
+            self.blocked.add(chat_id)
+            return BLOCKED
+        # BadRequest subclasses NetworkError, but the same request will fail again
+        if isinstance(error, (NetworkError, RetryAfter)) and not isinstance(error, BadRequest):
+            return FAILED
+        return REJECTED
+
+    def _record_locked(self, chat_id, status, attempts, latency, broadcast):
+        self._stats[status] += 1
+        if latency is not None:
+            self._latencies.append(latency)
+        self.deliveries.append((chat_id, status, attempts, latency, broadcast.id if broadcast else None))
+        if broadcast:
+            broadcast.record(status)
+
+    def _record(self, chat_id, status, attempts, latency, broadcast):
+        with self._cond:
+            self._record_locked(chat_id, status, attempts, latency, broadcast)
+
+    def unblock(self, chat_id):
+        """Deliver to a chat again (e.g. after it sent /start)"""
+        self.blocked.discard(str(chat_id))
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, clock=self._clock)
+        return bucket
+
+    def _next(self):
+        """
+        Pop the next sendable (chat_id, item) and mark the chat in flight
+
+        Returns seconds to wait when only rate limits stand in the way, or
+        None when every pending chat is already being sent to.
+        """
+        best_chat, best_wait = None, None
+        for chat_id in self._pending:
+            if chat_id in self._inflight:
+                continue
+            wait = self._bucket(chat_id).wait_time()
+            if best_wait is None or wait < best_wait:
+                best_chat, best_wait = chat_id, wait
+                if wait == 0:
+                    break
+        if best_chat is None:
+            return None
+        wait = max(self._global.wait_time(), best_wait)
+        if wait > 0:
+            return wait
+
+        self._global.acquire()
+        self._bucket(best_chat).acquire()
+        queue = self._pending[best_chat]
+        item = queue.popleft()
+        if not queue:
+            del self._pending[best_chat]
+        self._depth -= 1
+        self._inflight.add(best_chat)
+        return best_chat, item
+
+    def _requeue(self, chat_id, item):
+        """Put a failed item back at the head of its chat so order is kept"""
+        with self._cond:
+            self._pending.setdefault(chat_id, deque()).appendleft(item)
+            self._depth += 1
+
+    def _drop_chat(self, chat_id, status):
+        """Resolve everything still queued for a chat with status"""
+        with self._cond:
+            for item in self._pending.pop(chat_id, ()):
+                self._depth -= 1
+                self._record_locked(chat_id, status, 0, None, item[3])
+
+    def _run(self):
+        from telegram.error import BadRequest, NetworkError, RetryAfter, Unauthorized
+
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and not self._inflight:
+                    return
+                picked = self._next()
+                if not isinstance(picked, tuple):
+                    self._cond.wait(picked)
+                    continue
+
+            chat_id, item = picked
+            message, enqueued_at, attempts, broadcast = item
+            try:
+                self._deliver(chat_id, message)
+                self._record(chat_id, SENT, attempts + 1, self._clock() - enqueued_at, broadcast)
+            except RetryAfter as e:
+                # Telegram asked us to back off: pause the chat and retry the same message
+                logger.warning(f"Rate limited by Telegram for chat {chat_id}, retry after {e.retry_after}s")
+                with self._cond:
+                    self._stats['rate_limited'] += 1
+                    self._bucket(chat_id).pause(e.retry_after)
+                self._requeue(chat_id, item)
+            except Unauthorized as e:
+                self._record(chat_id, self._failure_status(chat_id, e), attempts + 1, None, broadcast)
+                self._drop_chat(chat_id, BLOCKED)
+            except BadRequest:
+                # Subclass of NetworkError, but retrying the same request will not help
+                self._record(chat_id, REJECTED, attempts + 1, None, broadcast)
+            except NetworkError:
+                item[2] = attempts + 1
+                if item[2] >= self.max_attempts:
+                    logger.error(f"Giving up on message to chat {chat_id} after {item[2]} attempts")
+                    self._record(chat_id, FAILED, item[2], None, broadcast)
+                else:
+                    with self._cond:
+                        self._stats['retried'] += 1
+                        self._bucket(chat_id).pause(backoff_delay(item[2], base=1, cap=30))
+                    self._requeue(chat_id, item)
+            except Exception:
+                # Invalid token, malformed chat id, ...: retrying will not help
+                self._record(chat_id, REJECTED, attempts + 1, None, broadcast)
+            finally:
+                with self._cond:
+                    self._inflight.discard(chat_id)
+                    self._cond.notify_all()
+
+    def close(self, timeout=5):
+        """Stop accepting messages and wait up to timeout seconds for the queue to drain"""
+        if not self._workers:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        if any(worker.is_alive() for worker in self._workers):
+            logger.warning(f"Notifier closed with {self._depth} messages unsent")
+
+    def get_stats(self):
+        """Queue depth, delivery counters and enqueue-to-sent latency"""
+        with self._cond:
+            latencies = sorted(self._latencies)
+            stats = dict(self._stats, depth=self._depth, chats_pending=len(self._pending),
+                         in_flight=len(self._inflight), blocked_chats=len(self.blocked))
+        if latencies:
+            stats['latency_avg_ms'] = round(sum(latencies) / len(latencies) * 1000, 1)
+            stats['latency_p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+            stats['latency_max_ms'] = round(latencies[-1] * 1000, 1)
+        return stats
@@ -0,0 +1,448 @@
+"""
+Notification Outbox
+SQLite table every notification is written to before it is sent. A
+background deliverer hands the rows to the Notifier and deletes them only
+once Telegram accepted them, retrying transient failures with backoff and
+keeping each chat's rows in order, so alerts survive Telegram outages and
+restarts (at-least-once delivery). With a digest window, rows wait out the
+window on disk and a chat's queued rows are merged into one message when
+they are sent, so nothing held for a digest is lost in a crash
+"""
+import itertools
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from services.coalescer import MAX_MESSAGE_LENGTH, SEPARATOR
+from services.notify_service import BLOCKED, DROPPED, REJECTED, SENT, Broadcast
+from utils.circuit_breaker import backoff_delay
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    chat_id TEXT NOT NULL,
+    kind TEXT,
+    message TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_chat ON outbox (chat_id, seq);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt);
+CREATE TABLE IF NOT EXISTS delivered (
+    id TEXT PRIMARY KEY,
+    at REAL NOT NULL
+);
+"""
+
+# Seconds between sweeps of expired rows and old delivered ids
+SWEEP_INTERVAL = 60
+
+
+def message_id(chat_id, key=None):
+    """
+    Outbox id of a notification
+
+    Alert sources pass an event key (what fired, at which level, on which
+    quote), so the same event enqueued twice, e.g. re-raised from the same
+    quote after a restart reset the cooldowns, is stored and sent once,
+    while an alert that legitimately repeats on a later quote is a new event.
+    Sends without a key (system messages, reports) get a fresh id.
+    """
+    return uuid.uuid4().hex if key is None else f"{key}:{chat_id}"
+
+
+def is_keyed(row_id):
+    """True for ids built from an event key (random ids have no ':')"""
+    return ':' in row_id
+
+
+class Outbox:
+    """Durable queue in front of a Notifier"""
+
+    def __init__(self, notifier, path='storage/outbox.db', max_rows: int = 10000, max_age: float = 86400,
+                 dedup_window: float = 300, retry_base: float = 2, retry_cap: float = 300,
+                 replace_kinds=('price_update',), urgent_kinds=(), window_seconds: float = 0,
+                 clock=time.time):
+        """
+        Open (or create) the outbox and start the deliverer
+
+        Args:
+            notifier: Notifier (anything with track(message, chat_id, on_done) and close())
+            path: SQLite file; rows left by a previous run are delivered first
+            max_rows: Undelivered rows kept; the oldest are dropped beyond it
+            max_age: Seconds after which an undelivered row is given up
+            dedup_window: Seconds a delivered keyed send's id is remembered, so it is not sent twice
+            retry_base, retry_cap: Full-jitter backoff between attempts, in seconds
+            replace_kinds: Kinds where a newer row replaces the chat's undelivered older one
+            urgent_kinds: Kinds that, like system messages, skip the digest window (taking the
+                chat's waiting rows with them) and may overtake a row waiting out its backoff
+            window_seconds: How long a chat's first non-urgent row waits for others to merge
+                with, 0 to send every row on its own
+            clock: Wall-clock time source in seconds (rows outlive the process)
+        """
+        self.notifier = notifier
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.dedup_window = dedup_window
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.replace_kinds = frozenset(replace_kinds)
+        self.urgent_kinds = frozenset(urgent_kinds)
+        self.window_seconds = window_seconds
+        self._clock = clock
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        with self._db:
+            # A backoff from the last run says nothing about Telegram now; retry recovered rows at once
+            now = clock()
+            self._db.execute("UPDATE outbox SET next_attempt = ? WHERE next_attempt > ?", (now, now))
+        self._rows = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+        self._cond = threading.Condition()
+        self._inflight = {}  # chat_id -> row ids handed to the notifier as one message
+        self._completed = deque()  # (chat_id, row ids, status) reported by the notifier
+        self._trackers = {}  # row id -> Broadcast of an outbox.broadcast() call
+        self._broadcast_ids = itertools.count(1)
+        self._closed = False
+        self._drain_deadline = None
+        self._next_sweep = 0.0
+        self._stats = {'queued': 0, 'delivered': 0, 'coalesced': 0, 'retried': 0, 'deduplicated': 0,
+                       'replaced': 0, 'evicted': 0, 'expired': 0, 'blocked': 0, 'rejected': 0,
+                       'recovered': self._rows}
+
+        self._worker = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._worker.start()
+        if self._rows:
+            logger.warning(f"Outbox has {self._rows} undelivered notifications from the last run, resending")
+        logger.info(f"Outbox initialized at {self.path} (max {max_rows} rows, max age {max_age:.0f}s)")
+
+    @property
+    def chat_id(self):
+        return self.notifier.chat_id
+
+    def send(self, message: str, chat_id=None, kind: str = None, message_id: str = None) -> bool:
+        """
+        Store a notification for delivery and return at once
+
+        Args:
+            message: Message text
+            chat_id: Target chat (default chat if None)
+            kind: Alert kind; None for system messages
+            message_id: Event key from the alert source; a send with a key that is
+                still queued or was delivered within dedup_window is skipped
+
+        Returns:
+            bool: True if stored (or already stored/delivered), False once closed
+        """
+        chat_id = str(chat_id or self.notifier.chat_id)
+        return self._enqueue([chat_id], message, kind, message_id) is not None
+
+    def broadcast(self, message: str, chat_ids, kind: str = None, message_id: str = None):
+        """
+        Store one row per chat
+
+        Returns:
+            Broadcast: Resolves once every chat's row is delivered or given up
+        """
+        chat_ids = list(dict.fromkeys(str(c) for c in chat_ids))
+        broadcast = Broadcast(next(self._broadcast_ids), chat_ids)
+        self._enqueue(chat_ids, message, kind, message_id, broadcast=broadcast)
+        return broadcast
+
+    def unblock(self, chat_id):
+        self.notifier.unblock(chat_id)
+
+    def _enqueue(self, chat_ids, message, kind, key=None, broadcast=None):
+        """Insert rows in one transaction; returns how many were new, None if closed"""
+        now = self._clock()
+        with self._cond:
+            if self._db is None:
+                logger.warning(f"Outbox closed, dropped: {message[:50]}...")
+                for _ in chat_ids:
+                    if broadcast:
+                        broadcast.record(DROPPED)
+                return None
+            try:
+                added = self._insert(chat_ids, message, kind, key, broadcast, now)
+            except sqlite3.Error as e:
+                logger.error(f"Outbox write failed ({e}), sending without it")
+            else:
+                self._cond.notify()
+                return added
+
+        # Disk full, locked file, ...: better a best-effort send than none
+        on_done = (lambda tracker: broadcast.record(next(iter(tracker.counts)))) if broadcast else None
+        for chat_id in chat_ids:
+            self.notifier.track(message, chat_id, on_done=on_done)
+        return 0
+
+    def _urgent(self, kind):
+        return kind is None or kind in self.urgent_kinds
+
+    def _insert(self, chat_ids, message, kind, key, broadcast, now):
+        added = 0
+        due = now + self.window_seconds if self.window_seconds and not self._urgent(kind) else now
+        with self._db:
+            for chat_id in chat_ids:
+                row_id = message_id(chat_id, key)
+                if key is not None and self.dedup_window and self._db.execute(
+                        "SELECT 1 FROM delivered WHERE id = ? AND at >= ?",
+                        (row_id, now - self.dedup_window)).fetchone():
+                    self._stats['deduplicated'] += 1
+                    if broadcast:
+                        broadcast.record(SENT)
+                    continue
+
+                if kind in self.replace_kinds:
+                    inflight = self._inflight.get(chat_id, ())
+                    replaced = [r[0] for r in self._db.execute(
+                        "SELECT id FROM outbox WHERE chat_id = ? AND kind = ?", (chat_id, kind))
+                        if r[0] not in inflight]
+                    self._delete(replaced, DROPPED)
+                    self._stats['replaced'] += len(replaced)
+
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO outbox (id, chat_id, kind, message, created, next_attempt) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (row_id, chat_id, kind, message, now, due))
+                if cursor.rowcount == 0:
+                    self._stats['deduplicated'] += 1  # same key still undelivered
+                    if broadcast:
+                        broadcast.record(SENT)
+                    continue
+                self._rows += 1
+                added += 1
+                self._stats['queued'] += 1
+                if broadcast:
+                    self._trackers[row_id] = broadcast
+                if due == now and self.window_seconds:
+                    # Like the coalescer: an urgent row ends the window of the chat's waiting rows
+                    self._db.execute("UPDATE outbox SET next_attempt = ? WHERE chat_id = ? "
+                                     "AND attempts = 0 AND next_attempt > ?", (now, chat_id, now))
+
+            excess = self._rows - self.max_rows
+            if excess > 0:
+                oldest = self._db.execute("SELECT id FROM outbox ORDER BY seq LIMIT ?", (excess,)).fetchall()
+                self._delete([r[0] for r in oldest], DROPPED)
+                self._stats['evicted'] += len(oldest)
+                logger.warning(f"Outbox full ({self.max_rows} rows), dropped the {len(oldest)} oldest")
+        return added
+
+    def _delete(self, row_ids, status):
+        """Delete rows (inside a transaction) and resolve their broadcasts with status"""
+        for row_id in row_ids:
+            self._rows -= self._db.execute("DELETE FROM outbox WHERE id = ?", (row_id,)).rowcount
+            broadcast = self._trackers.pop(row_id, None)
+            if broadcast:
+                broadcast.record(status)
+
+    def _on_done(self, chat_id, row_ids):
+        def done(tracker):
+            with self._cond:
+                self._completed.append((chat_id, row_ids, next(iter(tracker.counts))))
+                self._cond.notify()
+        return done
+
+    def _settle(self, now):
+        """Apply the notifier's outcomes: delete delivered and undeliverable rows, reschedule failed ones"""
+        with self._db:
+            while self._completed:
+                chat_id, row_ids, status = self._completed.popleft()
+                if self._inflight.get(chat_id) == row_ids:
+                    del self._inflight[chat_id]
+                if status == SENT:
+                    self._delete(row_ids, SENT)
+                    # Only keyed events can be enqueued again; random ids need no record
+                    self._db.executemany("INSERT OR REPLACE INTO delivered (id, at) VALUES (?, ?)",
+                                         [(row_id, now) for row_id in row_ids if is_keyed(row_id)])
+                    self._stats['delivered'] += len(row_ids)
+                elif status == BLOCKED:
+                    # Retrying cannot help until the chat sends /start again
+                    self._delete(row_ids, BLOCKED)
+                    self._stats['blocked'] += len(row_ids)
+                elif status == REJECTED:
+                    # Telegram refused the message itself; resending it would fail the same way
+                    row = self._db.execute("SELECT message FROM outbox WHERE id = ?", (row_ids[0],)).fetchone()
+                    logger.error(f"Notification to chat {chat_id} rejected by Telegram, dropped "
+                                 f"{len(row_ids)} row(s): {row[0][:100] if row else ''}")
+                    self._delete(row_ids, REJECTED)
+                    self._stats['rejected'] += len(row_ids)
+                else:
+                    self._reschedule(chat_id, row_ids, status, now)
+
+    def _reschedule(self, chat_id, row_ids, status, now):
+        """Back off rows whose send failed; rows past max_age are given up"""
+        rows = self._db.execute(
+            f"SELECT id, attempts, created FROM outbox WHERE id IN ({','.join('?' * len(row_ids))})",
+            row_ids).fetchall()  # replaced or evicted rows are gone already
+        if not rows:
+            return
+        attempts = max(row[1] for row in rows) + 1
+        expired = [row[0] for row in rows if now - row[2] >= self.max_age]
+        if expired:
+            logger.error(f"Giving up on {len(expired)} notification(s) to chat {chat_id} after {attempts} attempts")
+            self._delete(expired, status)
+            self._stats['expired'] += len(expired)
+        retry = [row[0] for row in rows if row[0] not in expired]
+        if retry:
+            # The merged rows stay together and are retried as one message
+            delay = backoff_delay(attempts, base=self.retry_base, cap=self.retry_cap)
+            self._db.executemany("UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?",
+                                 [(now + delay, row_id) for row_id in retry])
+            self._stats['retried'] += len(retry)
+            logger.warning(f"Notification to chat {chat_id} {status}, retry #{attempts} in {delay:.1f}s")
+
+    def _sweep(self, now):
+        """Expire rows nobody could deliver in time and forget old delivered ids"""
+        with self._db:
+            expired = [r[0] for r in self._db.execute(
+                "SELECT id FROM outbox WHERE created < ?", (now - self.max_age,)).fetchall()
+                if not any(r[0] in row_ids for row_ids in self._inflight.values())]
+            self._delete(expired, DROPPED)
+            self._stats['expired'] += len(expired)
+            self._db.execute("DELETE FROM delivered WHERE at < ?", (now - self.dedup_window,))
+        self._next_sweep = now + SWEEP_INTERVAL
+
+    def _due(self, now):
+        """
+        Next message of every chat that is due and has nothing in flight
+
+        A chat's rows go out in order: while its oldest row backs off, newer
+        rows wait, except urgent kinds and system messages, which go out in
+        their own order (a sell alert is not held up by a failing price report).
+
+        Returns:
+            tuple: (due messages [(chat_id, row ids, text)], seconds until the next one or None)
+        """
+        # SQLite takes the bare columns from the row holding MIN(seq)
+        heads = "SELECT chat_id, id, message, next_attempt, MIN(seq) FROM outbox {} GROUP BY chat_id"
+        urgent = ','.join('?' * len(self.urgent_kinds))
+        candidates = {}  # chat_id -> [(seq, row_id, message, next_attempt)] of its oldest and oldest urgent row
+        for where, params in (('', ()), (f"WHERE kind IS NULL OR kind IN ({urgent})", tuple(self.urgent_kinds))):
+            for chat_id, row_id, message, next_attempt, seq in self._db.execute(heads.format(where), params):
+                if chat_id not in self._inflight:
+                    candidates.setdefault(chat_id, []).append((seq, row_id, message, next_attempt))
+
+        ready, later = [], None
+        for chat_id, rows in candidates.items():
+            rows.sort()
+            first = next((row for row in rows if row[3] <= now), None)
+            if first:
+                ready.append((first[0], chat_id, first[1], first[2], first is not rows[0]))
+            else:
+                soonest = min(row[3] for row in rows)
+                later = soonest if later is None else min(later, soonest)
+
+        due = []
+        for _, chat_id, row_id, message, overtaking in sorted(ready):
+            if self.window_seconds:
+                due.append((chat_id, *self._digest(chat_id, now, urgent_only=overtaking)))
+            else:
+                due.append((chat_id, (row_id,), message))
+        return due, (later - now if later is not None else None)
+
+    def _digest(self, chat_id, now, urgent_only):
+        """
+        A chat's queued rows, oldest first, merged into one message
+
+        Identical texts are sent once and the message stops at Telegram's
+        length limit; the rest goes in the next one.
+
+        Returns:
+            tuple: (row ids, text)
+        """
+        query = "SELECT id, message FROM outbox WHERE chat_id = ?"
+        params = [chat_id]
+        if urgent_only:
+            # The oldest row is backing off: only due urgent rows may go ahead of it
+            query += f" AND next_attempt <= ? AND (kind IS NULL OR kind IN ({','.join('?' * len(self.urgent_kinds))}))"
+            params += [now, *self.urgent_kinds]
+
+        row_ids, texts, length = [], [], 0
+        for row_id, message in self._db.execute(query + " ORDER BY seq", params):
+            message = message[:MAX_MESSAGE_LENGTH]
+            if message not in texts:
+                if texts and length + len(SEPARATOR) + len(message) > MAX_MESSAGE_LENGTH:
+                    break
+                length += len(message) + (len(SEPARATOR) if texts else 0)
+                texts.append(message)
+            row_ids.append(row_id)
+        return tuple(row_ids), SEPARATOR.join(texts)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._db is None:
+                    return
+                now = self._clock()
+                try:
+                    self._settle(now)
+                    if now >= self._next_sweep:
+                        self._sweep(now)
+                    due, wait = self._due(now)
+                except sqlite3.Error as e:
+                    logger.error(f"Outbox read failed: {e}")
+                    due, wait = [], 5.0
+
+                if self._closed and ((not due and not self._inflight)
+                                     or time.monotonic() >= self._drain_deadline):
+                    return
+                if not due:
+                    wait = wait if wait is not None else SWEEP_INTERVAL
+                    if self._closed:
+                        wait = min(wait, self._drain_deadline - time.monotonic())
+                    self._cond.wait(max(wait, 0))
+                    continue
+                for chat_id, row_ids, _ in due:
+                    self._inflight[chat_id] = row_ids
+                    self._stats['coalesced'] += len(row_ids) - 1
+
+            # Outside the lock: the notifier may report outcomes from its own threads
+            for chat_id, row_ids, message in due:
+                self.notifier.track(message, chat_id, on_done=self._on_done(chat_id, row_ids))
+
+    def close(self, timeout=5):
+        """Deliver what can be delivered within timeout; the rest stays for the next start"""
+        with self._cond:
+            self._closed = True
+            self._drain_deadline = time.monotonic() + timeout
+            try:
+                with self._db:
+                    # Rows waiting for a digest go out now, like the coalescer's flush on close
+                    self._db.execute("UPDATE outbox SET next_attempt = ? WHERE attempts = 0", (self._clock(),))
+            except sqlite3.Error as e:
+                logger.error(f"Outbox write failed: {e}")
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        self.notifier.close(timeout)
+
+        with self._cond:
+            try:
+                self._settle(self._clock())
+            except sqlite3.Error as e:
+                logger.error(f"Outbox write failed: {e}")
+            if self._rows:
+                logger.warning(f"Outbox closed with {self._rows} undelivered notifications, kept for the next start")
+            self._db.close()
+            self._db = None
+
+    def get_stats(self) -> dict:
+        """Counters, undelivered rows and the age of the oldest one"""
+        with self._cond:
+            stats = dict(self._stats, rows=self._rows, in_flight=len(self._inflight))
+            if self._db is not None:
+                oldest = self._db.execute("SELECT MIN(created) FROM outbox").fetchone()[0]
+                if oldest is not None:
+                    stats['oldest_age_s'] = round(self._clock() - oldest, 1)
+        return stats
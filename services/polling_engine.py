@@ -0,0 +1,263 @@
+"""
+Asyncio Polling Engine
+Runs fetching, strategy evaluation and notification as concurrent tasks
+joined by queues, so slow Telegram sends never delay the next price check
+"""
+import asyncio
+import html
+from typing import Callable, Optional
+from core.trigger_index import event_key
+from services.price_service import PriceBatch, StockAPIError, StockAPIUnavailableError, fetch_prices
+from utils.circuit_breaker import backoff_delay
+from utils.health_check import HealthCheckServer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Queue sentinel used to drain and stop downstream tasks
+_STOP = object()
+
+
+class AsyncPollingEngine:
+    """Fixed-cadence price poller with decoupled strategy and notify stages"""
+
+    def __init__(self, symbols: list[str], primary_symbol: str, accounts, notifier,
+                 interval_open: float, interval_closed: float,
+                 market_open: Callable[[], bool], poller=None,
+                 queue_size: int = 100, max_consecutive_errors: int = 5, alert_rules=None, indicators=None,
+                 until_open: Optional[Callable[[], float]] = None,
+                 broadcast_chats: Optional[Callable[[], list]] = None):
+        """
+        Initialize polling engine
+
+        Args:
+            symbols: Watchlist symbols fetched on every tick
+            primary_symbol: Symbol whose price drives health status and polling
+            accounts: AccountRegistry; every chat's strategy runs on each batch
+            notifier: Notifier or AlertCoalescer (blocking send is run in an executor)
+            interval_open: Tick interval in seconds while the market is open
+            interval_closed: Sleep interval in seconds while the market is closed
+            market_open: Callable returning True when the market is open
+            poller: Optional AdaptivePoller choosing the interval after each tick
+            queue_size: Bound for the price and message queues (default: 100)
+            max_consecutive_errors: API errors before the pause notification, and
+                unexpected errors before the engine stops (default: 5)
+            alert_rules: Optional AlertRuleBook; its symbols are fetched too
+            indicators: Optional IndicatorBook updated with every batch
+            until_open: Optional callable returning seconds until the next session;
+                when given, a closed market sleeps that long instead of interval_closed
+            broadcast_chats: Optional callable returning subscriber chats that also
+                get the notifier's default chat's alerts
+        """
+        self.symbols = symbols
+        self.primary_symbol = primary_symbol.upper()
+        self.accounts = accounts
+        self.notifier = notifier
+        self.interval_open = interval_open
+        self.interval_closed = interval_closed
+        self.market_open = market_open
+        self.poller = poller
+        self.queue_size = queue_size
+        self.max_consecutive_errors = max_consecutive_errors
+        self.alert_rules = alert_rules
+        self.indicators = indicators
+        self.until_open = until_open
+        self.broadcast_chats = broadcast_chats
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.dropped_batches = 0
+
+    def run(self):
+        """Run the engine until stop() is called (blocking)"""
+        asyncio.run(self._run())
+
+    def stop(self):
+        """Request shutdown; safe to call from signal handlers and other threads"""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        price_queue = asyncio.Queue(maxsize=self.queue_size)
+        message_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        logger.info(f"Async polling engine started ({len(self.symbols)} symbols)")
+        await asyncio.gather(
+            self._fetcher(price_queue),
+            self._evaluator(price_queue, message_queue),
+            self._sender(message_queue),
+        )
+        logger.info(
+            f"Async polling engine stopped (ticks: {self.ticks}, "
+            f"skipped: {self.skipped_ticks}, dropped: {self.dropped_batches})"
+        )
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep unless stopped; returns True if stop was requested"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=max(seconds, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _fetcher(self, price_queue: asyncio.Queue):
+        """Fetch prices on a fixed schedule, independent of downstream latency"""
+        consecutive_errors = 0
+        unexpected_errors = 0
+        next_tick = self._loop.time()
+
+        while not self._stop_event.is_set():
+            if not self.market_open():
+                delay = self.until_open() if self.until_open else self.interval_closed
+                logger.info(f"Market closed, sleeping {delay:.0f}s")
+                if await self._sleep(delay):
+                    break
+                next_tick = self._loop.time()
+                continue
+
+            try:
+                batch = await self._loop.run_in_executor(None, fetch_prices, self._polled_symbols())
+                # Symbols that did come back are evaluated even when the primary one failed
+                if batch.prices:
+                    self.ticks += 1
+                    self._publish(price_queue, batch)
+                if self.primary_symbol not in batch.prices:
+                    raise batch.errors.get(self.primary_symbol) or StockAPIError(
+                        f"No price returned for {self.primary_symbol}"
+                    )
+                consecutive_errors = 0
+                unexpected_errors = 0
+                interval = self._next_interval(batch)
+            except StockAPIError as e:
+                consecutive_errors += 1
+                logger.error(f"Stock API error ({consecutive_errors}/{self.max_consecutive_errors}): {e}")
+                HealthCheckServer.update_status('error', error=e)
+
+                if consecutive_errors == self.max_consecutive_errors:
+                    error_msg = f"⚠️ Bot paused after {consecutive_errors} consecutive API errors. Please check API status."
+                    logger.critical(error_msg)
+                    try:
+                        await self._loop.run_in_executor(None, self.notifier.send, error_msg)
+                    except Exception:
+                        logger.error("Failed to send pause notification")
+
+                # Open circuit: wait for its trial call; otherwise jittered exponential backoff
+                if isinstance(e, StockAPIUnavailableError):
+                    delay = max(e.retry_after, 1)
+                else:
+                    delay = backoff_delay(consecutive_errors, base=5, cap=self.interval_closed)
+                logger.info(f"Retrying price fetch in {delay:.0f}s")
+                if await self._sleep(delay):
+                    break
+                next_tick = self._loop.time()
+                continue
+            except Exception as e:
+                # Same handling as the sync loop: report, retry in a minute, stop after a streak
+                unexpected_errors += 1
+                logger.exception(f"Unexpected error ({unexpected_errors}/{self.max_consecutive_errors}): {e}")
+                HealthCheckServer.update_status('error', error=e)
+                try:
+                    await self._loop.run_in_executor(
+                        None, self.notifier.send, f"❌ Bot error: {html.escape(str(e)[:200], quote=False)}"
+                    )
+                except Exception:
+                    logger.error("Failed to send error notification")
+
+                if unexpected_errors >= self.max_consecutive_errors:
+                    logger.critical("Too many consecutive errors, stopping polling engine")
+                    break
+                if await self._sleep(60):
+                    break
+                next_tick = self._loop.time()
+                continue
+
+            # Schedule against absolute deadlines so cadence does not drift
+            next_tick += interval
+            now = self._loop.time()
+            if next_tick < now:
+                missed = int((now - next_tick) // interval) + 1
+                self.skipped_ticks += missed
+                next_tick += missed * interval
+                logger.warning(f"Fetch overran tick interval, skipped {missed} tick(s)")
+            if await self._sleep(next_tick - now):
+                break
+
+        await price_queue.put(_STOP)
+
+    def _polled_symbols(self) -> list[str]:
+        if not self.alert_rules:
+            return self.symbols
+        return self.symbols + [s for s in self.alert_rules.symbols() if s not in self.symbols]
+
+    def _next_interval(self, batch: PriceBatch) -> float:
+        if not self.poller:
+            return self.interval_open
+        price = batch.prices[self.primary_symbol].price
+        rule_levels = ()
+        if self.alert_rules:
+            rule_levels = self.alert_rules.trigger_levels({s: d.price for s, d in batch.prices.items()})
+        return self.poller.next_interval(price, self.accounts.trigger_levels(), rule_levels)
+
+    def _publish(self, price_queue: asyncio.Queue, batch: PriceBatch):
+        """Queue a batch, dropping the oldest one if the evaluator is behind"""
+        if price_queue.full():
+            price_queue.get_nowait()
+            self.dropped_batches += 1
+            logger.warning("Evaluator is behind, dropped oldest price batch")
+        price_queue.put_nowait(batch)
+
+    async def _evaluator(self, price_queue: asyncio.Queue, message_queue: asyncio.Queue):
+        """Run the strategy on each batch and queue resulting alerts"""
+        while True:
+            batch = await price_queue.get()
+            if batch is _STOP:
+                break
+
+            for symbol, error in batch.errors.items():
+                logger.warning(f"Failed to fetch {symbol}: {error}")
+
+            # The fetcher reports a missing primary symbol as an API error
+            if self.primary_symbol in batch.prices:
+                price = batch.prices[self.primary_symbol].price
+                logger.info(f"{self.primary_symbol} price: {price}")
+                HealthCheckServer.update_status('running', last_price=price)
+
+            try:
+                if self.indicators:
+                    for symbol, data in batch.prices.items():
+                        self.indicators.update(symbol, data.price, data.volume)
+                prices = {symbol: data.price for symbol, data in batch.prices.items()}
+                times = {symbol: data.timestamp for symbol, data in batch.prices.items()}
+                for chat_id, kind, msg, event in self.accounts.evaluate(prices, times):
+                    await message_queue.put((chat_id, kind, msg, event))
+                if self.alert_rules:
+                    for symbol, data in batch.prices.items():
+                        for rule, msg in self.alert_rules.evaluate(symbol, data.price):
+                            event = event_key('alert', rule.id, data.timestamp)
+                            await message_queue.put((rule.chat_id, 'alert', msg, event))
+            except Exception as e:
+                logger.exception(f"Strategy error: {e}")
+                HealthCheckServer.update_status('error', error=e)
+
+        await message_queue.put(_STOP)
+
+    async def _sender(self, message_queue: asyncio.Queue):
+        """Send queued (chat_id, kind, message, event key) items through the blocking notifier"""
+        while True:
+            item = await message_queue.get()
+            if item is _STOP:
+                break
+
+            chat_id, kind, msg, event = item
+            try:
+                await self._loop.run_in_executor(None, self.notifier.send, msg, chat_id, kind, event)
+                subscribers = self.broadcast_chats() if self.broadcast_chats else None
+                if subscribers and str(chat_id) == str(self.notifier.chat_id):
+                    await self._loop.run_in_executor(None, self.notifier.broadcast, msg, subscribers, kind, event)
+                HealthCheckServer.increment_alerts()
+            except Exception as e:
+                logger.error(f"Failed to send alert: {e}")
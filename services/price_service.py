@@ -2,10 +2,14 @@
 Stock Price Service - VNStock Implementation
 Fetches real-time stock prices using vnstock library with caching
 """
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Optional
-from vnstock import stock_historical_data
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+from core.config import Config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,6 +20,14 @@ class StockAPIError(Exception):
     pass
 
 
+class StockAPIUnavailableError(StockAPIError):
+    """Raised without calling upstream while the provider's circuit is open"""
+    
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 @dataclass
 class PriceData:
     """Price data with metadata"""
@@ -23,40 +35,107 @@ class PriceData:
     price: float
     timestamp: datetime
     source: str
+    volume: Optional[float] = None  # cumulative session volume, if the source reports it
+
+
+@dataclass
+class PriceBatch:
+    """Per-symbol results of a multi-symbol price request"""
+    prices: dict[str, PriceData] = field(default_factory=dict)
+    errors: dict[str, StockAPIError] = field(default_factory=dict)
+    
+    @property
+    def ok(self) -> bool:
+        return not self.errors
 
 
 class PriceCache:
-    """Simple in-memory cache with TTL"""
+    """
+    Thread-safe in-memory LRU cache with TTL and optional stale-while-revalidate
     
-    def __init__(self, ttl_seconds: int = 7):
-        self._cache: dict[str, PriceData] = {}
-        self._ttl = timedelta(seconds=ttl_seconds)
+    Entry ages are measured with a monotonic clock. Entries older than the TTL
+    are stale; when stale_ttl_seconds is set they are kept and can still be
+    served via lookup() until that hard ceiling, otherwise they are dropped.
+    """
+    
+    def __init__(self, ttl_seconds: int = 7, stale_ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize cache
+        
+        Args:
+            ttl_seconds: Age after which an entry is stale (default: 7)
+            stale_ttl_seconds: Hard ceiling for serving stale entries, None to disable SWR
+            max_entries: Max entries before evicting least recently used, None for unbounded
+            clock: Monotonic time source in seconds
+        """
+        self._cache: OrderedDict[str, tuple[PriceData, float]] = OrderedDict()
+        self._ttl = ttl_seconds
+        self._stale_ttl = stale_ttl_seconds
+        self._max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    @property
+    def serves_stale(self) -> bool:
+        return self._stale_ttl is not None
     
     def get(self, symbol: str) -> Optional[PriceData]:
         """Get cached price if not expired"""
-        if symbol not in self._cache:
-            return None
-        
-        cached_data = self._cache[symbol]
-        age = datetime.now() - cached_data.timestamp
+        data, stale = self.lookup(symbol)
+        return None if stale else data
+    
+    def lookup(self, symbol: str) -> tuple[Optional[PriceData], bool]:
+        """
+        Get cached price and whether it is stale
         
-        if age > self._ttl:
-            logger.debug(f"Cache expired for {symbol} (age: {age.total_seconds():.1f}s)")
-            del self._cache[symbol]
-            return None
+        Returns:
+            (PriceData, False) if fresh, (PriceData, True) if past the TTL but
+            within the stale ceiling, (None, False) if missing or expired
+        """
+        with self._lock:
+            entry = self._cache.get(symbol)
+            if entry is None:
+                return None, False
+            
+            cached_data, stored_at = entry
+            age = self._clock() - stored_at
+            
+            if age > self._ttl:
+                if self._stale_ttl is None or age > self._stale_ttl:
+                    logger.debug(f"Cache expired for {symbol} (age: {age:.1f}s)")
+                    del self._cache[symbol]
+                    return None, False
+                self._cache.move_to_end(symbol)
+                logger.debug(f"Cache stale for {symbol} (age: {age:.1f}s)")
+                return cached_data, True
+            
+            self._cache.move_to_end(symbol)
         
-        logger.debug(f"Cache hit for {symbol} (age: {age.total_seconds():.1f}s)")
-        return cached_data
+        logger.debug(f"Cache hit for {symbol} (age: {age:.1f}s)")
+        return cached_data, False
     
     def set(self, data: PriceData):
-        """Store price data in cache"""
-        self._cache[data.symbol] = data
+        """Store price data in cache, evicting the least recently used entries"""
+        with self._lock:
+            self._cache[data.symbol] = (data, self._clock())
+            self._cache.move_to_end(data.symbol)
+            if self._max_entries is not None:
+                while len(self._cache) > self._max_entries:
+                    evicted, _ = self._cache.popitem(last=False)
+                    self.evictions += 1
+                    logger.debug(f"Evicted {evicted} from cache")
         logger.debug(f"Cached {data.symbol} at {data.price:,.0f}")
     
     def clear(self):
         """Clear all cached data"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
         logger.debug("Cache cleared")
+    
+    def __len__(self):
+        return len(self._cache)
 
 
 class VNStockProvider:
@@ -79,6 +158,9 @@ class VNStockProvider:
             StockAPIError: If unable to fetch price
         """
         try:
+            # vnstock pulls in pandas; import on first fetch to keep startup fast
+            from vnstock import stock_historical_data
+            
             logger.debug(f"Fetching price for {symbol} using VNStock")
             
             # Get recent historical data
@@ -111,6 +193,66 @@ class VNStockProvider:
             logger.error(error_msg)
             raise StockAPIError(error_msg) from e
     
+    def fetch_prices(self, symbols: list[str]) -> dict[str, PriceData]:
+        """
+        Fetch current prices for many symbols in a single price board request
+        
+        Args:
+            symbols: Stock symbols (e.g., ['SHB', 'VNM'])
+            
+        Returns:
+            Dict of symbol -> PriceData. Symbols missing from the board
+            (unknown ticker, no match yet) are simply left out.
+            
+        Raises:
+            StockAPIError: If the board request itself fails
+        """
+        if not symbols:
+            return {}
+        
+        try:
+            from vnstock import price_depth
+            
+            logger.debug(f"Fetching price board for {len(symbols)} symbols using VNStock")
+            
+            df = price_depth(stock_list=",".join(s.upper() for s in symbols))
+            
+            if df is None or df.empty:
+                raise StockAPIError(f"No board data returned for {','.join(symbols)}")
+            
+            now = datetime.now()
+            volumes = df['Tổng Khối Lượng'] if 'Tổng Khối Lượng' in df.columns else [None] * len(df)
+            results = {}
+            for symbol, price, volume in zip(df['Mã CP'], df['Giá khớp lệnh'], volumes):
+                try:
+                    price = float(price)
+                except (TypeError, ValueError):
+                    continue
+                if price <= 0:
+                    continue
+                try:
+                    volume = float(volume) if volume is not None else None
+                except (TypeError, ValueError):
+                    volume = None
+                symbol = str(symbol).upper()
+                results[symbol] = PriceData(
+                    symbol=symbol,
+                    price=price,
+                    timestamp=now,
+                    source="vnstock",
+                    volume=volume
+                )
+            
+            logger.info(f"✅ Price board: {len(results)}/{len(symbols)} symbols (vnstock)")
+            return results
+            
+        except StockAPIError:
+            raise
+        except Exception as e:
+            error_msg = f"VNStock board error for {','.join(symbols)}: {str(e)}"
+            logger.error(error_msg)
+            raise StockAPIError(error_msg) from e
+    
     @property
     def name(self) -> str:
         return "vnstock"
@@ -119,21 +261,54 @@ class VNStockProvider:
 class PriceService:
     """Main service for stock price operations with caching"""
     
-    def __init__(self, cache_ttl: int = 7):
+    def __init__(self, cache_ttl: int = 7, batch_size: int = 50,
+                 max_workers: int = 8, fetch_timeout: float = 10,
+                 stale_ttl: Optional[float] = None, cache_max_entries: Optional[int] = None,
+                 provider=None, history=None):
         """
         Initialize price service
         
         Args:
+            provider: Price provider (default: VNStockProvider)
             cache_ttl: Cache time-to-live in seconds (default: 7)
+            batch_size: Max symbols per price board request (default: 50)
+            max_workers: Threads for per-symbol fallback fetches (default: 8)
+            fetch_timeout: Deadline in seconds for the fallback and in-flight
+                fetches of one get_prices call (default: 10)
+            stale_ttl: Serve entries up to this age while refreshing them in the
+                background (stale-while-revalidate), None to disable
+            cache_max_entries: LRU bound on cached symbols, None for unbounded
+            history: Optional PriceHistory receiving every upstream price
         """
-        self.provider = VNStockProvider()
-        self.cache = PriceCache(ttl_seconds=cache_ttl)
-        logger.info(f"PriceService initialized with {self.provider.name} (cache TTL: {cache_ttl}s)")
+        self.provider = provider or VNStockProvider()
+        self.cache = PriceCache(
+            ttl_seconds=cache_ttl,
+            stale_ttl_seconds=stale_ttl,
+            max_entries=cache_max_entries
+        )
+        self.history = history
+        self.batch_size = batch_size
+        self.fetch_timeout = fetch_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price")
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-refresh")
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._stats = {
+            'cache_hits': 0, 'stale_hits': 0, 'revalidations': 0,
+            'upstream_calls': 0, 'coalesced': 0,
+        }
+        swr = f", stale ceiling: {stale_ttl}s" if stale_ttl is not None else ""
+        logger.info(f"PriceService initialized with {self.provider.name} (cache TTL: {cache_ttl}s{swr})")
     
     def get_price(self, symbol: str) -> PriceData:
         """
         Get stock price with caching
         
+        Concurrent callers that miss the cache for the same symbol share a
+        single upstream fetch (single-flight) instead of each calling vnstock.
+        In stale-while-revalidate mode a stale entry is returned immediately
+        and refreshed in the background.
+        
         Args:
             symbol: Stock symbol
             
@@ -143,20 +318,224 @@ class PriceService:
         Raises:
             StockAPIError: If unable to fetch price
         """
+        symbol = symbol.upper()
+        
         # Check cache first
-        cached = self.cache.get(symbol)
+        cached, stale = self.cache.lookup(symbol)
         if cached:
-            logger.debug(f"Returning cached price for {symbol}")
+            logger.debug(f"Returning {'stale' if stale else 'cached'} price for {symbol}")
+            if stale:
+                self._count('stale_hits')
+                self._revalidate([symbol])
+            else:
+                self._count('cache_hits')
             return cached
         
+        future, leader = self._join_flight(symbol)
+        if not leader:
+            logger.debug(f"Waiting on in-flight fetch for {symbol}")
+            self._count('coalesced')
+            return future.result()
+        
         # Fetch fresh data
         logger.debug(f"Cache miss - fetching fresh price for {symbol}")
-        price_data = self.provider.fetch_price(symbol)
+        try:
+            self._count('upstream_calls')
+            price_data = self.provider.fetch_price(symbol)
+            
+            # Cache the result
+            self._store(price_data)
+            future.set_result(price_data)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._land_flight(symbol)
+        
+        return price_data
+    
+    def get_prices(self, symbols: Iterable[str]) -> PriceBatch:
+        """
+        Get prices for many symbols with caching and batched fetching
         
-        # Cache the result
+        Cache misses are fetched with as few price board requests as possible.
+        Symbols the board did not return (or all of them, if the board request
+        fails) fall back to concurrent single-symbol fetches. Symbols that
+        another caller is already fetching are awaited rather than refetched,
+        and stale entries are served while being refreshed in the background.
+        The fallback fetches and the awaited flights share one deadline,
+        fetch_timeout seconds from the start of the call, so one slow ticker
+        cannot stall the rest and the waits do not add up.
+        
+        Args:
+            symbols: Stock symbols
+            
+        Returns:
+            PriceBatch with a PriceData or a StockAPIError for every symbol
+        """
+        deadline = time.monotonic() + self.fetch_timeout
+        batch = PriceBatch()
+        flights: dict[str, Future] = {}
+        waiting: dict[str, Future] = {}
+        stale_symbols = []
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            cached, stale = self.cache.lookup(symbol)
+            if cached:
+                if stale:
+                    self._count('stale_hits')
+                    stale_symbols.append(symbol)
+                else:
+                    self._count('cache_hits')
+                batch.prices[symbol] = cached
+                continue
+            future, leader = self._join_flight(symbol)
+            if leader:
+                flights[symbol] = future
+            else:
+                self._count('coalesced')
+                waiting[symbol] = future
+        
+        if stale_symbols:
+            self._revalidate(stale_symbols)
+        
+        if flights:
+            self._resolve_flights(flights, batch, deadline)
+        
+        for symbol, future in waiting.items():
+            try:
+                batch.prices[symbol] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                batch.errors[symbol] = StockAPIError(
+                    f"Timed out after {self.fetch_timeout}s waiting for the in-flight fetch of {symbol}"
+                )
+            except StockAPIError as e:
+                batch.errors[symbol] = e
+            except Exception as e:
+                batch.errors[symbol] = StockAPIError(f"In-flight fetch for {symbol} failed: {e}")
+        
+        logger.debug(f"get_prices: {len(batch.prices)} ok, {len(batch.errors)} errors")
+        return batch
+    
+    def _resolve_flights(self, flights: dict[str, Future], batch: PriceBatch,
+                         deadline: Optional[float] = None):
+        """Fetch the symbols this caller leads and settle their futures"""
+        try:
+            self._fetch_misses(list(flights), batch, deadline)
+        finally:
+            for symbol, future in flights.items():
+                if symbol in batch.prices:
+                    future.set_result(batch.prices[symbol])
+                else:
+                    future.set_exception(batch.errors.setdefault(
+                        symbol, StockAPIError(f"No price returned for {symbol}")
+                    ))
+                self._land_flight(symbol)
+    
+    def _revalidate(self, symbols: list[str]):
+        """Refresh stale symbols in the background unless already in flight"""
+        flights = {}
+        for symbol in symbols:
+            future, leader = self._join_flight(symbol)
+            if leader:
+                flights[symbol] = future
+        
+        if flights:
+            self._count('revalidations', len(flights))
+            logger.debug(f"Revalidating {len(flights)} stale symbols in background")
+            self._refresher.submit(self._resolve_flights, flights, PriceBatch())
+    
+    def _fetch_misses(self, misses: list[str], batch: PriceBatch, deadline: Optional[float] = None):
+        """Fetch cache misses via the price board, then one by one for leftovers"""
+        logger.debug(f"Cache miss for {len(misses)} symbols - fetching price board")
+        for i in range(0, len(misses), self.batch_size):
+            chunk = misses[i:i + self.batch_size]
+            try:
+                self._count('upstream_calls')
+                fetched = self.provider.fetch_prices(chunk)
+            except StockAPIError as e:
+                logger.warning(f"Price board failed, falling back to single fetches: {e}")
+                continue
+            for symbol, price_data in fetched.items():
+                if symbol in batch.prices:
+                    continue
+                self._store(price_data)
+                batch.prices[symbol] = price_data
+        
+        remaining = [s for s in misses if s not in batch.prices]
+        if remaining:
+            self._fetch_individually(remaining, batch, deadline)
+    
+    def _store(self, price_data: PriceData):
+        """Cache a fresh upstream price and append it to the history"""
         self.cache.set(price_data)
+        if self.history is not None:
+            self.history.record(price_data)
+    
+    def _join_flight(self, symbol: str) -> tuple[Future, bool]:
+        """Return the in-flight future for symbol and whether the caller leads it"""
+        with self._lock:
+            future = self._inflight.get(symbol)
+            if future is not None:
+                return future, False
+            # A flight may have landed between the caller's cache miss and now
+            cached = self.cache.get(symbol)
+            if cached:
+                future = Future()
+                future.set_result(cached)
+                return future, False
+            future = Future()
+            self._inflight[symbol] = future
+            return future, True
+    
+    def _land_flight(self, symbol: str):
+        with self._lock:
+            self._inflight.pop(symbol, None)
+    
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+    
+    def get_stats(self) -> dict:
+        """Cache and upstream call counters; 'coalesced' is upstream calls saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._inflight)
+        stats['cache_size'] = len(self.cache)
+        stats['cache_evictions'] = self.cache.evictions
+        if self.history is not None:
+            stats['history_symbols'] = len(self.history.symbols())
+            stats['history_bytes'] = self.history.memory_bytes()
+        if hasattr(self.provider, 'get_stats'):
+            stats['provider'] = self.provider.get_stats()
+        return stats
+    
+    def _fetch_individually(self, symbols: list[str], batch: PriceBatch, deadline: Optional[float] = None):
+        """Fetch symbols one by one in parallel until deadline (monotonic), recording timeouts as errors"""
+        if deadline is None:
+            deadline = time.monotonic() + self.fetch_timeout
+        self._count('upstream_calls', len(symbols))
+        futures = {self._executor.submit(self.provider.fetch_price, s): s for s in symbols}
+        done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
         
-        return price_data
+        for future in done:
+            symbol = futures[future]
+            try:
+                price_data = future.result()
+            except StockAPIError as e:
+                batch.errors[symbol] = e
+                continue
+            except Exception as e:
+                batch.errors[symbol] = StockAPIError(f"Unexpected error for {symbol}: {e}")
+                continue
+            self._store(price_data)
+            batch.prices[symbol] = price_data
+        
+        for future in not_done:
+            symbol = futures[future]
+            future.cancel()
+            batch.errors[symbol] = StockAPIError(
+                f"Timed out after {self.fetch_timeout}s fetching {symbol}"
+            )
     
     def is_healthy(self) -> bool:
         """Check if service is operational (no actual API call)"""
@@ -171,7 +550,17 @@ def get_service() -> PriceService:
     """Get or create the global PriceService instance (singleton)"""
     global _service_instance
     if _service_instance is None:
-        _service_instance = PriceService()
+        from services.providers import create_provider  # providers imports this module
+        from core.price_history import PriceHistory
+        provider = create_provider()
+        _service_instance = PriceService(
+            provider=provider,
+            fetch_timeout=Config.STOCK_API_TIMEOUT,
+            cache_ttl=Config.PRICE_CACHE_TTL,
+            stale_ttl=Config.PRICE_CACHE_STALE_TTL or None,
+            cache_max_entries=Config.PRICE_CACHE_MAX_ENTRIES or None,
+            history=PriceHistory(Config.PRICE_HISTORY_CAPACITY) if Config.PRICE_HISTORY_CAPACITY else None
+        )
     return _service_instance
 
 
@@ -193,6 +582,20 @@ def fetch_price(symbol: str) -> float:
     return price_data.price
 
 
+def fetch_prices(symbols: Iterable[str]) -> PriceBatch:
+    """
+    Fetch prices for a watchlist
+    
+    Args:
+        symbols: Stock symbols
+        
+    Returns:
+        PriceBatch with per-symbol prices and errors
+    """
+    service = get_service()
+    return service.get_prices(symbols)
+
+
 def is_healthy() -> bool:
     """Legacy compatibility function - check service health"""
     service = get_service()
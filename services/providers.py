@@ -0,0 +1,501 @@
+"""
+Stock Price Providers - registry, offline stubs and hedged failover pool
+Builds the provider used by PriceService from STOCK_API_PROVIDER
+"""
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+from retrying import Retrying
+from core.config import Config
+from services.price_service import PriceData, StockAPIError, StockAPIUnavailableError, VNStockProvider
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, backoff_delay
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FileProvider:
+    """Offline provider reading a JSON file of {"SYMBOL": price}"""
+
+    def __init__(self, path: str, latency: float = 0):
+        """
+        Initialize file provider
+
+        Args:
+            path: JSON file mapping symbols to prices, re-read when modified
+            latency: Artificial delay per call in seconds, for hedging tests
+        """
+        self.path = Path(path)
+        self.latency = latency
+        self._prices: dict[str, float] = {}
+        self._mtime = None
+        logger.info(f"FileProvider initialized ({self.path})")
+
+    def _load(self) -> dict[str, float]:
+        try:
+            mtime = self.path.stat().st_mtime
+            if mtime != self._mtime:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._prices = {k.upper(): float(v) for k, v in json.load(f).items()}
+                self._mtime = mtime
+        except Exception as e:
+            raise StockAPIError(f"File provider error ({self.path}): {e}") from e
+        return self._prices
+
+    def fetch_price(self, symbol: str) -> PriceData:
+        prices = self.fetch_prices([symbol])
+        if symbol.upper() not in prices:
+            raise StockAPIError(f"No price for {symbol} in {self.path}")
+        return prices[symbol.upper()]
+
+    def fetch_prices(self, symbols: list[str]) -> dict[str, PriceData]:
+        if self.latency:
+            time.sleep(self.latency)
+        prices = self._load()
+        now = datetime.now()
+        return {
+            s.upper(): PriceData(symbol=s.upper(), price=prices[s.upper()], timestamp=now, source=self.name)
+            for s in symbols if s.upper() in prices
+        }
+
+    @property
+    def name(self) -> str:
+        return "file"
+
+
+class HTTPProvider:
+    """Provider for any HTTP endpoint returning JSON {"SYMBOL": price}"""
+
+    def __init__(self, url: str, timeout: float = 10):
+        """
+        Initialize HTTP provider
+
+        Args:
+            url: Endpoint URL, queried with ?symbols=SHB,VNM (a static JSON
+                file served by `python -m http.server` works as a stub)
+            timeout: Request timeout in seconds
+        """
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        logger.info(f"HTTPProvider initialized ({url})")
+
+    def fetch_price(self, symbol: str) -> PriceData:
+        prices = self.fetch_prices([symbol])
+        if symbol.upper() not in prices:
+            raise StockAPIError(f"No price for {symbol} from {self.url}")
+        return prices[symbol.upper()]
+
+    def fetch_prices(self, symbols: list[str]) -> dict[str, PriceData]:
+        try:
+            response = self._session.get(
+                self.url,
+                params={'symbols': ",".join(s.upper() for s in symbols)},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            prices = {k.upper(): float(v) for k, v in response.json().items()}
+        except Exception as e:
+            raise StockAPIError(f"HTTP provider error ({self.url}): {e}") from e
+
+        now = datetime.now()
+        return {
+            s.upper(): PriceData(symbol=s.upper(), price=prices[s.upper()], timestamp=now, source=self.name)
+            for s in symbols if s.upper() in prices
+        }
+
+    @property
+    def name(self) -> str:
+        return "http"
+
+
+class GuardedProvider:
+    """
+    Provider wrapper adding a circuit breaker, timeouts and jittered retries
+    
+    Each attempt gets timeout seconds and a call makes up to max_retries
+    attempts with full-jitter exponential backoff in between, so a call
+    takes at most `budget` seconds. A call that still fails counts as one
+    breaker failure; while the breaker is open calls fail immediately with
+    StockAPIUnavailableError instead of reaching upstream.
+
+    Python cannot stop a hung upstream call, so a timed-out attempt keeps its
+    worker thread. Once every worker is hung the executor is replaced, and
+    with max_hung threads still hung no new attempt is started.
+    """
+
+    def __init__(self, provider, breaker: CircuitBreaker, timeout: float = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 4,
+                 workers: int = 4, max_hung: int = 16):
+        """
+        Initialize guarded provider
+
+        Args:
+            provider: Provider to wrap
+            breaker: Circuit breaker for this provider
+            timeout: Seconds allowed per attempt
+            max_retries: Max attempts per call
+            backoff_base: First retry delay scale in seconds
+            backoff_max: Max delay between retries in seconds
+            workers: Threads per executor
+            max_hung: Timed-out attempts still running before attempts fail fast
+        """
+        self.provider = provider
+        self.breaker = breaker
+        self.timeout = timeout
+        self.max_retries = max(max_retries, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.workers = workers
+        self.max_hung = max_hung
+        self._lock = threading.Lock()
+        self._hung = 0  # timed-out attempts still running, all executors
+        self._hung_current = 0  # of those, on the current executor
+        self._executor = self._new_executor()
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    @property
+    def budget(self) -> float:
+        """Longest a call can take: every attempt timing out plus the longest backoffs"""
+        return self.timeout * self.max_retries + self.backoff_max * (self.max_retries - 1)
+
+    def _new_executor(self):
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.provider.name}-call")
+
+    def fetch_price(self, symbol: str) -> PriceData:
+        return self._call('fetch_price', symbol)
+
+    def fetch_prices(self, symbols: list[str]) -> dict[str, PriceData]:
+        return self._call('fetch_prices', symbols)
+
+    def _call(self, method: str, arg):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise StockAPIUnavailableError(str(e), retry_after=e.retry_after) from e
+
+        deadline = time.monotonic() + self.budget
+        retrying = Retrying(
+            stop_max_attempt_number=self.max_retries,
+            stop_max_delay=self.budget * 1000,
+            wait_func=lambda attempt, _: backoff_delay(attempt, self.backoff_base, self.backoff_max) * 1000,
+            retry_on_exception=lambda e: isinstance(e, StockAPIError) and time.monotonic() < deadline
+        )
+        try:
+            result = retrying.call(self._attempt, method, arg, deadline)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _attempt(self, method: str, arg, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise StockAPIError(f"{self.name} call timed out after {self.budget:.0f}s")
+        with self._lock:
+            if self._hung >= self.max_hung:
+                raise StockAPIError(f"{self.name} has {self._hung} hung calls, not starting another")
+            executor = self._executor
+        future = executor.submit(getattr(self.provider, method), arg)
+        try:
+            return future.result(timeout=min(self.timeout, remaining))
+        except FutureTimeoutError:
+            if not future.cancel():  # still queued: dropped; running: keeps its thread
+                self._abandon(future, executor)
+            raise StockAPIError(f"{self.name} call timed out after {self.timeout}s")
+        except StockAPIError:
+            raise
+        except Exception as e:
+            raise StockAPIError(f"{self.name} error: {e}") from e
+
+    def _abandon(self, future, executor):
+        """Count a hung attempt until it returns; replace the executor once all its workers hang"""
+        with self._lock:
+            self._hung += 1
+            if executor is self._executor:
+                self._hung_current += 1
+                if self._hung_current >= self.workers:
+                    logger.warning(f"All {self.workers} {self.name} workers hung, starting a new executor")
+                    self._executor = self._new_executor()
+                    self._hung_current = 0
+                    executor.shutdown(wait=False)
+
+        def release(_):
+            with self._lock:
+                self._hung -= 1
+                if executor is self._executor:
+                    self._hung_current -= 1
+        future.add_done_callback(release)
+
+    def hung_calls(self) -> int:
+        with self._lock:
+            return self._hung
+
+
+# Provider name -> factory. 'vnd' and 'ssi' are legacy names, both served by vnstock.
+PROVIDERS: dict[str, Callable[[], object]] = {
+    'vnstock': VNStockProvider,
+    'vnd': VNStockProvider,
+    'ssi': VNStockProvider,
+    'file': lambda: FileProvider(Config.STOCK_STUB_FILE),
+    'http': lambda: HTTPProvider(Config.STOCK_STUB_URL, timeout=Config.STOCK_API_TIMEOUT),
+}
+
+
+def register_provider(name: str, factory: Callable[[], object]):
+    """Register a provider factory under a STOCK_API_PROVIDER name"""
+    PROVIDERS[name.lower()] = factory
+
+
+class _ProviderState:
+    """Latency samples and error streak for one provider in a pool"""
+
+    def __init__(self, provider, window: int):
+        self.provider = provider
+        self.latencies = deque(maxlen=window)
+        self.consecutive_errors = 0
+        self.disabled_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ProviderPool:
+    """
+    Ordered set of providers with hedged requests and automatic failover
+
+    Each call goes to the first healthy provider. If it has not answered once
+    its latency reaches the configured percentile of recent calls, the same
+    request is also sent to the next provider and the first success wins.
+    A provider that errors failover_errors times in a row is skipped for
+    failover_cooldown seconds.
+    """
+
+    def __init__(self, providers: list, timeout: float = 10, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20, failover_errors: int = 3,
+                 failover_cooldown: float = 60, window: int = 100):
+        """
+        Initialize provider pool
+
+        Args:
+            providers: Providers in priority order
+            timeout: Max seconds to wait for any answer
+            hedge_percentile: Latency percentile of the primary after which to hedge
+            hedge_min_samples: Latency samples needed before hedging kicks in
+            failover_errors: Consecutive errors before a provider is skipped
+            failover_cooldown: Seconds a failed-over provider stays skipped
+            window: Latency samples kept per provider
+        """
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self._states = [_ProviderState(p, window) for p in providers]
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failover_errors = failover_errors
+        self.failover_cooldown = failover_cooldown
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(providers), thread_name_prefix="provider")
+        logger.info(f"ProviderPool initialized with {self.name}")
+
+    @property
+    def name(self) -> str:
+        return "+".join(s.provider.name for s in self._states)
+
+    def fetch_price(self, symbol: str) -> PriceData:
+        return self._call('fetch_price', symbol)
+
+    def fetch_prices(self, symbols: list[str]) -> dict[str, PriceData]:
+        return self._call('fetch_prices', symbols)
+
+    def _candidates(self) -> list[_ProviderState]:
+        """Healthy providers in priority order, or all of them if none is healthy"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [s for s in self._states if s.disabled_until <= now]
+        return healthy or list(self._states)
+
+    def _hedge_delay(self, state: _ProviderState) -> Optional[float]:
+        with self._lock:
+            if len(state.latencies) < self.hedge_min_samples:
+                return None
+            return state.percentile(self.hedge_percentile)
+
+    def _run(self, state: _ProviderState, method: str, arg, deadline: float):
+        started = time.monotonic()
+        try:
+            result = getattr(state.provider, method)(arg)
+        except Exception:
+            if time.monotonic() <= deadline:
+                self._record(state, None)
+            raise
+        # Calls that outlive the deadline were already recorded as timeouts
+        if time.monotonic() <= deadline:
+            self._record(state, time.monotonic() - started)
+        return result
+
+    def _record(self, state: _ProviderState, latency: Optional[float]):
+        with self._lock:
+            state.calls += 1
+            if latency is not None:
+                state.latencies.append(latency)
+                state.consecutive_errors = 0
+                return
+            state.errors += 1
+            state.consecutive_errors += 1
+            if state.consecutive_errors >= self.failover_errors and state.disabled_until <= time.monotonic():
+                state.disabled_until = time.monotonic() + self.failover_cooldown
+                logger.warning(
+                    f"Provider {state.provider.name} failed {state.consecutive_errors} times in a row, "
+                    f"failing over for {self.failover_cooldown}s"
+                )
+
+    def _call(self, method: str, arg):
+        """Run method on the best provider, hedging and failing over as needed"""
+        candidates = self._candidates()
+        deadline = time.monotonic() + self.timeout
+        pending = {}
+        try:
+            return self._race(method, arg, candidates, deadline, pending)
+        finally:
+            # Hedges that never started are dropped rather than left queued
+            for future in pending:
+                future.cancel()
+
+    def _race(self, method: str, arg, candidates, deadline: float, pending: dict):
+        last_error = None
+        while candidates or pending:
+            if candidates and len(pending) < 2:
+                state = candidates.pop(0)
+                pending[self._executor.submit(self._run, state, method, arg, deadline)] = state
+
+            # Wait for the primary up to its latency percentile before hedging
+            wait_for = deadline - time.monotonic()
+            if candidates and len(pending) == 1:
+                hedge_delay = self._hedge_delay(next(iter(pending.values())))
+                if hedge_delay is not None:
+                    wait_for = min(wait_for, hedge_delay)
+
+            done, _ = wait(pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+
+            if not done:
+                if time.monotonic() >= deadline:
+                    for state in pending.values():
+                        self._record(state, None)
+                    break
+                if candidates:
+                    with self._lock:
+                        self.hedges += 1
+                    logger.debug(f"Hedging {method} to {candidates[0].provider.name}")
+                continue
+
+            for future in done:
+                state = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.debug(f"Provider {state.provider.name} failed: {e}")
+                    continue
+                with self._lock:
+                    state.wins += 1
+                return result
+
+        if last_error is None:
+            raise StockAPIError(f"All providers timed out after {self.timeout}s ({method})")
+        if isinstance(last_error, StockAPIError):
+            raise last_error
+        raise StockAPIError(f"All providers failed ({method}): {last_error}") from last_error
+
+    def get_stats(self) -> dict:
+        """Per-provider calls, errors, wins, latency percentiles and failover state"""
+        now = time.monotonic()
+        providers = {}
+        with self._lock:
+            for i, s in enumerate(self._states):
+                key = s.provider.name if s.provider.name not in providers else f"{s.provider.name}#{i}"
+                providers[key] = {
+                    'calls': s.calls,
+                    'errors': s.errors,
+                    'wins': s.wins,
+                    'p50_ms': round(s.percentile(50) * 1000, 1) if s.latencies else None,
+                    'p95_ms': round(s.percentile(95) * 1000, 1) if s.latencies else None,
+                    'failed_over': s.disabled_until > now,
+                }
+                if hasattr(s.provider, 'breaker'):
+                    providers[key]['breaker'] = s.provider.breaker.snapshot()
+                    providers[key]['hung_calls'] = s.provider.hung_calls()
+            return {'hedges': self.hedges, 'providers': providers}
+
+
+def create_provider(names: Optional[list[str]] = None) -> ProviderPool:
+    """
+    Build the provider pool from STOCK_API_PROVIDER
+
+    Args:
+        names: Provider names in priority order (default: Config.STOCK_API_PROVIDER)
+
+    Returns:
+        ProviderPool over the named providers, each guarded by its own
+        circuit breaker and retry policy
+
+    Names that are aliases of an earlier one (vnd, ssi and vnstock are all
+    vnstock) are skipped: hedging to them would query the same backend twice.
+
+    Raises:
+        ValueError: If a provider name is not registered
+    """
+    names = names or Config.STOCK_API_PROVIDER
+    providers = []
+    seen = {}  # factory -> first name using it
+    for name in names:
+        factory = PROVIDERS.get(name.lower())
+        if factory is None:
+            raise ValueError(f"Unknown stock API provider: {name} (available: {', '.join(PROVIDERS)})")
+        if factory in seen:
+            logger.warning(f"Provider '{name}' is the same backend as '{seen[factory]}', skipped")
+            continue
+        seen[factory] = name
+        provider = factory()
+        breaker = CircuitBreaker(
+            provider.name,
+            failure_threshold=Config.STOCK_API_BREAKER_THRESHOLD,
+            recovery_timeout=Config.STOCK_API_BREAKER_RECOVERY
+        )
+        providers.append(GuardedProvider(
+            provider,
+            breaker,
+            timeout=Config.STOCK_API_TIMEOUT,
+            max_retries=Config.STOCK_API_MAX_RETRIES
+        ))
+
+    if len(providers) == 1:
+        logger.info("Single stock API provider: no hedging or failover (list more in STOCK_API_PROVIDER)")
+
+    # The pool waits out the slowest provider's retries plus one attempt on a hedge/failover
+    return ProviderPool(
+        providers,
+        timeout=max(p.budget for p in providers) + Config.STOCK_API_TIMEOUT,
+        hedge_percentile=Config.STOCK_API_HEDGE_PERCENTILE,
+        failover_errors=Config.STOCK_API_FAILOVER_ERRORS,
+        failover_cooldown=Config.STOCK_API_FAILOVER_COOLDOWN
+    )
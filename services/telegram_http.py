@@ -0,0 +1,200 @@
+"""
+Telegram HTTP Pool
+One keep-alive connection pool shared by Telegram calls (command replies,
+pushed alerts), with configurable size and timeouts and counters for
+connection reuse and pool waits. Long polling (getUpdates) gets its own
+connection so it never holds a pooled one for the whole poll timeout.
+
+Imports python-telegram-bot at module level, so import it lazily like the
+rest of the Telegram stack.
+"""
+import threading
+import time
+from collections import deque
+from typing import Optional
+from telegram.utils.request import Request
+from telegram.vendor.ptb_urllib3 import urllib3
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _PoolStats:
+    """Request latency and time spent waiting for a free pooled connection"""
+
+    def __init__(self, window: int = 1000):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.pool_waits = 0  # checkouts that found no idle connection
+        self.latencies = deque(maxlen=window)
+        self.waits = deque(maxlen=window)
+
+    def record_wait(self, seconds: float):
+        with self.lock:
+            self.waits.append(seconds)
+            if seconds > 0.001:
+                self.pool_waits += 1
+
+
+def _timed_pool_class(base, stats: _PoolStats):
+    """Subclass of a urllib3 pool class that times connection checkout"""
+
+    class TimedPool(base):
+        def _get_conn(self, timeout=None):
+            started = time.monotonic()
+            try:
+                return super()._get_conn(timeout)
+            finally:
+                stats.record_wait(time.monotonic() - started)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+class PooledRequest(Request):
+    """
+    python-telegram-bot Request with a blocking keep-alive pool
+
+    PTB's default pool is non-blocking: once every connection is busy it
+    opens an extra one and throws it away afterwards, paying a new TCP/TLS
+    handshake each time. Here callers wait up to pool_timeout for a pooled
+    connection instead, so the pool size caps open connections.
+    """
+
+    __slots__ = ('pool_timeout', '_stats', '_long_poll')
+
+    def __init__(self, pool_size: int = 8, connect_timeout: float = 5.0, read_timeout: float = 5.0,
+                 pool_timeout: Optional[float] = 10.0, ca_certs: Optional[str] = None, proxy_url: str = None,
+                 long_poll_pool: bool = True):
+        """
+        Initialize request pool
+
+        Args:
+            pool_size: Connections kept per host
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Default seconds between reads (long polling sets its own)
+            pool_timeout: Seconds to wait for a free connection, None to wait forever
+            ca_certs: CA bundle overriding certifi (e.g. a stub server's self-signed cert)
+            proxy_url: Optional HTTPS/SOCKS proxy
+            long_poll_pool: Send getUpdates over a separate one-connection pool
+        """
+        super().__init__(con_pool_size=pool_size, connect_timeout=connect_timeout,
+                         read_timeout=read_timeout, proxy_url=proxy_url)
+        self.pool_timeout = pool_timeout
+        self._stats = _PoolStats()
+
+        manager = self._con_pool
+        if isinstance(manager, urllib3.PoolManager):
+            manager.connection_pool_kw['block'] = True
+            if ca_certs:
+                manager.connection_pool_kw['ca_certs'] = ca_certs
+            manager.pool_classes_by_scheme = {
+                scheme: _timed_pool_class(cls, self._stats)
+                for scheme, cls in manager.pool_classes_by_scheme.items()
+            }
+
+        # getUpdates holds its connection for the whole long-poll timeout; on its own
+        # pool it neither waits behind sends nor skews their latency percentiles
+        self._long_poll = None
+        if long_poll_pool:
+            self._long_poll = PooledRequest(pool_size=1, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                            pool_timeout=pool_timeout, ca_certs=ca_certs, proxy_url=proxy_url,
+                                            long_poll_pool=False)
+            logger.info(f"Telegram HTTP pool: {pool_size} connections (+1 for long polling), timeouts "
+                        f"connect {connect_timeout}s, read {read_timeout}s, pool {pool_timeout}s")
+
+    def post(self, url: str, data=None, timeout: float = None):
+        if self._long_poll is not None and url.endswith('/getUpdates'):
+            return self._long_poll.post(url, data, timeout)
+        return super().post(url, data, timeout)
+
+    def stop(self):
+        super().stop()
+        if self._long_poll is not None:
+            self._long_poll.stop()
+
+    def _request_wrapper(self, *args, **kwargs) -> bytes:
+        kwargs.setdefault('pool_timeout', self.pool_timeout)
+        started = time.monotonic()
+        try:
+            return super()._request_wrapper(*args, **kwargs)
+        except Exception:
+            with self._stats.lock:
+                self._stats.errors += 1
+            raise
+        finally:
+            with self._stats.lock:
+                self._stats.requests += 1
+                self._stats.latencies.append(time.monotonic() - started)
+
+    def get_stats(self) -> dict:
+        """
+        Connection reuse and latency counters
+
+        Returns:
+            dict: requests, errors, connections opened (each one a TCP/TLS
+            handshake), reuse ratio, idle connections, pool waits and latencies;
+            getUpdates calls are counted under long_polls, not in the latencies
+        """
+        opened = pooled_requests = idle = 0
+        pools = getattr(self._con_pool, 'pools', None)
+        if pools is not None:
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                pooled_requests += pool.num_requests
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        stats = self._stats
+        with stats.lock:
+            latencies, waits = list(stats.latencies), list(stats.waits)
+            result = {
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'pool_waits': stats.pool_waits,
+            }
+        result.update({
+            'pool_size': self.con_pool_size,
+            'connections_opened': opened,
+            'idle_connections': idle,
+            'reuse_ratio': round(1 - opened / pooled_requests, 3) if pooled_requests else None,
+            'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            'pool_wait_p95_ms': round(_percentile(waits, 95) * 1000, 1),
+            'pool_wait_max_ms': round(max(waits, default=0.0) * 1000, 1),
+        })
+        if self._long_poll is not None:
+            long_poll = self._long_poll._stats
+            with long_poll.lock:
+                result['long_polls'] = {'requests': long_poll.requests, 'errors': long_poll.errors}
+        return result
+
+
+def create_bot(token: str, pool_size: int = 8, connect_timeout: float = 5.0, read_timeout: float = 5.0,
+               pool_timeout: Optional[float] = 10.0, base_url: Optional[str] = None, ca_certs: Optional[str] = None):
+    """
+    Create the one telegram.Bot shared by the Updater and the Notifier
+
+    Args:
+        token: Bot token
+        base_url: Bot API base URL (e.g. http://127.0.0.1:8081/bot for a stub), None for Telegram
+        Other args: see PooledRequest
+
+    Returns:
+        telegram.Bot: Bot whose `request` is a PooledRequest
+    """
+    from telegram import Bot
+
+    request = PooledRequest(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                            pool_timeout=pool_timeout, ca_certs=ca_certs)
+    if base_url:
+        return Bot(token=token, request=request, base_url=base_url)
+    return Bot(token=token, request=request)
@@ -0,0 +1,121 @@
+import pytest
+from core.accounts import AccountRegistry
+from core.config import Config
+
+
+def _config(**strategy):
+    config = Config.to_dict()
+    config["symbol"] = 'SHB'
+    config["strategy"].update(down_threshold=1.0, up_threshold=2.0, pre_buy_range=0.5, rsi_oversold=0)
+    config["strategy"].update(strategy)
+    return config
+
+
+def _buy(account, price=16.0, quantity=100):
+    account.position.add_layer(price, quantity)
+
+
+def test_chats_are_routed_to_a_stable_shard():
+    accounts = AccountRegistry(_config(), shards=4)
+    for chat in range(40):
+        accounts.get_or_create(chat)
+
+    assert len(accounts) == 40
+    assert all(accounts._shard(chat) is accounts._shard(str(chat)) for chat in range(40))
+    assert sum(1 for shard in accounts._shards if shard.accounts) == 4
+    for shard in accounts._shards:
+        assert all(accounts._shard(chat_id) is shard for chat_id in shard.accounts)
+
+
+def test_update_only_reserializes_its_own_shard():
+    accounts = AccountRegistry(_config(), shards=4)
+    for chat in range(8):
+        accounts.get_or_create(chat)
+    accounts.to_records()
+
+    accounts.update('3', _buy)
+
+    dirty = [shard for shard in accounts._shards if shard.records is None]
+    assert dirty == [accounts._shard('3')]
+    assert accounts.to_records()['3']['layers'][0]['quantity'] == 100
+
+
+def test_legacy_layers_migrate_to_the_default_chat():
+    data = {"layers": [{"price": 16.0, "quantity": 100, "time": "2024-01-02T09:15:00"}]}
+    accounts = AccountRegistry(_config())
+    accounts.load(data, default_chat_id='1')
+
+    position = accounts.get('1').position
+    assert position.total_quantity() == 100
+    assert accounts.to_records()['1']['layers'][0]['time'] == "2024-01-02T09:15:00"
+
+
+def test_legacy_layers_do_not_overwrite_a_saved_account():
+    data = {
+        "accounts": {"1": {"layers": [{"price": 17.0, "quantity": 200}]}},
+        "layers": [{"price": 16.0, "quantity": 100}],
+    }
+    accounts = AccountRegistry(_config())
+    accounts.load(data, default_chat_id='1')
+
+    assert accounts.get('1').position.total_quantity() == 200
+    assert len(accounts) == 1
+
+
+def test_chats_outside_the_allow_list_are_refused():
+    accounts = AccountRegistry(_config(), allowed_chats=[1, '2'])
+    accounts.get_or_create('1')
+    accounts.get_or_create(2)
+
+    with pytest.raises(PermissionError):
+        accounts.get_or_create('3')
+    with pytest.raises(PermissionError):
+        accounts.update('3', _buy)
+    assert accounts.get('3') is None
+    assert len(accounts) == 2
+
+
+def test_saved_accounts_of_removed_chats_stay_saved_but_inactive():
+    data = {"accounts": {
+        "1": {"layers": [{"price": 16.0, "quantity": 100}]},
+        "9": {"layers": [{"price": 17.0, "quantity": 50}]},
+    }}
+    accounts = AccountRegistry(_config(), allowed_chats=['1'])
+    accounts.load(data)
+
+    assert accounts.get('9') is None
+    assert [chat_id for chat_id, *_ in accounts.evaluate({'SHB': 30.0})] == ['1']
+    assert accounts.to_records()['9'] == data["accounts"]["9"]
+
+
+def test_thresholds_are_per_chat_and_survive_a_reload():
+    accounts = AccountRegistry(_config())
+    for chat in ('1', '2'):
+        accounts.update(chat, _buy)
+    accounts.update('2', lambda account: account.set_thresholds(down_threshold=3.0, up_threshold=5.0))
+
+    assert accounts.get('1').strategy.trigger_levels(accounts.get('1').position) == [15.0, 18.0]
+    assert accounts.get('2').strategy.trigger_levels(accounts.get('2').position) == [13.0, 21.0]
+    assert [(chat_id, kind) for chat_id, kind, *_ in accounts.evaluate({'SHB': 18.5})] == [('1', 'sell')]
+
+    reloaded = AccountRegistry(_config())
+    reloaded.load({"accounts": accounts.to_records()})
+    assert reloaded.get('2').overrides == {'down_threshold': 3.0, 'up_threshold': 5.0}
+    assert reloaded.get('1').strategy.config["strategy"]["up_threshold"] == 2.0
+
+
+def test_invalid_thresholds_are_rejected():
+    account = AccountRegistry(_config()).get_or_create('1')
+    with pytest.raises(ValueError):
+        account.set_thresholds(cooldown_minutes=1)
+    with pytest.raises(ValueError):
+        account.set_thresholds(down_threshold=-1)
+    assert account.overrides == {}
+
+
+def test_event_keys_name_the_trigger_level_and_quote_time():
+    accounts = AccountRegistry(_config())
+    accounts.update('1', _buy)
+
+    [(_, kind, _, key)] = accounts.evaluate({'SHB': 14.5}, {'SHB': '2024-01-02T10:00:00'})
+    assert (kind, key) == ('buy_more', 'buy_more:SHB:15:2024-01-02T10:00:00')
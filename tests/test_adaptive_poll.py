@@ -0,0 +1,51 @@
+import pytest
+from core.adaptive_poll import AdaptivePoller
+from core.alert_rules import AlertRuleBook
+
+
+def _poller(adaptive=True):
+    return AdaptivePoller({'poll': {
+        'open': 300, 'adaptive': adaptive, 'min': 30, 'max': 600,
+        'band': 0.01, 'volatility_threshold': 0.5,
+    }})
+
+
+@pytest.mark.parametrize('level, interval', [
+    (16.1, 30),    # 0.6% away, inside the band
+    (16.32, 60),   # 2% away, twice the band
+    (16.64, 120),  # 4% away
+    (16.8, 150),   # 5% away
+])
+def test_interval_ramps_with_distance_to_the_nearest_level(level, interval):
+    assert _poller().next_interval(16.0, [level]) == pytest.approx(interval)
+
+
+def test_interval_is_clamped_to_min_and_max():
+    assert _poller().next_interval(16.0, [16.0]) == 30
+    assert _poller().next_interval(16.0, [48.0]) == 600
+    assert _poller().next_interval(16.0, []) == 600
+
+
+def test_nearest_level_wins_on_either_side():
+    assert _poller().next_interval(16.0, [19.0, 15.68, 17.0]) == pytest.approx(60)
+
+
+def test_non_adaptive_polls_at_the_open_interval():
+    assert _poller(adaptive=False).next_interval(16.0, [16.0]) == 300
+
+
+def test_volatile_ticks_poll_at_min():
+    poller = _poller()
+    for price in (16.0, 24.0, 12.0, 24.0):
+        interval = poller.next_interval(price, [48.0])
+    assert interval == 30
+
+
+def test_alert_rule_levels_count_against_their_own_symbol():
+    rules = AlertRuleBook()
+    rules.add('VNM', '>=', 71.4)
+    rules.add('FPT', '<=', 90.0)
+    targets = rules.trigger_levels({'SHB': 16.0, 'VNM': 70.0})
+
+    assert targets == [(70.0, 71.4)]  # FPT has no price in this batch
+    assert _poller().next_interval(16.0, [19.0], targets) == pytest.approx(60)
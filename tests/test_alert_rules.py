@@ -0,0 +1,60 @@
+import pytest
+from core.alert_rules import AlertRuleBook
+from core.trigger_index import ABOVE, BELOW
+
+
+def test_rules_fire_once_per_crossing():
+    book = AlertRuleBook()
+    rule = book.add('shb', '<=', 15000, chat_id='1')
+
+    assert book.evaluate('SHB', 15500) == []  # first price only sets the reference
+    assert [r.id for r, _ in book.evaluate('SHB', 14900)] == [rule.id]
+    assert book.evaluate('SHB', 14800) == []  # still below: no repeat
+    assert book.evaluate('SHB', 15100) == []
+    assert [r.id for r, _ in book.evaluate('SHB', 15000)] == [rule.id]
+    assert rule.fired == 2
+
+
+def test_percent_rule_level_comes_from_the_base_price():
+    book = AlertRuleBook()
+    rule = book.add('SHB', 'pct', -3, base_price=16000)
+
+    assert rule.level == pytest.approx(15520) and rule.direction == BELOW
+    assert book.add('SHB', 'pct', 5, base_price=16000).direction == ABOVE
+
+
+@pytest.mark.parametrize('args', [
+    ('SH-B', '>=', 1),
+    ('SHB', '==', 1),
+    ('SHB', '>=', 0),
+    ('SHB', 'pct', 0, 16000),
+    ('SHB', 'pct', -100, 16000),
+    ('SHB', 'pct', 5, None),
+])
+def test_invalid_rules_are_rejected(args):
+    with pytest.raises(ValueError):
+        AlertRuleBook().add(*args)
+
+
+def test_message_is_html_safe():
+    book = AlertRuleBook()
+    book.add('SHB', '<=', 15000)
+    book.evaluate('SHB', 15500)
+
+    (_, message), = book.evaluate('SHB', 14900)
+    assert '&lt;=' in message and '<=' not in message
+
+
+def test_records_round_trip_and_removal():
+    book = AlertRuleBook()
+    book.add('SHB', '>=', 17000, chat_id='1')
+    second = book.add('VCB', '<=', 80000, chat_id='2')
+
+    restored = AlertRuleBook(book.to_records())
+    assert [r.describe() for r in restored.rules()] == [r.describe() for r in book.rules()]
+    assert restored.add('FPT', '>=', 1).id == 3
+
+    assert restored.remove(second.id).symbol == 'VCB'
+    assert restored.symbols() == ['SHB', 'FPT']
+    assert restored.rules(chat_id='2') == []
+    assert restored.remove(99) is None
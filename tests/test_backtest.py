@@ -0,0 +1,54 @@
+from datetime import datetime
+import pytest
+from core.backtest import Backtester, SimulatedClock, load_ticks
+from core.config import Config
+
+
+def _write_csv(path, rows):
+    path.write_text("time,price\n" + "".join(f"{t},{p}\n" for t, p in rows))
+    return path
+
+
+def test_clock_accepts_offset_timestamps():
+    aware = SimulatedClock(datetime.fromisoformat('2024-01-02T09:00:00+07:00'))
+    naive_utc = SimulatedClock(datetime(2024, 1, 2, 2, 0))
+
+    assert aware.monotonic() == naive_utc.monotonic()
+    aware.current = datetime.fromisoformat('2024-01-02T09:15:00+07:00')
+    assert aware.monotonic() - naive_utc.monotonic() == 900
+
+
+def test_replay_with_offset_timestamps_applies_cooldowns(tmp_path):
+    csv = _write_csv(tmp_path / 'ticks.csv', [
+        ('2024-01-02T09:00:00+07:00', 16.0),
+        ('2024-01-02T09:00:03+07:00', 15.0),
+        ('2024-01-02T09:20:00+07:00', 14.9),
+    ])
+    config = Config.to_dict()
+    config["strategy"].update(cooldown_minutes=15)
+
+    report = Backtester(config, trade=False).run(load_ticks(csv))
+
+    assert report.ticks == 3
+    assert [(ts.minute, kind) for ts, kind, _ in report.alerts] == [(0, 'pre_buy'), (20, 'pre_buy')]
+
+
+def test_bars_expand_to_intrabar_ticks(tmp_path):
+    csv = tmp_path / 'bars.csv'
+    csv.write_text("time,open,high,low,close\n1704160800,16,16.5,15.8,16.2\n1704160860,16.2,16.3,15.5,15.6\n")
+
+    assert [p for _, p in load_ticks(csv)] == [16, 15.8, 16.5, 16.2, 16.2, 16.3, 15.5, 15.6]
+    assert [p for _, p in load_ticks(csv, intrabar=False)] == [16.2, 15.6]
+
+
+def test_trading_on_alerts_tracks_pnl(tmp_path):
+    config = Config.to_dict()
+    config["strategy"].update(down_threshold=1, up_threshold=1, cooldown_minutes=1, rsi_oversold=None)
+    csv = _write_csv(tmp_path / 'ticks.csv', [(60 * i, p) for i, p in enumerate([10, 10, 8.9, 8.9, 11, 11])])
+
+    report = Backtester(config, lot_size=100).run(load_ticks(csv))
+
+    # pre_buy at 10, buy_more at 8.9 (avg 9.45), sell everything at 11, then pre_buy again at 11
+    assert (report.buys, report.sells) == (3, 1)
+    assert report.realized_pnl == pytest.approx((11 - 9.45) * 200)
+    assert (report.final_quantity, report.final_avg) == (100, 11)
@@ -0,0 +1,97 @@
+import threading
+from telegram.error import BadRequest, NetworkError, Unauthorized
+from services.notify_service import BLOCKED, DROPPED, FAILED, REJECTED, SENT, Notifier
+
+
+class ScriptedBot:
+    """Records every request; errors maps a chat to the exception it raises"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.requests = []  # (chat_id, text)
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        with self.lock:
+            self.requests.append((chat_id, text))
+        error = self.errors.get(chat_id)
+        if error:
+            raise error
+
+
+def _notifier(bot, **kwargs):
+    kwargs.setdefault('global_rate', 1000)
+    kwargs.setdefault('chat_rate', 1000)
+    kwargs.setdefault('chat_burst', 1000)
+    return Notifier('token', '1', bot=bot, async_send=True, workers=4, **kwargs)
+
+
+def test_broadcasts_keep_each_chats_order():
+    bot = ScriptedBot()
+    notifier = _notifier(bot)
+    chats = [str(c) for c in range(10)]
+    broadcasts = [notifier.broadcast(f"m{i}", chats) for i in range(5)]
+
+    assert all(b.wait(5) for b in broadcasts)
+    notifier.close()
+    for chat in chats:
+        assert [text for chat_id, text in bot.requests if chat_id == chat] == [f"m{i}" for i in range(5)]
+    assert all(b.counts == {SENT: 10} for b in broadcasts)
+
+
+def test_outcomes_are_counted_per_chat(monkeypatch):
+    monkeypatch.setattr('services.notify_service.backoff_delay', lambda attempt, base, cap: 0.01)
+    bot = ScriptedBot({
+        'blocked': Unauthorized("Forbidden: bot was blocked by the user"),
+        'bad': BadRequest("Chat not found"),
+        'flaky': NetworkError("Connection reset"),
+    })
+    notifier = _notifier(bot, max_attempts=2)
+
+    broadcast = notifier.broadcast("hello", ['ok1', 'blocked', 'bad', 'flaky', 'ok2', 'ok1'])
+
+    assert broadcast.wait(5)
+    notifier.close()
+    assert broadcast.counts == {SENT: 2, BLOCKED: 1, REJECTED: 1, FAILED: 1}
+    assert broadcast.pending == 0
+    assert [c for c, _ in bot.requests].count('flaky') == 2
+    assert [c for c, _ in bot.requests].count('ok1') == 1  # duplicate chat ids are sent once
+
+
+def test_blocked_chats_are_skipped_without_a_request():
+    bot = ScriptedBot({'2': Unauthorized("Forbidden: bot was kicked")})
+    notifier = _notifier(bot)
+    assert notifier.broadcast("first", ['1', '2']).wait(5)
+
+    second = notifier.broadcast("second", ['1', '2'])
+    assert second.wait(5)
+    assert second.counts == {SENT: 1, BLOCKED: 1}
+    assert bot.requests.count(('2', "second")) == 0
+
+    notifier.unblock(2)
+    bot.errors.clear()
+    assert notifier.broadcast("third", ['2']).wait(5)
+    notifier.close()
+    assert ('2', "third") in bot.requests
+
+
+def test_full_queue_drops_the_rest_of_a_broadcast():
+    notifier = Notifier('token', '1', bot=ScriptedBot(), async_send=True, queue_size=2)
+    notifier.close()  # closed: nothing is accepted
+
+    broadcast = notifier.broadcast("late", ['1', '2', '3'])
+
+    assert broadcast.wait(0)
+    assert broadcast.counts == {DROPPED: 3}
+
+
+def test_sync_broadcast_resolves_before_returning():
+    bot = ScriptedBot({'2': Unauthorized("Forbidden: bot was blocked by the user")})
+    notifier = Notifier('token', '1', bot=bot)
+
+    broadcast = notifier.broadcast("hello", ['1', '2', '3'])
+
+    assert broadcast.wait(0)
+    assert broadcast.counts == {SENT: 2, BLOCKED: 1}
+    assert notifier.get_stats()['broadcasts'] == 1
+    assert notifier.broadcast("nobody", []).wait(0)
@@ -0,0 +1,78 @@
+import pytest
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(**kwargs):
+    clock = FakeClock()
+    return CircuitBreaker('test', clock=clock, **kwargs), clock
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker, _ = _breaker(failure_threshold=3, recovery_timeout=30)
+
+    _fail(breaker, 2)
+    breaker.before_call()
+    breaker.record_success()  # a success resets the streak
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert 30 <= raised.value.retry_after <= 33  # open period is jittered up to 10%
+    assert breaker.snapshot()['total_rejected'] == 1
+
+
+def test_half_open_allows_one_trial_and_success_closes():
+    breaker, clock = _breaker(failure_threshold=1, recovery_timeout=30)
+    _fail(breaker, 1)
+
+    clock.now += 34
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial in flight
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_with_doubled_timeout():
+    breaker, clock = _breaker(failure_threshold=1, recovery_timeout=30, max_recovery_timeout=100)
+    _fail(breaker, 1)
+
+    for open_for in (60, 100, 100):
+        clock.now += 200
+        _fail(breaker, 1)  # trial call fails
+        assert breaker.state == OPEN
+        assert open_for <= breaker.retry_after() <= open_for * 1.1
+
+    clock.now += 200
+    breaker.before_call()
+    breaker.record_success()
+    _fail(breaker, 1)
+    assert breaker.retry_after() <= 33  # recovery time reset by the success
+    assert breaker.snapshot()['times_opened'] == 5
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    delays = [backoff_delay(attempt, base=5, cap=60) for attempt in range(1, 10) for _ in range(200)]
+    assert min(delays) >= 0
+    assert max(delays) <= 60
+    assert max(backoff_delay(1, base=5, cap=60) for _ in range(200)) <= 5
@@ -0,0 +1,111 @@
+import time
+from core.config import Config
+from services.coalescer import MAX_MESSAGE_LENGTH, SEPARATOR, AlertCoalescer
+
+
+class RecordingNotifier:
+    chat_id = '1'
+
+    def __init__(self):
+        self.sent = []  # (chat_id, kind, message)
+        self.closed = False
+
+    def send(self, message, chat_id=None, kind=None):
+        self.sent.append((chat_id, kind, message))
+        return True
+
+    def close(self, timeout=5):
+        self.closed = True
+
+
+def _wait_for(notifier, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(notifier.sent) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return notifier.sent
+
+
+def test_messages_within_window_become_one_digest():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=0.2)
+
+    coalescer.send("a", chat_id='1', kind='buy_more')
+    coalescer.send("b", chat_id='1', kind='rsi_buy_more')
+    coalescer.send("c", chat_id='2', kind='sell')
+    assert notifier.sent == []
+
+    sent = _wait_for(notifier, 2)
+    assert sorted(sent) == [('1', 'digest', f"a{SEPARATOR}b"), ('2', 'sell', "c")]
+    coalescer.close()
+
+
+def test_window_starts_with_the_first_message():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=0.2)
+
+    coalescer.send("a", chat_id='1', kind='buy_more')
+    assert _wait_for(notifier, 1) == [('1', 'buy_more', "a")]
+    coalescer.send("b", chat_id='1', kind='buy_more')
+    time.sleep(0.05)
+    assert len(notifier.sent) == 1  # a new window, not sent at once
+    assert _wait_for(notifier, 2)[1] == ('1', 'buy_more', "b")
+    coalescer.close()
+
+
+def test_urgent_and_system_messages_flush_pending_at_once():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=60, urgent_kinds=('sell',))
+
+    coalescer.send("report", chat_id='1', kind='price_update')
+    coalescer.send("take profit", chat_id='1', kind='sell')
+    coalescer.send("report 2", chat_id='1', kind='price_update')
+    coalescer.send("bot stopped", chat_id='1')
+
+    assert notifier.sent == [
+        ('1', 'digest', f"take profit{SEPARATOR}report"),
+        ('1', 'digest', f"bot stopped{SEPARATOR}report 2"),
+    ]
+    assert coalescer.get_stats()['urgent'] == 1
+    coalescer.close()
+
+
+def test_newer_price_report_replaces_pending_one_and_duplicates_drop():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=60)
+
+    coalescer.send("price 1", chat_id='1', kind='price_update')
+    coalescer.send("alert", chat_id='1', kind='buy_more')
+    coalescer.send("alert", chat_id='1', kind='buy_more')
+    coalescer.send("price 2", chat_id='1', kind='price_update')
+    coalescer.close()
+
+    assert notifier.sent == [('1', 'digest', f"alert{SEPARATOR}price 2")]
+    assert notifier.closed
+    stats = coalescer.get_stats()
+    assert stats['replaced'] == 1 and stats['deduplicated'] == 1 and stats['saved'] == 3
+
+
+def test_long_digests_are_split_at_the_telegram_limit():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=60)
+
+    for i in range(5):
+        coalescer.send(str(i) * 1500, chat_id='1', kind='buy_more')
+    coalescer.flush()
+
+    assert len(notifier.sent) == 3
+    assert all(len(message) <= MAX_MESSAGE_LENGTH for _, _, message in notifier.sent)
+    assert "".join(m for _, _, m in notifier.sent).replace(SEPARATOR, "") == "".join(str(i) * 1500 for i in range(5))
+    coalescer.close()
+
+
+def test_zero_window_passes_through():
+    notifier = RecordingNotifier()
+    coalescer = AlertCoalescer(notifier, window_seconds=0)
+
+    coalescer.send("a", chat_id='1', kind='buy_more')
+    assert notifier.sent == [('1', 'buy_more', "a")]
+
+
+def test_rule_alerts_are_urgent_by_default():
+    assert {'buy_more', 'sell', 'alert'} <= set(Config.NOTIFY_URGENT_KINDS)
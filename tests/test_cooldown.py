@@ -0,0 +1,78 @@
+from core.cooldown import CooldownTracker
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_blocks_within_cooldown_and_allows_strictly_after():
+    clock = FakeClock(100.0)
+    tracker = CooldownTracker(60, clock=clock)
+    key = ('1', 'SHB', 'buy_more')
+
+    assert tracker.allow(key)
+    clock.now += 60
+    assert not tracker.allow(key)  # exactly the cooldown is still cooling down
+    assert tracker.remaining(key) == 0.0
+    clock.now += 0.5
+    assert tracker.allow(key)
+    assert tracker.remaining(key) == 60
+
+
+def test_keys_are_independent_and_override_cooldown():
+    clock = FakeClock()
+    tracker = CooldownTracker(900, clock=clock)
+
+    assert tracker.allow(('1', 'SHB', 'buy_more'))
+    assert tracker.allow(('1', 'SHB', 'sell'))
+    assert tracker.allow(('2', 'SHB', 'buy_more'))
+    assert tracker.allow(('1', 'SHB', 'alert'), cooldown_seconds=5)
+
+    clock.now += 6
+    assert tracker.allow(('1', 'SHB', 'alert'), cooldown_seconds=5)
+    assert not tracker.allow(('1', 'SHB', 'buy_more'))
+
+
+def test_expired_keys_are_swept_as_the_clock_advances():
+    clock = FakeClock()
+    tracker = CooldownTracker(10, clock=clock, slots=16)
+
+    for i in range(1000):
+        tracker.allow(('chat', f"S{i}", 'buy_more'))
+        clock.now += 0.1  # 100 keys per cooldown period
+    assert len(tracker) <= 110
+    assert tracker.expired >= 890
+
+    clock.now += 1000  # further than a whole wheel rotation
+    tracker.allow(('chat', 'SHB', 'sell'))
+    assert len(tracker) == 1
+
+
+def test_keys_beyond_one_rotation_survive_the_sweep():
+    clock = FakeClock()
+    tracker = CooldownTracker(100, clock=clock, slots=8)
+    key = ('1', 'SHB', 'sell')
+
+    tracker.allow(key)
+    for _ in range(99):
+        clock.now += 1
+        tracker.allow(('1', 'other', 'tick'), cooldown_seconds=0)
+    assert not tracker.allow(key)
+
+
+def test_reset_clears_one_key_or_all():
+    tracker = CooldownTracker(60, clock=FakeClock())
+    tracker.allow('a')
+    tracker.allow('b')
+
+    tracker.reset('a')
+    assert tracker.allow('a')
+    assert not tracker.allow('b')
+
+    tracker.reset()
+    assert len(tracker) == 0
+    assert tracker.allow('b')
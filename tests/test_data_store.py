@@ -0,0 +1,46 @@
+import json
+import os
+import threading
+import pytest
+import main
+from core.accounts import AccountRegistry
+from core.config import Config
+from utils.data_store import DataStore
+
+
+def test_failed_save_keeps_the_previous_file(tmp_path):
+    store = DataStore(str(tmp_path / 'data.json'))
+    store.save({"accounts": {"1": {"layers": []}}})
+
+    with pytest.raises(TypeError):
+        store.save({"accounts": object()})
+
+    assert store.load() == {"accounts": {"1": {"layers": []}}}
+    assert not (tmp_path / 'data.json.tmp').exists()
+
+
+def test_concurrent_commands_save_every_update(tmp_path, monkeypatch):
+    store = DataStore(str(tmp_path / 'data.json'))
+    accounts = AccountRegistry(Config.to_dict())
+    monkeypatch.setattr(main, 'bot_data_store', store)
+    monkeypatch.setattr(main, 'bot_accounts', accounts)
+    monkeypatch.setattr(main, 'bot_alert_rules', None)
+    monkeypatch.setattr(os, 'fsync', lambda fd: None)  # durability is not under test here
+    # Slow the write down so saves from different threads overlap
+    dump = json.dump
+    monkeypatch.setattr(json, 'dump', lambda *a, **kw: (threading.Event().wait(0.01), dump(*a, **kw)))
+
+    def buy(chat_id):
+        for i in range(3):
+            accounts.update(chat_id, lambda account: account.position.add_layer(16.0 + i, 100))
+            main.save_state()
+
+    threads = [threading.Thread(target=buy, args=(str(chat),)) for chat in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    saved = json.loads((tmp_path / 'data.json').read_text())["accounts"]
+    assert sorted(saved) == [str(chat) for chat in range(4)]
+    assert all(len(record["layers"]) == 3 for record in saved.values())
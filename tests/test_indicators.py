@@ -0,0 +1,92 @@
+import pytest
+from core.config import Config
+from core.indicators import ATR, EMA, RSI, IndicatorBook, IndicatorSet
+from core.position import Position
+from core.strategy import Strategy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ema_is_seeded_with_the_simple_average():
+    ema = EMA(period=3)
+    assert [ema.update(p) for p in (1.0, 2.0)] == [None, None]
+    assert ema.update(3.0) == 2.0
+    assert ema.update(6.0) == 4.0  # alpha = 2 / (3 + 1)
+
+
+def test_rsi_averages_the_first_changes_then_smooths():
+    rsi = RSI(period=3)
+    assert [rsi.update(p) for p in (10.0, 11.0, 10.0)] == [None, None, None]
+    assert rsi.update(12.0) == pytest.approx(75.0)  # gains 1, 0, 2 vs losses 0, 1, 0
+    assert rsi.update(11.0) == pytest.approx(100 - 100 / (1 + (2 / 3) / (5 / 9)))
+
+
+def test_rsi_without_losses():
+    rising, flat = RSI(period=2), RSI(period=2)
+    for i in range(4):
+        rising.update(10.0 + i)
+        flat.update(10.0)
+    assert rising.value == 100.0
+    assert flat.value == 50.0
+
+
+def test_atr_is_seeded_then_uses_wilder_smoothing():
+    atr = ATR(period=2)
+    assert atr.update(12.0, 10.0, 11.0) is None
+    assert atr.update(13.0, 11.0, 12.0) == 2.0
+    assert atr.update(16.0, 12.0, 15.0) == 3.0
+    assert atr.update(20.0, 19.0, 19.5) == 4.0  # gap up: true range from the previous close
+
+
+def test_vwap_weights_by_volume_increase_and_resets_on_a_new_session():
+    indicators = IndicatorSet()
+    indicators.update(10.0, volume=100)
+    indicators.update(12.0, volume=300)
+    assert indicators.vwap.value == pytest.approx((10 * 100 + 12 * 200) / 300)
+
+    indicators.update(30.0, volume=300)  # no trades since the last poll
+    assert indicators.vwap.value == pytest.approx((10 * 100 + 12 * 200) / 300)
+
+    indicators.update(20.0, volume=50)  # cumulative volume dropped: next session
+    assert indicators.vwap.value == 20.0
+    assert indicators.vwap.volume == 50
+
+
+def test_vwap_without_volume_weights_every_update_equally():
+    indicators = IndicatorSet()
+    for price in (10.0, 12.0, 14.0):
+        indicators.update(price)
+    assert indicators.vwap.value == 12.0
+
+
+def _oversold_strategy(prices):
+    config = Config.to_dict()
+    config["strategy"].update(down_threshold=100, up_threshold=100, rsi_oversold=30)
+    indicators = IndicatorBook(config)
+    for price in prices:
+        indicators.update('SHB', price)
+    return Strategy(config, clock=FakeClock(), indicators=indicators, chat_id='1')
+
+
+def test_oversold_rsi_fires_below_the_average_price():
+    strategy = _oversold_strategy([20.0 - 0.2 * i for i in range(20)])
+    position = Position('SHB')
+    position.add_layer(20.0, 100)
+
+    assert [kind for kind, _ in strategy.signals(16.0, position)] == ['rsi_buy_more']
+    assert strategy.signals(16.0, position) == []  # cooldown
+    assert _oversold_strategy([20.0 - 0.2 * i for i in range(20)]).signals(21.0, position) == []
+
+
+def test_rsi_alert_needs_an_oversold_reading():
+    position = Position('SHB')
+    position.add_layer(20.0, 100)
+
+    assert _oversold_strategy([10.0 + 0.2 * i for i in range(20)]).signals(16.0, position) == []
+    assert _oversold_strategy([20.0, 19.0]).signals(16.0, position) == []  # RSI not seeded yet
@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+import main
+from services.price_service import PriceBatch, PriceData, StockAPIError
+
+
+class OpenCalendar:
+    def is_open(self, now=None):
+        return True
+
+
+class Notifier:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message, chat_id=None, kind=None, message_id=None):
+        self.sent.append(message)
+
+
+class Accounts:
+    def __init__(self):
+        self.seen = []
+
+    def evaluate(self, prices, times=None):
+        self.seen.append(sorted(prices))
+        return [('2', 'sell', f"sell {symbol}", None) for symbol in sorted(prices)]
+
+    def trigger_levels(self):
+        return []
+
+
+def _run(monkeypatch, outcomes, accounts=None):
+    """Run the sync loop over fetch outcomes (batches, or exceptions to raise); stops after the last one"""
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        if len(calls) == len(outcomes):
+            monkeypatch.setattr(main, 'shutdown_requested', True)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    sleeps = []
+    monkeypatch.setattr(main, 'shutdown_requested', False)
+    monkeypatch.setattr(main, 'fetch_prices', fetch)
+    monkeypatch.setattr(main, 'time', SimpleNamespace(sleep=sleeps.append))
+    notifier = Notifier()
+    main.run_polling_loop(accounts=accounts, notifier=notifier, calendar=OpenCalendar())
+    return calls, notifier.sent, sleeps
+
+
+def test_api_outage_does_not_count_towards_shutdown(monkeypatch):
+    outcomes = [StockAPIError("down")] * 8 + [KeyError('bug')] + [StockAPIError("down")]
+    calls, sent, sleeps = _run(monkeypatch, outcomes)
+
+    assert len(calls) == 10  # one unexpected error after 8 API errors keeps polling
+    assert sent == [
+        "⚠️ Bot paused after 5 consecutive API errors. Please check API status.",
+        "❌ Bot error: 'bug'",
+    ]
+    assert sleeps[8] == 60
+
+
+def test_unexpected_error_streak_stops_the_loop(monkeypatch):
+    calls, sent, _ = _run(monkeypatch, [ValueError("bad")] * 10)
+
+    assert len(calls) == 5
+    assert sent == ["❌ Bot error: bad"] * 5
+
+
+def test_primary_symbol_failure_still_evaluates_the_rest(monkeypatch):
+    monkeypatch.setattr(main.Config, 'STOCK_SYMBOL', 'SHB')
+    batch = PriceBatch(
+        prices={'VNM': PriceData('VNM', 70.0, datetime.now(), 'test')},
+        errors={'SHB': StockAPIError("SHB not on board")},
+    )
+    accounts = Accounts()
+    monkeypatch.setattr(main, 'backoff_delay', lambda attempt, base, cap: 7)
+    calls, sent, sleeps = _run(monkeypatch, [batch], accounts)
+
+    assert accounts.seen == [['VNM']]
+    assert sent == ["sell VNM"]
+    assert sleeps == [7]  # the SHB error still backs off like an API error
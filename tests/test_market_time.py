@@ -0,0 +1,55 @@
+from datetime import datetime
+import pytz
+from core.config import Config
+from core.market_time import MarketCalendar, calendar_from_config
+
+TZ = pytz.timezone('Asia/Ho_Chi_Minh')
+
+
+def _at(*args):
+    return TZ.localize(datetime(*args))
+
+
+def _calendar(holidays=()):
+    return MarketCalendar('Asia/Ho_Chi_Minh', range(5), "09:15-11:30,13:00-14:45", holidays=holidays)
+
+
+def test_sessions_lunch_break_and_weekend():
+    calendar = _calendar()  # 2024-03-04 is a Monday
+
+    assert not calendar.is_open(_at(2024, 3, 4, 9, 14))
+    assert calendar.is_open(_at(2024, 3, 4, 9, 15))
+    assert calendar.is_open(_at(2024, 3, 4, 11, 30))  # close is inclusive
+    assert not calendar.is_open(_at(2024, 3, 4, 12, 0))
+    assert calendar.is_open(_at(2024, 3, 4, 14, 0))
+    assert not calendar.is_open(_at(2024, 3, 9, 10, 0))  # Saturday
+
+
+def test_next_open_and_close():
+    calendar = _calendar()
+
+    assert calendar.next_open(_at(2024, 3, 4, 12, 0)) == _at(2024, 3, 4, 13, 0)
+    assert calendar.next_close(_at(2024, 3, 4, 12, 0)) == _at(2024, 3, 4, 14, 45)
+    assert calendar.next_close(_at(2024, 3, 4, 10, 0)) == _at(2024, 3, 4, 11, 30)
+    # Friday afternoon -> Monday morning
+    assert calendar.next_open(_at(2024, 3, 8, 15, 0)) == _at(2024, 3, 11, 9, 15)
+    assert calendar.seconds_until_open(_at(2024, 3, 4, 12, 0)) == 3600
+    assert calendar.seconds_until_open(_at(2024, 3, 4, 10, 0)) == 0
+
+
+def test_fixed_and_configured_holidays_are_closed():
+    calendar = _calendar(holidays=['2024-03-05'])
+
+    assert not calendar.is_open(_at(2024, 3, 5, 10, 0))
+    assert calendar.next_open(_at(2024, 3, 4, 15, 0)) == _at(2024, 3, 6, 9, 15)
+    # 30/4 and 1/5 fall on Tuesday and Wednesday in 2024
+    assert calendar.next_open(_at(2024, 4, 29, 15, 0)) == _at(2024, 5, 2, 9, 15)
+
+
+def test_next_open_past_the_precomputed_horizon():
+    calendar = MarketCalendar('Asia/Ho_Chi_Minh', range(5), "09:15-11:30", horizon_days=3)
+    assert calendar.next_open(_at(2024, 3, 8, 15, 0)) == _at(2024, 3, 11, 9, 15)
+
+
+def test_calendar_from_config_is_shared():
+    assert calendar_from_config(Config.to_dict()) is calendar_from_config(Config.to_dict())
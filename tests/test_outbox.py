@@ -0,0 +1,289 @@
+import time
+from collections import Counter
+from datetime import datetime
+import pytest
+from core.accounts import AccountRegistry
+from core.config import Config
+from services.coalescer import MAX_MESSAGE_LENGTH, SEPARATOR
+from services.notify_service import BLOCKED, FAILED, REJECTED, SENT, Broadcast, Notifier
+from services.outbox import Outbox
+
+
+class ScriptedNotifier:
+    """track() resolves at once; outcomes maps a message to the statuses of its attempts"""
+    chat_id = '1'
+
+    def __init__(self, outcomes=None):
+        self.outcomes = {m: list(s) for m, s in (outcomes or {}).items()}
+        self.attempts = Counter()
+        self.delivered = []  # (chat_id, message)
+
+    def track(self, message, chat_id=None, on_done=None):
+        self.attempts[message] += 1
+        statuses = self.outcomes.get(message)
+        status = statuses.pop(0) if statuses else SENT
+        if status == SENT:
+            self.delivered.append((chat_id, message))
+        tracker = Broadcast(None, [chat_id], on_done=on_done)
+        tracker.record(status)
+        return tracker
+
+    def close(self, timeout=5):
+        pass
+
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def open_outbox(tmp_path, monkeypatch):
+    # Retries wait exactly retry_cap instead of a full-jitter random delay
+    monkeypatch.setattr('services.outbox.backoff_delay', lambda attempt, base, cap: cap)
+    opened = []
+
+    def factory(notifier, name='outbox.db', **kwargs):
+        kwargs.setdefault('retry_cap', 0.05)
+        outbox = Outbox(notifier, path=tmp_path / name, **kwargs)
+        opened.append(outbox)
+        return outbox
+
+    yield factory
+    for outbox in opened:
+        if outbox._db is not None:
+            outbox.close(timeout=1)
+
+
+def test_rejected_message_is_dropped_and_does_not_block_the_chat(open_outbox):
+    notifier = ScriptedNotifier({'bad <markup': [REJECTED]})
+    outbox = open_outbox(notifier)
+
+    outbox.send('bad <markup', chat_id='2', kind='alert')
+    outbox.send('next alert', chat_id='2', kind='alert')
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert notifier.delivered == [('2', 'next alert')]
+    assert notifier.attempts['bad <markup'] == 1
+    assert outbox.get_stats()['rejected'] == 1
+
+
+def test_transient_failures_are_retried_until_delivered(open_outbox):
+    notifier = ScriptedNotifier({'report': [FAILED, FAILED]})
+    outbox = open_outbox(notifier)
+
+    outbox.send('report', chat_id='2', kind='price_update')
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert notifier.delivered == [('2', 'report')]
+    assert outbox.get_stats()['retried'] == 2
+
+
+def test_newer_rows_wait_behind_a_backed_off_row(open_outbox):
+    notifier = ScriptedNotifier({'report': [FAILED]})
+    outbox = open_outbox(notifier, retry_cap=0.3)
+
+    outbox.send('report', chat_id='2', kind='price_update')
+    assert _wait_until(lambda: outbox.get_stats()['retried'] == 1)
+    outbox.send('near buy zone', chat_id='2', kind='pre_buy')
+    outbox.send('other chat', chat_id='3', kind='pre_buy')
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert notifier.delivered.index(('3', 'other chat')) == 0  # other chats are not held
+    assert [m for c, m in notifier.delivered if c == '2'] == ['report', 'near buy zone']
+
+
+def test_urgent_rows_overtake_a_backed_off_row(open_outbox):
+    notifier = ScriptedNotifier({'report': [FAILED]})
+    outbox = open_outbox(notifier, retry_cap=60, urgent_kinds=('sell',))
+
+    outbox.send('report', chat_id='2', kind='price_update')
+    assert _wait_until(lambda: outbox.get_stats()['retried'] == 1)
+    outbox.send('near buy zone', chat_id='2', kind='pre_buy')
+    outbox.send('sell now', chat_id='2', kind='sell')
+    outbox.send('bot stopping', chat_id='2')
+
+    assert _wait_until(lambda: len(notifier.delivered) == 2)
+    time.sleep(0.1)
+    assert notifier.delivered == [('2', 'sell now'), ('2', 'bot stopping')]
+    assert outbox.get_stats()['rows'] == 2  # the report and the alert queued behind it
+
+
+def test_blocked_chat_rows_are_dropped(open_outbox):
+    notifier = ScriptedNotifier({'hello': [BLOCKED]})
+    outbox = open_outbox(notifier)
+
+    outbox.send('hello', chat_id='9', kind='alert')
+
+    assert _wait_until(lambda: outbox.get_stats()['blocked'] == 1)
+    assert outbox.get_stats()['rows'] == 0 and notifier.attempts['hello'] == 1
+
+
+def test_repeated_alert_without_a_key_is_sent_each_time(open_outbox):
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier)
+
+    outbox.send('SHB <= 15', chat_id='2', kind='alert')
+    assert _wait_until(lambda: len(notifier.delivered) == 1)
+    outbox.send('SHB <= 15', chat_id='2', kind='alert')
+
+    assert _wait_until(lambda: len(notifier.delivered) == 2)
+    assert outbox.get_stats()['deduplicated'] == 0
+
+
+def test_keyed_event_is_sent_once(open_outbox):
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier)
+
+    outbox.send('fill #1', chat_id='2', kind='alert', message_id='fill-1')
+    outbox.send('fill #1', chat_id='2', kind='alert', message_id='fill-1')  # still queued
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    outbox.send('fill #1', chat_id='2', kind='alert', message_id='fill-1')  # already delivered
+    time.sleep(0.1)
+
+    assert notifier.delivered == [('2', 'fill #1')]
+    assert outbox.get_stats()['deduplicated'] == 2
+
+
+def test_alert_raised_again_from_the_same_quote_is_sent_once(open_outbox):
+    # A restart loses the cooldowns; the first quote after it may be the one already alerted on
+    config = Config.to_dict()
+    position = {"layers": [{"price": 16.0, "quantity": 100}]}
+    quote = {'SHB': datetime(2024, 1, 2, 9, 30)}
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier)
+
+    for _ in range(2):
+        accounts = AccountRegistry(config)
+        accounts.get_or_create('2', position)
+        (chat_id, kind, msg, event), = accounts.evaluate({'SHB': 15.0}, quote)
+        outbox.send(msg, chat_id=chat_id, kind=kind, message_id=event)
+        assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+
+    accounts = AccountRegistry(config)
+    accounts.get_or_create('2', position)
+    (_, _, msg, event), = accounts.evaluate({'SHB': 15.0}, {'SHB': datetime(2024, 1, 2, 9, 31)})
+    outbox.send(msg, chat_id='2', kind='buy_more', message_id=event)  # a new quote is a new event
+    assert _wait_until(lambda: len(notifier.delivered) == 2)
+
+    assert event.startswith('buy_more:SHB:')
+    assert outbox.get_stats()['deduplicated'] == 1
+
+
+def test_only_keyed_deliveries_are_remembered(open_outbox):
+    outbox = open_outbox(ScriptedNotifier())
+
+    outbox.send('bot started', chat_id='2')
+    outbox.send('SHB >= 17', chat_id='2', kind='alert', message_id='alert:1:2024-01-02T09:30:00')
+
+    assert _wait_until(lambda: outbox.get_stats()['delivered'] == 2)
+    with outbox._cond:
+        remembered = [r[0] for r in outbox._db.execute("SELECT id FROM delivered")]
+    assert remembered == ['alert:1:2024-01-02T09:30:00:2']
+
+
+def test_undelivered_rows_survive_a_restart(open_outbox):
+    down = ScriptedNotifier({f"m{i}": [FAILED] * 1000 for i in range(3)})
+    outbox = open_outbox(down, retry_cap=60)
+    for i in range(3):
+        outbox.send(f"m{i}", chat_id='2', kind='alert')
+    assert _wait_until(lambda: outbox.get_stats()['retried'] == 1)  # only the head row is tried
+    outbox.close(timeout=0.2)
+
+    up = ScriptedNotifier()
+    outbox = open_outbox(up)
+
+    assert outbox.get_stats()['recovered'] == 3
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert up.delivered == [('2', 'm0'), ('2', 'm1'), ('2', 'm2')]  # in order, backoff not carried over
+
+
+def test_oldest_rows_are_evicted_beyond_max_rows(open_outbox):
+    down = ScriptedNotifier({f"m{i}": [FAILED] * 1000 for i in range(10)})
+    outbox = open_outbox(down, max_rows=3, retry_cap=60)
+
+    for i in range(10):
+        outbox.send(f"m{i}", chat_id='2', kind='alert')
+
+    stats = outbox.get_stats()
+    assert stats['rows'] == 3 and stats['evicted'] == 7
+
+
+def test_window_merges_a_chats_rows_into_one_message(open_outbox):
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier, window_seconds=0.3)
+
+    outbox.send('near buy zone', chat_id='2', kind='pre_buy')
+    outbox.send('report', chat_id='2', kind='price_update')
+    outbox.send('near buy zone', chat_id='2', kind='pre_buy')
+    outbox.send('report', chat_id='3', kind='price_update')
+    assert outbox.get_stats()['rows'] == 4 and not notifier.delivered  # stored, waiting for the window
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert sorted(notifier.delivered) == [('2', f"near buy zone{SEPARATOR}report"), ('3', 'report')]
+    stats = outbox.get_stats()
+    assert stats['delivered'] == 4 and stats['coalesced'] == 2
+
+
+def test_rows_waiting_for_a_digest_survive_a_crash(open_outbox):
+    held = ScriptedNotifier()
+    open_outbox(held, window_seconds=60).send('report', chat_id='2', kind='price_update')
+    # A second outbox on the same file stands in for the next start after a crash
+    restarted = ScriptedNotifier()
+    outbox = open_outbox(restarted, window_seconds=60)
+
+    assert outbox.get_stats()['recovered'] == 1
+    assert _wait_until(lambda: restarted.delivered == [('2', 'report')])
+    assert not held.delivered
+
+
+def test_urgent_row_ends_the_window_and_keeps_the_order(open_outbox):
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier, window_seconds=60, urgent_kinds=('sell',))
+
+    outbox.send('report', chat_id='2', kind='price_update')
+    outbox.send('sell now', chat_id='2', kind='sell')
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert notifier.delivered == [('2', f"report{SEPARATOR}sell now")]
+
+
+def test_long_digest_is_split_at_the_length_limit(open_outbox):
+    notifier = ScriptedNotifier()
+    outbox = open_outbox(notifier, window_seconds=0.1)
+
+    for letter in 'abc':
+        outbox.send(letter * 2000, chat_id='2', kind='pre_buy')
+
+    assert _wait_until(lambda: outbox.get_stats()['rows'] == 0)
+    assert [len(m) for _, m in notifier.delivered] == [4000 + len(SEPARATOR), 2000]
+    assert all(len(m) <= MAX_MESSAGE_LENGTH for _, m in notifier.delivered)
+
+
+@pytest.mark.parametrize('error, status', [
+    (lambda e: e.BadRequest("can't parse entities"), REJECTED),
+    (lambda e: e.NetworkError("connection reset"), FAILED),
+    (lambda e: e.TimedOut(), FAILED),
+    (lambda e: e.RetryAfter(5), FAILED),
+    (lambda e: e.Unauthorized("bot was blocked by the user"), BLOCKED),
+])
+def test_notifier_failure_status(error, status):
+    from telegram import error as telegram_error
+
+    class FailingBot:
+        def send_message(self, **kwargs):
+            raise error(telegram_error)
+
+    tracker = Notifier('token', '1', bot=FailingBot()).track('hi', chat_id='2')
+    assert dict(tracker.counts) == {status: 1}
+
+
+def test_notifier_unexpected_error_is_rejected():
+    class BrokenBot:
+        def send_message(self, **kwargs):
+            raise ValueError("malformed chat id")
+
+    tracker = Notifier('token', '1', bot=BrokenBot()).track('hi', chat_id='x')
+    assert dict(tracker.counts) == {REJECTED: 1}
@@ -0,0 +1,135 @@
+from datetime import datetime
+import services.polling_engine as polling_engine
+from services.polling_engine import AsyncPollingEngine
+from services.price_service import PriceBatch, PriceData, StockAPIError
+
+
+class Accounts:
+    def __init__(self, alerts=()):
+        self.alerts = list(alerts)
+
+    def evaluate(self, prices, times=None):
+        alerts, self.alerts = self.alerts, []
+        return alerts
+
+    def trigger_levels(self):
+        return []
+
+
+class Notifier:
+    chat_id = '1'
+
+    def __init__(self):
+        self.sent = []
+        self.events = []
+
+    def send(self, message, chat_id=None, kind=None, message_id=None):
+        self.sent.append((chat_id, kind, message))
+        self.events.append(message_id)
+
+
+def _batch(price=16.0):
+    return PriceBatch(prices={'SHB': PriceData('SHB', price, datetime.now(), 'test')})
+
+
+def _engine(accounts, notifier, stop_after_ticks=None):
+    engine = AsyncPollingEngine(['SHB'], 'SHB', accounts, notifier, interval_open=0.01,
+                                interval_closed=1, market_open=lambda: True)
+    sleep = engine._sleep
+
+    async def fast_sleep(seconds):
+        if stop_after_ticks is not None and engine.ticks >= stop_after_ticks:
+            engine._stop_event.set()
+        return await sleep(min(seconds, 0.001))
+
+    engine._sleep = fast_sleep
+    return engine
+
+
+def test_alerts_flow_from_fetch_to_notifier(monkeypatch):
+    monkeypatch.setattr(polling_engine, 'fetch_prices', lambda symbols: _batch())
+    notifier = Notifier()
+    engine = _engine(Accounts([('2', 'buy_more', "buy SHB", 'buy_more:SHB:15')]), notifier, stop_after_ticks=3)
+
+    engine.run()
+
+    assert engine.ticks >= 3
+    assert notifier.sent == [('2', 'buy_more', "buy SHB")]
+    assert notifier.events == ['buy_more:SHB:15']
+
+
+def test_unexpected_error_is_reported_and_polling_continues(monkeypatch):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        if len(calls) == 1:
+            raise KeyError('bug <b>')
+        return _batch()
+
+    monkeypatch.setattr(polling_engine, 'fetch_prices', fetch)
+    notifier = Notifier()
+    engine = _engine(Accounts(), notifier, stop_after_ticks=3)
+
+    engine.run()
+
+    assert engine.ticks >= 3
+    assert [m for _, _, m in notifier.sent] == ["❌ Bot error: 'bug &lt;b&gt;'"]
+
+
+def test_unexpected_error_streak_stops_the_engine(monkeypatch):
+    def fetch(symbols):
+        raise ValueError("bad data")
+
+    monkeypatch.setattr(polling_engine, 'fetch_prices', fetch)
+    notifier = Notifier()
+    engine = _engine(Accounts(), notifier)
+
+    engine.run()  # returns on its own
+
+    assert len(notifier.sent) == engine.max_consecutive_errors
+
+
+def test_api_errors_pause_notification_once(monkeypatch):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        if len(calls) <= 7:
+            raise StockAPIError("board down")
+        return _batch()
+
+    monkeypatch.setattr(polling_engine, 'fetch_prices', fetch)
+    notifier = Notifier()
+    engine = _engine(Accounts(), notifier, stop_after_ticks=1)
+
+    engine.run()
+
+    assert engine.ticks >= 1
+    assert [m for _, _, m in notifier.sent] == [
+        "⚠️ Bot paused after 5 consecutive API errors. Please check API status."
+    ]
+
+
+def test_primary_symbol_failure_still_evaluates_the_rest(monkeypatch):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        return PriceBatch(
+            prices={'VNM': PriceData('VNM', 70.0, datetime.now(), 'test')},
+            errors={'SHB': StockAPIError("SHB not on board")},
+        )
+
+    class WatchAccounts(Accounts):
+        def evaluate(self, prices, times=None):
+            return [('2', 'sell', f"sell {symbol}", None) for symbol in sorted(prices)]
+
+    monkeypatch.setattr(polling_engine, 'fetch_prices', fetch)
+    notifier = Notifier()
+    engine = _engine(WatchAccounts(), notifier, stop_after_ticks=2)
+
+    engine.run()
+
+    assert engine.ticks >= 2
+    assert ('2', 'sell', "sell VNM") in notifier.sent
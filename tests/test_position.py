@@ -0,0 +1,66 @@
+import random
+import pytest
+from core.position import AVERAGE, FIFO, Position
+
+
+def _recomputed(position):
+    quantity = sum(l.quantity for l in position.layers)
+    return quantity, sum(l.price * l.quantity for l in position.layers)
+
+
+def test_running_totals_match_a_recomputation():
+    rng = random.Random(11)
+    position = Position('SHB')
+
+    for _ in range(500):
+        if position.total_quantity() and rng.random() < 0.3:
+            position.sell(rng.uniform(10, 20), rng.randint(1, position.total_quantity()), FIFO)
+        else:
+            position.add_layer(round(rng.uniform(10, 20), 2), rng.randint(1, 10) * 100)
+        quantity, cost = _recomputed(position)
+        assert position.total_quantity() == quantity
+        if quantity:
+            assert position.average_price() == pytest.approx(cost / quantity)
+
+
+def test_average_cost_sale_keeps_the_average():
+    position = Position('SHB')
+    position.add_layer(10.0, 100)
+    position.add_layer(20.0, 100)
+    version = position.version
+
+    sale = position.sell(18.0, 50, AVERAGE)
+
+    assert sale.pnl == pytest.approx((18 - 15) * 50)
+    assert position.average_price() == pytest.approx(15.0)
+    assert position.version == version + 1
+
+
+def test_fifo_sale_matches_oldest_lots():
+    position = Position('SHB')
+    position.add_layer(10.0, 100)
+    position.add_layer(20.0, 100)
+
+    sale = position.sell(18.0, 150, FIFO)
+
+    assert sale.pnl == pytest.approx(8 * 100 + (-2) * 50)
+    assert [(l.price, l.quantity) for l in position.layers] == [(20.0, 50)]
+
+
+def test_overselling_is_rejected():
+    position = Position('SHB')
+    position.add_layer(10.0, 100)
+    with pytest.raises(ValueError):
+        position.sell(12.0, 101)
+
+
+def test_records_keep_layer_times():
+    position = Position('SHB')
+    position.add_layer(16.0, 100, timestamp='2024-01-02T09:30:00')
+
+    restored = Position.from_records('SHB', position.to_records())
+
+    assert restored.layers[0].time == '2024-01-02T09:30:00'
+    assert restored.layers[0] == position.layers[0]
+    restored_full = Position.from_dict('SHB', position.to_dict())
+    assert restored_full.average_price() == position.average_price()
@@ -0,0 +1,105 @@
+from datetime import datetime
+import pytest
+from core.price_history import PriceHistory, PriceRing
+from services.price_service import PriceData
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _flat(segments):
+    return [(t, p) for ts, px in segments for t, p in zip(ts, px)]
+
+
+def test_ring_keeps_the_newest_samples_after_wrapping():
+    ring = PriceRing(capacity=4)
+    for i in range(6):
+        ring.append(float(i), 10.0 + i)
+
+    assert len(ring) == 4
+    assert ring.last() == (5.0, 15.0)
+    segments = ring.segments()
+    assert len(segments) == 2  # window spans the end of the buffer
+    assert _flat(segments) == [(2.0, 12.0), (3.0, 13.0), (4.0, 14.0), (5.0, 15.0)]
+
+
+def test_full_ring_aligned_to_the_buffer_is_one_segment():
+    ring = PriceRing(capacity=3)
+    for i in range(6):
+        ring.append(float(i), float(i))
+
+    assert [len(ts) for ts, _ in ring.segments()] == [3]
+
+
+def test_out_of_order_samples_are_rejected():
+    ring = PriceRing(capacity=4)
+    assert ring.append(10.0, 16.0)
+    assert ring.append(10.0, 16.1)  # same timestamp is allowed
+    assert not ring.append(9.0, 15.0)
+
+    assert len(ring) == 2
+    assert ring.last() == (10.0, 16.1)
+
+
+def test_out_of_order_check_uses_the_newest_sample_after_wrapping():
+    ring = PriceRing(capacity=2)
+    for ts in (1.0, 2.0, 3.0, 4.0):
+        ring.append(ts, ts)
+
+    assert not ring.append(3.5, 0.0)
+    assert ring.append(4.5, 4.5)
+
+
+def test_segments_since_bisects_into_both_halves():
+    ring = PriceRing(capacity=5)
+    for i in range(8):
+        ring.append(float(i), float(i))
+
+    assert _flat(ring.segments(since=4.5)) == [(5.0, 5.0), (6.0, 6.0), (7.0, 7.0)]
+    assert _flat(ring.segments(since=3.0))[0] == (3.0, 3.0)
+    assert ring.segments(since=8.0) == []
+    assert PriceRing(capacity=2).segments() == []
+
+
+def test_window_stats_across_the_wrap():
+    ring = PriceRing(capacity=4)
+    for ts, price in [(1, 9.0), (2, 16.0), (3, 18.0), (4, 14.0), (5, 20.0)]:
+        ring.append(float(ts), price)
+
+    assert ring.stats() == {
+        'count': 4, 'min': 14.0, 'max': 20.0, 'mean': 17.0,
+        'first': 16.0, 'last': 20.0, 'since': 2.0,
+    }
+    assert ring.stats(since=4.0)['count'] == 2
+    assert ring.stats(since=6.0) is None
+
+
+def test_history_window_counts_minutes_back_from_the_clock():
+    clock = FakeClock(now=1000.0)
+    history = PriceHistory(capacity=16, clock=clock)
+    for ts, price in [(700, 15.0), (850, 16.0), (990, 17.0)]:
+        history.append('shb', ts, price)
+
+    assert history.stats('SHB', minutes=3)['count'] == 2
+    assert history.stats('SHB')['count'] == 3
+    assert _flat(history.window('SHB', minutes=1)) == [(990.0, 17.0)]
+    assert history.stats('VNM') is None and history.window('VNM') == []
+
+
+def test_history_records_price_data_and_reports_memory():
+    history = PriceHistory(capacity=8)
+    history.record(PriceData('SHB', 16.4, datetime.fromtimestamp(100), 'test'))
+
+    assert history.symbols() == ['SHB']
+    assert history.stats('shb')['last'] == 16.4
+    assert history.memory_bytes() == 8 * 16
+
+
+def test_ring_rejects_zero_capacity():
+    with pytest.raises(ValueError):
+        PriceRing(capacity=0)
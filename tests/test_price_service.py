@@ -0,0 +1,254 @@
+import threading
+import time
+from datetime import datetime
+from services.price_service import PriceCache, PriceData, PriceService, StockAPIError
+
+
+class SlowProvider:
+    """Blocks every fetch until released and counts upstream calls"""
+    name = 'slow'
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.price = 16.4
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def fetch_price(self, symbol):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return PriceData(symbol, self.price, datetime.now(), self.name)
+
+    def fetch_prices(self, symbols):
+        return {s: self.fetch_price(s) for s in symbols}
+
+
+def _concurrent_get_price(service, symbol, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(service.get_price(symbol))
+        except StockAPIError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert service.provider.started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(callers - 1)]
+    for t in followers:
+        t.start()
+    # Followers are parked on the leader's flight once it shows as coalesced
+    while service.get_stats()['coalesced'] < callers - 1:
+        threading.Event().wait(0.001)
+    service.provider.release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_misses_share_one_upstream_call():
+    service = PriceService(provider=SlowProvider(), cache_ttl=60)
+    results, errors = _concurrent_get_price(service, 'shb', 8)
+
+    assert not errors
+    assert service.provider.calls == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert service.get_stats()['in_flight'] == 0
+
+
+def test_followers_get_the_leaders_error():
+    service = PriceService(provider=SlowProvider(error=StockAPIError("board down")), cache_ttl=60)
+    results, errors = _concurrent_get_price(service, 'SHB', 4)
+
+    assert not results
+    assert service.provider.calls == 1
+    assert len(errors) == 4 and all(str(e) == "board down" for e in errors)
+
+    # A failed flight is not cached; the next caller goes upstream again
+    service.provider.error = None
+    assert service.get_price('SHB').price == 16.4
+    assert service.provider.calls == 2
+
+
+def test_cache_hit_skips_upstream():
+    provider = SlowProvider()
+    provider.release.set()
+    service = PriceService(provider=provider, cache_ttl=60)
+
+    service.get_price('SHB')
+    service.get_price('SHB')
+    batch = service.get_prices(['SHB', 'shb'])
+
+    assert provider.calls == 1
+    assert list(batch.prices) == ['SHB'] and batch.ok
+
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _price(symbol, price=16.4):
+    return PriceData(symbol, price, datetime.now(), 'test')
+
+
+def test_cache_entry_goes_fresh_stale_then_expired():
+    clock = FakeClock()
+    cache = PriceCache(ttl_seconds=7, stale_ttl_seconds=60, clock=clock)
+    cache.set(_price('SHB'))
+
+    assert cache.lookup('SHB')[1] is False
+    clock.now = 8
+    data, stale = cache.lookup('SHB')
+    assert data is not None and stale
+    assert cache.get('SHB') is None  # get() never returns stale data
+    clock.now = 61
+    assert cache.lookup('SHB') == (None, False)
+    assert len(cache) == 0
+
+
+def test_cache_without_stale_ttl_drops_entries_at_the_ttl():
+    clock = FakeClock()
+    cache = PriceCache(ttl_seconds=7, clock=clock)
+    cache.set(_price('SHB'))
+
+    clock.now = 7.5
+    assert cache.lookup('SHB') == (None, False)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PriceCache(ttl_seconds=60, max_entries=2)
+    cache.set(_price('SHB'))
+    cache.set(_price('VCB'))
+    cache.get('SHB')  # VCB is now the least recently used
+    cache.set(_price('FPT'))
+
+    assert cache.get('VCB') is None
+    assert cache.get('SHB') and cache.get('FPT')
+    assert cache.evictions == 1
+
+
+def test_stale_price_is_served_and_refreshed_in_the_background():
+    provider = SlowProvider()
+    provider.release.set()
+    service = PriceService(provider=provider, cache_ttl=7, stale_ttl=60)
+    clock = FakeClock()
+    service.cache._clock = clock
+    service.get_price('SHB')
+
+    clock.now = 10
+    provider.price = 17.0
+    assert service.get_price('SHB').price == 16.4  # stale answer, no wait
+
+    deadline = time.monotonic() + 5
+    while service.get_stats()['in_flight'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider.calls == 2
+    assert service.get_price('SHB').price == 17.0
+    assert service.get_stats()['revalidations'] == 1
+
+
+def test_inflight_waits_share_one_batch_deadline():
+    service = PriceService(provider=SlowProvider(), cache_ttl=60, fetch_timeout=0.2)
+    leader = threading.Thread(target=service.get_prices, args=(['SHB', 'VNM', 'FPT'],))
+    leader.start()
+    assert service.provider.started.wait(5)
+
+    start = time.monotonic()
+    batch = service.get_prices(['SHB', 'VNM', 'FPT'])
+    elapsed = time.monotonic() - start
+    service.provider.release.set()
+    leader.join(5)
+
+    assert sorted(batch.errors) == ['FPT', 'SHB', 'VNM']
+    assert elapsed < 0.5  # one deadline, not 0.2s per awaited symbol
+
+
+class BoardProvider:
+    """Price board returning `listed` symbols; single fetches fail for `broken` ones"""
+    name = 'board'
+
+    def __init__(self, listed=(), broken=(), board_error=None):
+        self.listed = set(listed)
+        self.broken = set(broken)
+        self.board_error = board_error
+        self.board_calls = []
+        self.single_calls = []
+
+    def fetch_prices(self, symbols):
+        self.board_calls.append(list(symbols))
+        if self.board_error:
+            raise self.board_error
+        return {s: PriceData(s, 16.4, datetime.now(), self.name) for s in symbols if s in self.listed}
+
+    def fetch_price(self, symbol):
+        self.single_calls.append(symbol)
+        if symbol in self.broken:
+            raise StockAPIError(f"{symbol} not found")
+        return PriceData(symbol, 20.0, datetime.now(), 'single')
+
+
+def test_misses_are_fetched_in_board_sized_chunks():
+    symbols = [f"S{i:02d}" for i in range(7)]
+    provider = BoardProvider(listed=symbols)
+    service = PriceService(provider=provider, cache_ttl=60, batch_size=3)
+
+    batch = service.get_prices([s.lower() for s in symbols] + ['s00'])
+
+    assert provider.board_calls == [symbols[0:3], symbols[3:6], symbols[6:]]
+    assert provider.single_calls == []
+    assert sorted(batch.prices) == symbols and batch.ok
+
+    service.get_prices(symbols)  # all cached now
+    assert len(provider.board_calls) == 3
+
+
+def test_symbols_missing_from_the_board_fall_back_to_single_fetches():
+    provider = BoardProvider(listed=['SHB', 'VNM'])
+    service = PriceService(provider=provider, cache_ttl=60)
+
+    batch = service.get_prices(['SHB', 'VNM', 'FPT'])
+
+    assert provider.single_calls == ['FPT']
+    assert batch.prices['FPT'].source == 'single'
+    assert batch.prices['SHB'].source == 'board'
+    assert service.get_stats()['upstream_calls'] == 2
+
+
+def test_failed_board_falls_back_and_reports_errors_per_symbol():
+    provider = BoardProvider(broken=['XXX'], board_error=StockAPIError("board down"))
+    service = PriceService(provider=provider, cache_ttl=60)
+
+    batch = service.get_prices(['SHB', 'XXX', 'VNM'])
+
+    assert sorted(provider.single_calls) == ['SHB', 'VNM', 'XXX']
+    assert sorted(batch.prices) == ['SHB', 'VNM']
+    assert list(batch.errors) == ['XXX'] and "XXX not found" in str(batch.errors['XXX'])
+    assert not batch.ok
+    assert service.cache.get('XXX') is None  # errors are not cached
+
+
+def test_slow_single_fetch_times_out_without_holding_the_others():
+    class Hanging(BoardProvider):
+        def fetch_price(self, symbol):
+            if symbol == 'SLOW':
+                threading.Event().wait(1)
+            return super().fetch_price(symbol)
+
+    service = PriceService(provider=Hanging(listed=['SHB']), cache_ttl=60, fetch_timeout=0.1)
+
+    started = time.monotonic()
+    batch = service.get_prices(['SHB', 'SLOW', 'VNM'])
+
+    assert time.monotonic() - started < 0.5
+    assert sorted(batch.prices) == ['SHB', 'VNM']
+    assert "Timed out" in str(batch.errors['SLOW'])
@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import datetime
+import pytest
+from services.price_service import PriceData, StockAPIError, StockAPIUnavailableError
+from services.providers import GuardedProvider, ProviderPool, create_provider
+from utils.circuit_breaker import CircuitBreaker
+
+
+class StubProvider:
+    def __init__(self, name, price=16.4, delay=0.0, error=None):
+        self.name = name
+        self.price = price
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def fetch_price(self, symbol):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return PriceData(symbol, self.price, datetime.now(), self.name)
+
+    def fetch_prices(self, symbols):
+        return {s: self.fetch_price(s) for s in symbols}
+
+
+def test_pool_fails_over_and_then_skips_a_failing_provider():
+    primary = StubProvider('primary', error=StockAPIError("down"))
+    secondary = StubProvider('secondary', price=16.5)
+    pool = ProviderPool([primary, secondary], timeout=2, failover_errors=2, failover_cooldown=60)
+
+    for _ in range(2):
+        assert pool.fetch_price('SHB').source == 'secondary'
+    assert primary.calls == 2
+
+    pool.fetch_price('SHB')
+    assert primary.calls == 2  # failed over: not tried while cooling down
+    assert pool.get_stats()['providers']['primary']['failed_over']
+
+
+def test_pool_hedges_a_slow_primary():
+    primary = StubProvider('primary')
+    secondary = StubProvider('secondary', price=16.5)
+    pool = ProviderPool([primary, secondary], timeout=2, hedge_min_samples=5, hedge_percentile=95)
+    for _ in range(5):
+        pool.fetch_price('SHB')  # fast samples set the primary's p95
+
+    primary.delay = 0.5
+    started = time.monotonic()
+    result = pool.fetch_price('SHB')
+
+    assert result.source == 'secondary'
+    assert time.monotonic() - started < 0.4
+    assert pool.hedges == 1
+
+
+def test_pool_raises_when_every_provider_fails():
+    pool = ProviderPool([StubProvider('a', error=StockAPIError("a down")),
+                         StubProvider('b', error=ValueError("bad json"))], timeout=1)
+    with pytest.raises(StockAPIError):
+        pool.fetch_price('SHB')
+
+
+def test_guarded_provider_times_out_each_attempt_and_opens_the_breaker():
+    slow = StubProvider('slow', delay=0.5)
+    guarded = GuardedProvider(slow, CircuitBreaker('slow', failure_threshold=1), timeout=0.05,
+                              max_retries=2, backoff_base=0.01, backoff_max=0.01)
+
+    started = time.monotonic()
+    with pytest.raises(StockAPIError):
+        guarded.fetch_price('SHB')
+    assert time.monotonic() - started < guarded.budget + 0.1
+    assert slow.calls == 2
+
+    with pytest.raises(StockAPIUnavailableError):
+        guarded.fetch_price('SHB')  # breaker open: fails fast without a call
+    assert slow.calls == 2
+
+
+def test_guarded_provider_bounds_hung_calls():
+    release = threading.Event()
+
+    class Hanging(StubProvider):
+        def fetch_price(self, symbol):
+            self.calls += 1
+            release.wait(5)
+            return super().fetch_price(symbol)
+
+    hanging = Hanging('hanging')
+    guarded = GuardedProvider(hanging, CircuitBreaker('hanging', failure_threshold=100), timeout=0.02,
+                              max_retries=1, workers=1, max_hung=2)
+    for _ in range(4):
+        with pytest.raises(StockAPIError):
+            guarded.fetch_price('SHB')
+
+    assert hanging.calls == 2 and guarded.hung_calls() == 2
+    release.set()
+    deadline = time.monotonic() + 5
+    while guarded.hung_calls() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert guarded.hung_calls() == 0
+    assert guarded.fetch_price('SHB').price == 16.4
+
+
+def test_create_provider_skips_aliases_of_the_same_backend():
+    pool = create_provider(['vnd', 'ssi', 'file'])
+
+    assert pool.name == 'vnstock+file'
+    assert pool.timeout > max(p.budget for p in (s.provider for s in pool._states))
@@ -0,0 +1,102 @@
+import threading
+import time
+from services.notify_service import Notifier
+from utils.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []  # (monotonic time, chat_id, text)
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        with self.lock:
+            self.sent.append((time.monotonic(), chat_id, text))
+
+
+def _wait_sent(bot, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while len(bot.sent) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return bot.sent
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+
+    assert [bucket.acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.wait_time() == 0.5
+    clock.now += 0.5
+    assert bucket.acquire() and not bucket.acquire()
+    clock.now += 10
+    assert sum(bucket.acquire() for _ in range(10)) == 3  # refill is capped at burst
+
+
+def test_bucket_pause_empties_and_blocks():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, burst=5, clock=clock)
+
+    bucket.pause(2)
+    assert bucket.wait_time() == 2
+    clock.now += 1.99
+    assert not bucket.acquire()
+    clock.now += 0.01
+    assert bucket.acquire()
+
+
+def test_global_rate_holds_from_the_first_message():
+    bot = RecordingBot()
+    notifier = Notifier('token', '1', bot=bot, async_send=True, workers=4, global_rate=40, chat_rate=100, chat_burst=100)
+    for i in range(60):
+        notifier.send(f"m{i}", chat_id=str(i))
+    sent = _wait_sent(bot, 60)
+    notifier.close()
+
+    assert len(sent) == 60
+    times = sorted(t for t, _, _ in sent)
+    # No startup burst: any half second carries at most rate * 0.5 + 1 messages
+    for i, start in enumerate(times):
+        assert sum(1 for t in times[i:] if t - start < 0.5) <= 21
+    assert times[-1] - times[0] >= 59 / 40 * 0.95
+
+
+def test_chat_rate_and_order_are_kept_per_chat():
+    bot = RecordingBot()
+    notifier = Notifier('token', '1', bot=bot, async_send=True, workers=4, global_rate=1000, chat_rate=10, chat_burst=2)
+    for i in range(6):
+        notifier.send(f"a{i}", chat_id='A')
+        notifier.send(f"b{i}", chat_id='B')
+    sent = _wait_sent(bot, 12)
+    notifier.close()
+
+    for chat in 'AB':
+        chat_sent = [(t, text) for t, c, text in sent if c == chat]
+        assert [text for _, text in chat_sent] == [f"{chat.lower()}{i}" for i in range(6)]
+        # Burst of 2, then one every 100ms
+        assert chat_sent[-1][0] - chat_sent[0][0] >= 0.4 * 0.95
+
+
+def test_queue_bound_drops_newer_messages():
+    release = threading.Event()
+
+    class StuckBot(RecordingBot):
+        def send_message(self, chat_id, text, parse_mode=None):
+            release.wait(5)
+            super().send_message(chat_id, text, parse_mode)
+
+    notifier = Notifier('token', '1', bot=StuckBot(), async_send=True, queue_size=3)
+    results = [notifier.send(f"m{i}") for i in range(5)]
+    release.set()
+    notifier.close()
+
+    assert results.count(False) >= 1
+    assert notifier.get_stats()['dropped'] == results.count(False)
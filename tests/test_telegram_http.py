@@ -0,0 +1,49 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.telegram_stub import STUB_TOKEN, StubTelegramServer
+from services.telegram_http import create_bot
+
+
+@pytest.fixture
+def stub():
+    server = StubTelegramServer(latency=0.005).start()
+    yield server
+    server.stop()
+
+
+def test_sends_reuse_the_pooled_connections(stub):
+    bot = create_bot(STUB_TOKEN, pool_size=2, base_url=stub.base_url)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(lambda i: bot.send_message(chat_id=i % 3, text=f"msg {i}"), range(30)))
+    stats = bot.request.get_stats()
+    bot.request.stop()
+
+    assert stub.counters['sent'] == 30
+    assert stub.counters['connections'] <= 2  # callers waited for a pooled connection
+    assert stats['requests'] == 30 and stats['errors'] == 0
+    assert stats['connections_opened'] <= 2
+    assert stats['reuse_ratio'] >= 0.9
+
+
+def test_long_poll_does_not_hold_the_send_pool(stub):
+    bot = create_bot(STUB_TOKEN, pool_size=1, pool_timeout=0.5, base_url=stub.base_url)
+    poller = threading.Thread(target=bot.get_updates, kwargs={'timeout': 1})
+    poller.start()
+    while stub.counters['requests'] < 1:
+        time.sleep(0.005)
+
+    started = time.monotonic()
+    for i in range(3):
+        bot.send_message(chat_id=1, text=f"msg {i}")
+    elapsed = time.monotonic() - started
+    poller.join(5)
+    stats = bot.request.get_stats()
+    bot.request.stop()
+
+    assert len(bot.request._long_poll._con_pool.pools) == 0  # stop() closes both pools
+    assert elapsed < 0.5  # not queued behind the one-second poll
+    assert stats['requests'] == 3
+    assert stats['long_polls'] == {'requests': 1, 'errors': 0}
+    assert stub.counters['connections'] == 2
@@ -0,0 +1,80 @@
+import random
+from core.config import Config
+from core.position import Position
+from core.strategy import Strategy
+from core.trigger_index import ABOVE, BELOW, TriggerIndex
+
+
+def _random_index(rng):
+    triggers = [(round(rng.uniform(10, 20), 1), rng.choice([BELOW, ABOVE]), i) for i in range(30)]
+    index = TriggerIndex()
+    index.rebuild('SHB', triggers)
+    return index, triggers
+
+
+def test_active_matches_a_linear_scan():
+    rng = random.Random(3)
+    index, triggers = _random_index(rng)
+
+    for _ in range(500):
+        price = round(rng.uniform(9, 21), 1)
+        below, above = index.active('SHB', price)
+        assert sorted(below) == sorted(k for level, d, k in triggers if d == BELOW and price <= level)
+        assert sorted(above) == sorted(k for level, d, k in triggers if d == ABOVE and price >= level)
+
+
+def test_crossed_matches_a_linear_scan_in_passing_order():
+    rng = random.Random(4)
+    index, triggers = _random_index(rng)
+
+    prev = 15.0
+    for _ in range(500):
+        price = round(rng.uniform(9, 21), 1)
+        crossed = index.crossed('SHB', prev, price)
+        if price < prev:
+            expected = sorted(((l, d, k) for l, d, k in triggers if d == BELOW and price <= l < prev), reverse=True)
+        else:
+            expected = sorted((l, d, k) for l, d, k in triggers if d == ABOVE and prev < l <= price)
+        assert [l for l, _, _ in crossed] == [l for l, _, _ in expected]
+        assert sorted(crossed) == sorted(expected)
+        prev = price
+
+
+def test_crossed_needs_a_previous_price_and_a_move():
+    index = TriggerIndex()
+    index.rebuild('SHB', [(15.0, BELOW, 'buy')])
+
+    assert index.crossed('SHB', None, 14.0) == []
+    assert index.crossed('SHB', 14.0, 14.0) == []
+    assert index.crossed('SHB', 15.5, 15.0) == [(15.0, BELOW, 'buy')]
+    assert index.crossed('VCB', 15.5, 14.0) == []
+
+
+def test_strategy_keeps_level_semantics():
+    clock = [0.0]
+    config = Config.to_dict()
+    config["strategy"].update(down_threshold=1, up_threshold=1, cooldown_minutes=15, rsi_oversold=None)
+    strategy = Strategy(config, clock=lambda: clock[0])
+    position = Position('SHB')
+    position.add_layer(16.0, 1000)
+
+    # Beyond the threshold on the first tick: alerts without a previous price
+    assert [kind for kind, _ in strategy.signals(14.5, position)] == ['buy_more']
+    assert strategy.signals(14.4, position) == []  # cooling down
+    clock[0] += 15 * 60 + 1
+    # Still below the threshold after the cooldown: reminded again
+    assert [kind for kind, _ in strategy.signals(14.4, position)] == ['buy_more']
+
+
+def test_strategy_rebuilds_the_index_only_when_the_position_changes():
+    strategy = Strategy(Config.to_dict())
+    position = Position('SHB')
+    position.add_layer(16.0, 1000)
+
+    for price in (15.0, 15.5, 16.0, 16.6):
+        strategy.signals(price, position)
+    assert strategy.index.rebuilds == 1
+
+    position.add_layer(15.0, 1000)
+    strategy.signals(15.2, position)
+    assert strategy.index.rebuilds == 2
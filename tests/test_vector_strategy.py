@@ -0,0 +1,78 @@
+import copy
+import random
+import numpy as np
+from core.config import Config
+from core.indicators import IndicatorBook
+from core.position import Position
+from core.strategy import Strategy
+from core.vector_strategy import BatchStrategy, evaluate
+
+SYMBOLS = ['SHB', 'VCB', 'FPT', 'HPG']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _positions(rng, n):
+    positions = []
+    for i in range(n):
+        position = Position(SYMBOLS[i % len(SYMBOLS)])
+        for _ in range(rng.randrange(0, 3)):  # some rows hold nothing (pre_buy)
+            position.add_layer(round(rng.uniform(10, 20), 2), rng.choice([100, 500, 1000]))
+        positions.append(position)
+    return positions
+
+
+def _indicators(rng, oversold):
+    indicators = IndicatorBook(Config.to_dict())
+    for symbol in SYMBOLS:
+        price = 20.0
+        for _ in range(30):
+            # Falling prices push RSI below the oversold level, rising ones keep it high
+            price += -0.2 if symbol in oversold else 0.2
+            indicators.update(symbol, price + rng.uniform(-0.01, 0.01))
+    return indicators
+
+
+def test_batch_matches_scalar_check_across_ticks_and_cooldowns():
+    rng = random.Random(7)
+    config = Config.to_dict()
+    config["strategy"].update(cooldown_minutes=1)
+    indicators = _indicators(rng, oversold={'SHB', 'FPT'})
+    positions = _positions(rng, 40)
+
+    scalar_clock, batch_clock = FakeClock(), FakeClock()
+    scalar = Strategy(copy.deepcopy(config), clock=scalar_clock, indicators=indicators, chat_id='1')
+    batch = BatchStrategy(Strategy(copy.deepcopy(config), clock=batch_clock, indicators=indicators, chat_id='1'))
+
+    fired = 0
+    for tick in range(50):
+        prices = [round(rng.uniform(9, 21), 2) for _ in positions]
+        expected = [scalar.check(price, position) for price, position in zip(prices, positions)]
+        assert batch.check_many(prices, positions) == expected, f"tick {tick}"
+        fired += sum(map(len, expected))
+        scalar_clock.now = batch_clock.now = scalar_clock.now + rng.choice([1, 30, 61])
+
+    assert fired > 0
+
+
+def test_evaluate_masks_match_thresholds():
+    prices = np.array([9.7, 10.0, 10.5, 10.2, 12.0])
+    avgs = np.array([10.0, 10.0, 10.0, 10.0, 0.0])
+    qtys = np.array([100, 100, 100, 100, 0])
+
+    masks = evaluate(prices, avgs, qtys, down=0.3, up=0.5, pre_buy_range=0.05)
+
+    assert masks['buy_more'].tolist() == [True, False, False, False, False]
+    assert masks['sell'].tolist() == [False, False, True, False, False]
+    assert masks['pre_buy'].tolist() == [False, False, False, False, True]
+
+
+def test_evaluate_broadcasts_threshold_sweeps():
+    masks = evaluate(np.full(3, 9.6), 10.0, 100, down=np.array([0.2, 0.4, 0.6]), up=0.5, pre_buy_range=0.05)
+    assert masks['buy_more'].tolist() == [True, True, False]
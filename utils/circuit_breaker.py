@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """
+    Full-jitter exponential backoff delay
+
+    Args:
+        attempt: 1-based attempt (or consecutive failure) number
+        base: Delay scale in seconds for the first attempt
+        cap: Upper bound in seconds
+
+    Returns:
+        float: Random delay in [0, min(cap, base * 2^(attempt-1))]
+    """
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for recovery_timeout seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it with
+    the recovery time doubled (up to max_recovery_timeout).
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30,
+                 max_recovery_timeout=300, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = recovery_timeout
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self._open_for:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+            logger.info(f"Circuit '{self.name}' half-open, allowing a trial call")
+        return self._state
+
+    def retry_after(self):
+        """Seconds until the circuit lets a trial call through (0 if not open)"""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._open_for - self._clock())
+
+    def before_call(self):
+        """
+        Reserve permission for a call
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a half-open trial is running
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.total_rejected += 1
+            retry_after = max(0.0, self._opened_at + self._open_for - self._clock())
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after successful trial call")
+            self._state = CLOSED
+            self._failures = 0
+            self._open_for = self.recovery_timeout
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._open_for = min(self._open_for * 2, self.max_recovery_timeout)
+                self._trip()
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        # Jitter the open period so retries against a shared upstream spread out
+        self._opened_at = self._clock() + random.uniform(0, self._open_for * 0.1)
+        self._trial_in_flight = False
+        self.times_opened += 1
+        logger.warning(
+            f"Circuit '{self.name}' opened after {self._failures} consecutive failures "
+            f"(retry in ~{self._open_for:.0f}s)"
+        )
+
+    def snapshot(self):
+        """Breaker state for health reporting"""
+        with self._lock:
+            state = self._current_state()
+            retry_after = max(0.0, self._opened_at + self._open_for - self._clock()) if state == OPEN else 0.0
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'retry_after': round(retry_after, 1),
+                'times_opened': self.times_opened,
+                'total_failures': self.total_failures,
+                'total_rejected': self.total_rejected,
+            }
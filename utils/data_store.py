@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 from utils.logger import get_logger
@@ -14,6 +15,8 @@ class DataStore:
         self.backup_dir = self.data_file.parent / 'backup'
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         self.data_file.parent.mkdir(parents=True, exist_ok=True)
+        # Serializes saves; hold it while taking the snapshot so the last save is the newest
+        self.lock = threading.RLock()
         
     def load(self):
         """Load data from file"""
@@ -33,19 +36,25 @@ class DataStore:
     
     def save(self, data):
         """Save data to file with backup"""
-        try:
-            # Create backup before saving
-            if self.data_file.exists():
-                self._create_backup()
-            
-            # Save data
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Saved data to {self.data_file}")
-        except Exception as e:
-            logger.error(f"Error saving data: {e}")
-            raise
+        with self.lock:
+            tmp_file = self.data_file.with_name(self.data_file.name + '.tmp')
+            try:
+                # Create backup before saving
+                if self.data_file.exists():
+                    self._create_backup()
+                
+                # Write a temp file and swap it in, so a crash or failed dump never leaves half a file
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.data_file)
+                
+                logger.info(f"Saved data to {self.data_file}")
+            except Exception as e:
+                logger.error(f"Error saving data: {e}")
+                tmp_file.unlink(missing_ok=True)
+                raise
     
     def _create_backup(self):
         """Create a timestamped backup"""
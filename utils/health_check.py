@@ -21,6 +21,9 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
         'total_errors': 0,
     }
     
+    # Callables returning extra status sections (e.g. price service counters)
+    components = {}
+    
     def do_GET(self):
         """Handle GET requests"""
         if self.path == '/health' or self.path == '/':
@@ -34,6 +37,12 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
         """Send health check response"""
         status = self.bot_status.copy()
         
+        for name, get_status in self.components.items():
+            try:
+                status[name] = get_status()
+            except Exception as e:
+                status[name] = {'error': str(e)}
+        
         # Determine if healthy
         is_healthy = status['status'] == 'running'
         
@@ -125,6 +134,11 @@ class HealthCheckServer:
             HealthCheckHandler.bot_status['last_error'] = str(error)
             HealthCheckHandler.bot_status['total_errors'] += 1
     
+    @staticmethod
+    def register_component(name, get_status):
+        """Register a callable whose dict result is included in /health details"""
+        HealthCheckHandler.components[name] = get_status
+    
     @staticmethod
     def increment_alerts():
         """Increment alert counter"""
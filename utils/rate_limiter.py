@@ -0,0 +1,44 @@
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+
+    Holds up to `burst` tokens refilled at `rate` per second. Not thread-safe;
+    callers serialize access (the Notifier worker holds its own lock).
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is available now)"""
+        now = self._clock()
+        self._refill(now)
+        wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+        return max(wait, self._paused_until - now)
+
+    def acquire(self):
+        """Take a token if available; returns True on success"""
+        if self.wait_time() > 0:
+            return False
+        self._tokens -= 1
+        return True
+
+    def pause(self, seconds):
+        """Hand out no tokens for `seconds` (e.g. a server's retry_after)"""
+        now = self._clock()
+        self._refill(now)
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, now + seconds)